@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全量相似度审计
+对数据集文件中的全部数据做一遍 MinHash-LSH 近邻查找，报告同一 instruction 内的最高相似度、
+每条数据的近邻相似度直方图，以及每个 instruction 中最相似的文本对
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from near_dup import DEFAULT_RECALL
+from similarity_audit import DEFAULT_BINS, DEFAULT_FLOOR, DEFAULT_NUM_PERM, DEFAULT_TOP_K, audit_file
+
+
+def _preview(text: str, width: int = 40) -> str:
+    return text if len(text) <= width else text[:width] + "…"
+
+
+def print_audit(audit, elapsed: float):
+    """打印审计结果"""
+    report = audit.result()
+    print("=" * 80)
+    print("全量相似度审计")
+    print("=" * 80)
+    print(f"✅ {audit.summary()}")
+    print(f"⏱️  耗时 {elapsed:.2f}s，LSH 候选{audit.cascade.summary()}")
+
+    print(f"\n近邻相似度分布（每条数据与同一 instruction 下最相似的一条）:")
+    histogram = report["nearest_neighbor_histogram"]
+    largest = max(histogram.values(), default=0) or 1
+    for label, count in histogram.items():
+        print(f"  {label:>11}: {count:>7} {'█' * round(count / largest * 40)}")
+
+    print(f"\n每个 instruction 最相似的 {audit.top_k} 对:")
+    for instruction, pairs in report["top_pairs"].items():
+        print(f"\n  [{instruction}]")
+        for pair in pairs:
+            print(f"    {pair['similarity']:.3f}  #{pair['first']['index']} {_preview(pair['first']['output'])}")
+            print(f"           #{pair['second']['index']} {_preview(pair['second']['output'])}")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全量相似度审计（MinHash-LSH 近邻查找）')
+    parser.add_argument('dataset', type=str, help='数据集文件（JSON/JSONL/JSONL.GZ/Parquet）')
+    parser.add_argument('--floor', type=float, default=DEFAULT_FLOOR,
+                        help=f'需要精确找出的最低相似度，低于它只计入 "<floor" (默认: {DEFAULT_FLOOR})')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='统计相似度达到该阈值的文本对数量，不能低于 --floor (默认: 不统计)')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                        help=f'每个 instruction 报告的最相似文本对数量 (默认: {DEFAULT_TOP_K})')
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS,
+                        help=f'近邻相似度直方图的桶数 (默认: {DEFAULT_BINS})')
+    parser.add_argument('--num-perm', type=int, default=DEFAULT_NUM_PERM,
+                        help=f'MinHash 签名长度 (默认: {DEFAULT_NUM_PERM})')
+    parser.add_argument('--recall', type=float, default=DEFAULT_RECALL,
+                        help=f'相似度为 floor 的文本对成为候选的最低概率 (默认: {DEFAULT_RECALL})')
+    parser.add_argument('--json', type=str, default=None, help='将完整审计结果保存为JSON文件')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    audit = audit_file(
+        args.dataset,
+        floor=args.floor,
+        top_k=args.top_k,
+        threshold=args.threshold,
+        bins=args.bins,
+        num_perm=args.num_perm,
+        recall=args.recall
+    )
+    print_audit(audit, time.perf_counter() - start)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(audit.result(), f, ensure_ascii=False, indent=2)
+        print(f"💾 审计结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+精确去重集合的内存基准
+对同一批（默认100万条）互不相同的合成数据，比较三种精确去重集合的内存占用和耗时：
+原先 main() 校验用的拼接字符串 set、存放16字节摘要的 set，以及 src/utils/digest_set.py 的 DigestSet
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from checkpoint import entry_digest
+from scenarios import SCENARIO_CATALOG
+from utils.digest_set import DigestSet
+
+
+def iter_rows(count: int):
+    """逐条产出互不相同的合成数据（回复模板加序号），数据本身不常驻内存"""
+    templates = [
+        (scenario.instruction, scenario.input, template)
+        for scenario in SCENARIO_CATALOG
+        for template in scenario.response_templates
+    ]
+    for i in range(count):
+        instruction, user_input, template = templates[i % len(templates)]
+        yield {"instruction": instruction, "input": user_input, "output": f"{template} #{i}"}
+
+
+def build_string_set(rows):
+    return {f"{e['instruction']}|{e['input']}|{e['output']}" for e in rows}
+
+
+def build_digest_set(rows):
+    return {entry_digest(e) for e in rows}
+
+
+def build_compact_set(rows):
+    return DigestSet(entry_digest(e) for e in rows)
+
+
+def measure(build, count: int):
+    """
+    构建集合并测量其占用；耗时在不开启 tracemalloc 的单独一次构建中测量
+
+    Returns:
+        (条数, 构建完成后占用的字节数, 构建过程中的峰值字节数, 耗时秒数)
+    """
+    start = time.perf_counter()
+    build(iter_rows(count))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    keys = build(iter_rows(count))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(keys), current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='精确去重集合的内存基准')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='数据条数 (默认: 1000000)')
+    args = parser.parse_args()
+
+    cases = (
+        ("拼接字符串 set", build_string_set),
+        ("16字节摘要 set", build_digest_set),
+        ("DigestSet (64位)", build_compact_set),
+    )
+
+    print(f"数据条数: {args.rows}（内存由 tracemalloc 计量，耗时含生成数据和计算摘要）")
+    print(f"{'集合':<18} {'条数':>9} {'占用MB':>8} {'峰值MB':>8} {'字节/条':>8} {'耗时s':>7}")
+    for label, build in cases:
+        count, current, peak, elapsed = measure(build, args.rows)
+        print(f"{label:<18} {count:>9} {current / 2**20:>8.1f} {peak / 2**20:>8.1f} "
+              f"{current / count:>8.1f} {elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表情识别微基准
+在场景目录的全部回复模板（以及去掉表情后的同一批文本）上，比较 src/utils/emoji.py
+与原先四处各自实现的表情判断的耗时
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from scenarios import SCENARIO_CATALOG
+from utils.emoji import count_emoji, has_emoji, strip_emoji
+
+
+# ---- 原先的实现（仅用于对比） ----
+
+_LEGACY_EMOJI_SET = {
+    '😊', '😄', '😃', '😁', '🥰', '😘', '😍', '🤗', '😳', '😢', '😭', '🥺', '😤', '😴', '💤',
+    '🫂', '💕', '💖', '💗', '💓', '💝', '❤️', '🧡', '💛', '💚', '💙', '💜', '🤍', '🖤',
+    '✨', '⭐', '🌟', '💫', '🌸', '🌺', '🌻', '🌼', '🌷', '🌹', '🏵️', '💐', '🌈',
+    '☀️', '🌤️', '⛅', '🌥️', '☁️', '🌦️', '🌧️', '⛈️', '🌩️', '🌨️', '❄️', '☃️', '⛄', '🌬️', '💨',
+    '🌙', '🌛', '🌜', '🌚', '🌝', '🌞', '☔', '⚡',
+    '💪', '👍', '👏', '🙏', '🤝', '👋', '🤚', '✋', '🖐️', '👌', '✌️', '🤞', '🤟',
+    '🎉', '🎊', '🎈', '🎁', '🎀', '🎂', '🎄', '🎃', '🎆', '🎇',
+    '🍱', '🍚', '🍜', '🍝', '🍕', '🍔', '🍟', '🍗', '🍖', '🌭', '🥪', '🥙', '🌮', '🌯',
+    '🍽️', '🍴', '🥄', '🔪', '🍶', '🍷', '🍸', '🍹', '🍺', '🍻', '☕', '🍵', '🧃', '🥤',
+    '🍦', '🍧', '🍨', '🍩', '🍪', '🍰', '🧁', '🥧', '🍫', '🍬', '🍭', '🍮', '🍯',
+    '📚', '📖', '📝', '✏️', '📊', '📈', '📉', '📁', '📂', '🧥', '🎮', '🎯', '🎲', '🎨', '🎭',
+    '💧', '💦', '🤧', '💔', '🔥', '🌠', '🌌'
+}
+
+_LEGACY_RANGES = (
+    (0x2300, 0x23FF), (0x2600, 0x26FF), (0x2700, 0x27BF), (0x1F004, 0x1F0CF), (0x1F1E0, 0x1F1FF),
+    (0x1F300, 0x1F5FF), (0x1F600, 0x1F64F), (0x1F680, 0x1F6FF), (0x1F900, 0x1F9FF), (0x1FA00, 0x1FAFF),
+)
+
+_LEGACY_ENGINE_PATTERN = re.compile(r'[\U0001F300-\U0001F9FF]|[\U00002600-\U000027BF]')
+
+_LEGACY_STRIP_PATTERN = re.compile(
+    "[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF"
+    "\U00002600-\U000026FF\U00002700-\U000027BF\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F"
+    "\U0001FA70-\U0001FAFF\U00002300-\U000023FF\U0001F004-\U0001F0CF]+"
+)
+
+
+def legacy_curated_set(text: str) -> bool:
+    """generate_dataset.has_emoji：逐个子串查找精选表情"""
+    for emoji in _LEGACY_EMOJI_SET:
+        if emoji in text:
+            return True
+    return False
+
+
+def legacy_engine_regex(text: str) -> bool:
+    """VariationEngine._validate_variation：两段区间的正则"""
+    return bool(_LEGACY_ENGINE_PATTERN.search(text))
+
+
+def legacy_ord_ranges(text: str) -> bool:
+    """CrossDeduplicator.validate_format：逐字符 ord 区间判断"""
+    return any(
+        ord(char) > 0x1F000 or 0x2600 <= ord(char) <= 0x27BF or 0x1F300 <= ord(char) <= 0x1F9FF
+        for char in text
+    )
+
+
+def legacy_range_table(text: str) -> bool:
+    """dataset_stats._has_emoji：逐字符遍历区间表"""
+    for char in text:
+        code = ord(char)
+        if code < 0x2300:
+            continue
+        for start, end in _LEGACY_RANGES:
+            if start <= code <= end:
+                return True
+    return False
+
+
+def legacy_strip(text: str) -> str:
+    """normalize_text 的表情删除正则：逐字符删除，不处理组合序列"""
+    return _LEGACY_STRIP_PATTERN.sub('', text)
+
+
+def _bench(func, texts, repeat: int) -> float:
+    """每条文本的平均耗时（微秒，取多次运行的最小值）"""
+    timer = timeit.Timer(lambda: [func(text) for text in texts])
+    return min(timer.repeat(repeat=repeat, number=1)) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='表情识别微基准')
+    parser.add_argument('--repeat', type=int, default=20, help='每项测量重复次数，取最快一次 (默认: 20)')
+    args = parser.parse_args()
+
+    with_emoji = [template for scenario in SCENARIO_CATALOG for template in scenario.response_templates]
+    without_emoji = [strip_emoji(text) for text in with_emoji]
+    corpora = (("含表情", with_emoji), ("不含表情", without_emoji))
+
+    cases = (
+        ("has_emoji", "精选表情子串查找 (generate_dataset)", legacy_curated_set, has_emoji),
+        ("has_emoji", "区间正则 (VariationEngine)", legacy_engine_regex, has_emoji),
+        ("has_emoji", "ord 区间判断 (cross_dedup_check)", legacy_ord_ranges, has_emoji),
+        ("has_emoji", "区间表遍历 (dataset_stats)", legacy_range_table, has_emoji),
+        ("strip_emoji", "单字符正则 (normalize_text)", legacy_strip, strip_emoji),
+    )
+
+    print(f"文本数: {len(with_emoji)} 条 × 2 组，单位: 微秒/条")
+    print(f"{'新函数':<12} {'原实现':<36} {'文本':<6} {'原实现':>8} {'新实现':>8} {'加速':>7}")
+    for name, label, legacy, current in cases:
+        for corpus_name, texts in corpora:
+            before = _bench(legacy, texts, args.repeat)
+            after = _bench(current, texts, args.repeat)
+            print(f"{name:<12} {label:<36} {corpus_name:<6} {before:>8.2f} {after:>8.2f} {before / after:>6.1f}x")
+    for corpus_name, texts in corpora:
+        print(f"{'count_emoji':<12} {'':<36} {corpus_name:<6} {'':>8} {_bench(count_emoji, texts, args.repeat):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
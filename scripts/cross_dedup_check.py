@@ -7,10 +7,15 @@
 
 import json
 import os
+import sys
 from datetime import datetime
-from difflib import SequenceMatcher
 from typing import List, Dict, Any, Tuple
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.emoji import has_emoji
+from utils.text import SimilarityCascade, normalize_text, normalized_similarity
+
 
 class CrossDeduplicator:
     """训练集和验证集交叉去重器"""
@@ -23,6 +28,8 @@ class CrossDeduplicator:
             similarity_threshold: 相似度阈值，默认0.90
         """
         self.similarity_threshold = similarity_threshold
+        # 输出相似度的分级比较（长度上界 → 字符上界 → 精确相似度），记录各级排除的比例
+        self.cascade = SimilarityCascade(similarity_threshold)
     
     def load_dataset(self, filepath: str) -> List[Dict[str, str]]:
         """加载数据集"""
@@ -36,8 +43,8 @@ class CrossDeduplicator:
             json.dump(dataset, f, ensure_ascii=False, indent=2)
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
-        """计算两个文本的相似度"""
-        return SequenceMatcher(None, text1, text2).ratio()
+        """计算两个文本的相似度（与数据集生成脚本相同，比较归一化后的文本）"""
+        return normalized_similarity(normalize_text(text1), normalize_text(text2))
     
     def is_duplicate(self, entry1: Dict[str, str], entry2: Dict[str, str]) -> bool:
         """
@@ -54,11 +61,7 @@ class CrossDeduplicator:
         # 相似度检查 - 只要instruction和input相同，且output相似度超过阈值
         if (entry1['instruction'] == entry2['instruction'] and 
             entry1['input'] == entry2['input']):
-            output_similarity = self.calculate_similarity(
-                entry1['output'], 
-                entry2['output']
-            )
-            if output_similarity >= self.similarity_threshold:
+            if self.cascade.check(normalize_text(entry1['output']), normalize_text(entry2['output'])) is not None:
                 return True
         
         return False
@@ -80,14 +83,22 @@ class CrossDeduplicator:
         """
         duplicate_indices = []
         duplicate_details = []
+        self.cascade.reset_stats()
+        
+        # 每条数据的上下文和归一化输出只计算一次（判定规则与 is_duplicate 相同）
+        train_contexts = [(entry['instruction'], entry['input']) for entry in train_data]
+        train_outputs = [normalize_text(entry['output']) for entry in train_data]
         
         for val_idx, val_entry in enumerate(val_data):
+            val_context = (val_entry['instruction'], val_entry['input'])
+            val_output = normalize_text(val_entry['output'])
             for train_idx, train_entry in enumerate(train_data):
-                if self.is_duplicate(val_entry, train_entry):
-                    similarity = self.calculate_similarity(
-                        val_entry['output'], 
-                        train_entry['output']
-                    )
+                if train_contexts[train_idx] != val_context:
+                    continue
+                similarity = self.cascade.check(val_output, train_outputs[train_idx])
+                if similarity is None and val_entry['output'] == train_entry['output']:
+                    similarity = normalized_similarity(val_output, train_outputs[train_idx])
+                if similarity is not None:
                     duplicate_indices.append(val_idx)
                     duplicate_details.append((val_idx, train_idx, similarity))
                     break  # 找到第一个重复就停止
@@ -123,14 +134,8 @@ class CrossDeduplicator:
             elif len(output) > 200:
                 warnings.append(f"输出较长: {len(output)}字符")
             
-            # 检查emoji (注意：emoji的Unicode范围很广，需要更全面的检查)
-            has_emoji = any(
-                ord(char) > 0x1F000 or  # Emoticons, symbols
-                0x2600 <= ord(char) <= 0x27BF or  # Misc symbols
-                0x1F300 <= ord(char) <= 0x1F9FF  # Extended emoticons
-                for char in output
-            )
-            if not has_emoji:
+            # 检查emoji
+            if not has_emoji(output):
                 warnings.append("建议添加emoji")
             
             # 检查语气词 (作为建议而非强制)
@@ -212,6 +217,7 @@ class CrossDeduplicator:
         duplication_rate = duplicate_count / original_val_count * 100 if original_val_count > 0 else 0
         
         print(f"   发现重复数据: {duplicate_count} 条 ({duplication_rate:.1f}%)")
+        print(f"   相似度{self.cascade.summary()}")
         
         # 3. 删除重复数据（如果不是仅报告模式）
         cleaned_val_data = val_data
@@ -280,7 +286,8 @@ class CrossDeduplicator:
                     }
                     for val_idx, train_idx, sim in duplicate_details[:20]  # 保留前20个
                 ],
-                'samples_removed': duplicate_count if not report_only else 0
+                'samples_removed': duplicate_count if not report_only else 0,
+                'similarity_cascade': self.cascade.as_dict()
             },
             'final_counts': {
                 'train': len(train_data),
@@ -340,6 +347,10 @@ class CrossDeduplicator:
         dedup = report['deduplication']
         print(f"   发现重复: {dedup['duplicates_found']} 条 ({dedup['duplication_rate']})")
         print(f"   已删除: {dedup['samples_removed']} 条")
+        cascade = dedup['similarity_cascade']
+        rates = cascade['prune_rates']
+        print(f"   相似度比较: {cascade['pairs']} 对（长度上界排除 {rates['length']:.1%}，"
+              f"字符上界排除 {rates['multiset']:.1%}，精确比较排除 {rates['exact']:.1%}）")
         
         if dedup['duplicates_found'] > 0:
             print("\n   重复样本示例（前5条）:")
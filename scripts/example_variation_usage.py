@@ -5,7 +5,10 @@
 展示如何在实际场景中使用变化引擎
 """
 
+import json
+
 from variation_engine import (
+    DEFAULT_DIVERSITY_OVERSAMPLE,
     VariationEngine,
     generate_variations_for_scenario,
     get_tone_for_scenario
@@ -130,10 +133,10 @@ def example_4_deterministic_generation():
 def example_5_class_usage():
     """示例5: 使用类进行批量处理"""
     print("\n" + "=" * 70)
-    print("示例5: 使用 VariationEngine 类进行批量处理")
+    print("示例5: 使用 VariationEngine.generate_variations_batch 进行批量处理")
     print("=" * 70)
     
-    # 创建引擎实例
+    # 创建引擎实例（词库和模板编译缓存在整个批次中复用）
     engine = VariationEngine(seed=456)
     
     # 定义多个场景
@@ -154,23 +157,15 @@ def example_5_class_usage():
     
     print("批量处理3个场景，每个生成5个变体:\n")
     
-    for scenario in scenarios:
-        instruction = scenario["instruction"]
-        template = scenario["template"]
-        
-        # 自动获取情感基调
-        tone = get_tone_for_scenario(instruction)
-        
-        # 生成变体
-        variations = engine.generate_variations(
-            template=template,
-            num_variants=5,
-            tone=tone
-        )
-        
-        print(f"场景: {instruction}")
+    # 自动获取情感基调，一次调用生成全部变体（结果与输入顺序一致）
+    templates = [scenario["template"] for scenario in scenarios]
+    tones = [get_tone_for_scenario(scenario["instruction"]) for scenario in scenarios]
+    all_variations = engine.generate_variations_batch(templates, tones, num_variants=5)
+    
+    for scenario, tone, variations in zip(scenarios, tones, all_variations):
+        print(f"场景: {scenario['instruction']}")
         print(f"基调: {tone}")
-        print(f"模板: {template}")
+        print(f"模板: {scenario['template']}")
         print("变体:")
         for i, var in enumerate(variations, 1):
             print(f"  {i}. {var}")
@@ -223,24 +218,21 @@ def example_7_scenario_integration():
     
     print("为5个不同场景自动生成变体:\n")
     
-    for scenario in scenarios:
-        instruction = scenario["instruction"]
-        template = scenario["base_output"]
-        
-        # 自动检测情感基调
-        tone = get_tone_for_scenario(instruction)
-        
-        # 生成3个变体作为示例
-        variations = engine.generate_variations(
-            template=template,
-            num_variants=3,
-            tone=tone
-        )
-        
-        print(f"场景: {instruction}")
+    # 自动检测情感基调，整批生成3个变体作为示例（开启多样性挑选，并报告每个场景的多样性得分）
+    tones = [get_tone_for_scenario(scenario["instruction"]) for scenario in scenarios]
+    all_variations = engine.generate_variations_batch(
+        [scenario["base_output"] for scenario in scenarios],
+        tones,
+        num_variants=3,
+        oversample=DEFAULT_DIVERSITY_OVERSAMPLE
+    )
+    
+    for scenario, tone, variations in zip(scenarios, tones, all_variations):
+        print(f"场景: {scenario['instruction']}")
         print(f"用户输入: {scenario['input']}")
         print(f"自动检测基调: {tone}")
-        print(f"基础回复: {template}")
+        print(f"基础回复: {scenario['base_output']}")
+        print(f"多样性得分: {engine.diversity_score(variations):.2f}")
         print("生成的变体:")
         for i, var in enumerate(variations, 1):
             print(f"  {i}. {var}")
@@ -293,6 +285,28 @@ def example_8_quality_validation():
         print(f"  {i}. {var}")
 
 
+def example_9_strategy_stats():
+    """示例9: 策略统计"""
+    print("\n" + "=" * 70)
+    print("示例9: 策略统计 - 各策略的尝试次数、接受率和耗时")
+    print("=" * 70)
+    
+    # instrument=True 时按 (策略, 基调) 记录尝试、接受、校验失败、重复和耗时
+    engine = VariationEngine(seed=333, instrument=True)
+    templates = [
+        "早安！😊 今天也要加油！",
+        "别灰心！💪 你一定可以的！",
+        "{pet_name}，今天{time}要{care_action}哦！💕",
+    ]
+    tones = ["happy", "encourage", "care"]
+    engine.generate_variations_batch(templates, tones, num_variants=8)
+    
+    print(engine.stats.format_table())
+    # strategy_stats() 返回 {策略: {基调: 计数}} 字典，可直接写入JSON
+    print("\ntone_modifier 策略按基调的明细:")
+    print(json.dumps(engine.strategy_stats()["tone_modifier"], ensure_ascii=False, indent=2))
+
+
 def main():
     """运行所有示例"""
     print("\n" + "🌸" * 35)
@@ -307,6 +321,7 @@ def main():
     example_6_configurable_variants()
     example_7_scenario_integration()
     example_8_quality_validation()
+    example_9_strategy_stats()
     
     print("\n" + "=" * 70)
     print("✨ 所有示例运行完成！")
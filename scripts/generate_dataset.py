@@ -5,21 +5,33 @@
 生成温柔体贴、俏皮可爱的二次元女友聊天数据
 """
 
-import json
 import random
-import re
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from difflib import SequenceMatcher
-from typing import List, Dict, Set, Tuple, Optional
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Dict, Set, Tuple, Optional
 
 # Add src directory to path to import modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
+from build_cache import LATEST_REF, BuildCache, build_key, source_digest
+from checkpoint import JournaledDigestSet, RunCheckpoint, entry_digest
+from lexicon import load_lexicon
+from near_dup import NearDuplicateIndex
+from dataset_io import DATASET_FORMATS, format_extension, iter_dataset, resolve_format, write_dataset
+from sharding import SHARD_MODES, generate_sharded_dataset, write_shards
+from similarity_audit import DEFAULT_FLOOR as DEFAULT_AUDIT_FLOOR, audit_similarity
+from utils.matcher import PhraseMatcher
+from utils.digest_set import DigestSet
+from utils.emoji import has_emoji
+from utils.rng import decode_rng_state, derive_seed, encode_rng_state
+from utils.text import normalize_text, normalized_similarity
+
 # Import scenarios from the src module
 try:
-    from scenarios import SCENARIO_CATALOG
+    from scenarios import SCENARIO_CATALOG, catalog_fingerprint
     USE_CATALOG = True
 except ImportError:
     USE_CATALOG = False
@@ -31,82 +43,34 @@ QC_CONFIG = {
     "min_output_length": 15,
     "max_output_length": 200,
     "similarity_threshold": 0.65,  # Threshold for near-duplicates within same context (lowered for more variations)
+    "similarity_dedup": True,      # Step 4: drop near-duplicates within the same context
     "max_retries": 20,
     "max_generation_attempts": 5000
 }
 
-# Curated emoji sets for validation
-EMOJI_SETS = {
-    '😊', '😄', '😃', '😁', '🥰', '😘', '😍', '🤗', '😳', '😢', '😭', '🥺', '😤', '😴', '💤',
-    '🫂', '💕', '💖', '💗', '💓', '💝', '❤️', '🧡', '💛', '💚', '💙', '💜', '🤍', '🖤',
-    '✨', '⭐', '🌟', '💫', '🌸', '🌺', '🌻', '🌼', '🌷', '🌹', '🏵️', '💐', '🌈',
-    '☀️', '🌤️', '⛅', '🌥️', '☁️', '🌦️', '🌧️', '⛈️', '🌩️', '🌨️', '❄️', '☃️', '⛄', '🌬️', '💨',
-    '🌙', '🌛', '🌜', '🌚', '🌝', '🌞', '⭐', '🌟', '✨', '☔', '⚡',
-    '💪', '👍', '👏', '🙏', '🤝', '👋', '🤚', '✋', '🖐️', '👌', '✌️', '🤞', '🤟',
-    '🎉', '🎊', '🎈', '🎁', '🎀', '🎂', '🎄', '🎃', '🎆', '🎇', '✨',
-    '🍱', '🍚', '🍜', '🍝', '🍕', '🍔', '🍟', '🍗', '🍖', '🌭', '🥪', '🥙', '🌮', '🌯',
-    '🍽️', '🍴', '🥄', '🔪', '🍶', '🍷', '🍸', '🍹', '🍺', '🍻', '☕', '🍵', '🧃', '🥤',
-    '🍦', '🍧', '🍨', '🍩', '🍪', '🎂', '🍰', '🧁', '🥧', '🍫', '🍬', '🍭', '🍮', '🍯',
-    '📚', '📖', '📝', '✏️', '📊', '📈', '📉', '📁', '📂', '🧥', '🎮', '🎯', '🎲', '🎨', '🎭',
-    '💧', '💦', '🤧', '💔', '🔥', '🌠', '🌌'
-}
+# Source files whose contents decide the generated data; part of the build cache key
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
 
 
-def normalize_text(text: str) -> str:
-    """Normalize text for deduplication: lowercase and strip punctuation/emojis"""
-    # Remove all emojis using a more precise pattern
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags
-        "\U00002600-\U000026FF"  # miscellaneous symbols
-        "\U00002700-\U000027BF"  # dingbats
-        "\U0001F900-\U0001F9FF"  # supplemental symbols and pictographs
-        "\U0001FA00-\U0001FA6F"  # extended-A
-        "\U0001FA70-\U0001FAFF"  # extended-B
-        "\U00002300-\U000023FF"  # miscellaneous technical
-        "\U0001F004-\U0001F0CF"  # playing cards
-        "]+",
-        flags=re.UNICODE
-    )
-    text_no_emoji = emoji_pattern.sub('', text)
-    
-    # Remove punctuation and convert to lowercase
-    text_normalized = re.sub(r'[^\w\s]', '', text_no_emoji)
-    text_normalized = text_normalized.lower().strip()
-    
-    # Remove extra whitespace
-    text_normalized = re.sub(r'\s+', ' ', text_normalized)
-    
-    return text_normalized
+def generator_version() -> str:
+    """Digest of this script and the src modules, so code changes invalidate cached builds"""
+    sources = [os.path.abspath(__file__)]
+    for directory, _, names in sorted(os.walk(SRC_DIR)):
+        sources.extend(os.path.join(directory, name) for name in sorted(names) if name.endswith('.py'))
+    return source_digest(*sources)
 
 
 def calculate_similarity(text1: str, text2: str) -> float:
-    """Calculate similarity between two texts using SequenceMatcher"""
-    normalized1 = normalize_text(text1)
-    normalized2 = normalize_text(text2)
-    
-    if not normalized1 or not normalized2:
-        return 0.0
-    
-    return SequenceMatcher(None, normalized1, normalized2).ratio()
-
+    """Calculate similarity between two texts using SequenceMatcher on their normalized forms"""
+    return normalized_similarity(normalize_text(text1), normalize_text(text2))
 
-def has_emoji(text: str) -> bool:
-    """Check if text contains at least one emoji from the curated set"""
-    for emoji in EMOJI_SETS:
-        if emoji in text:
-            return True
-    return False
 
-
-def inject_emoji(text: str) -> str:
+def inject_emoji(text: str, rng: Optional[random.Random] = None) -> str:
     """Inject a random emoji at an appropriate position in the text if missing"""
+    rng = rng if rng is not None else random
     # Select emojis that are commonly used at the end
     common_emojis = ['😊', '✨', '💕', '🌸', '😄', '💖', '🥺', '😳']
-    emoji = random.choice(common_emojis)
+    emoji = rng.choice(common_emojis)
     
     # Try to inject before existing punctuation at the end
     if text.endswith('！') or text.endswith('~') or text.endswith('...'):
@@ -120,56 +84,249 @@ def check_length(text: str, min_len: int, max_len: int) -> bool:
     return min_len <= len(text) <= max_len
 
 
+def context_key(entry: Dict[str, str]) -> str:
+    """Similarity is only compared between entries sharing this instruction+input key"""
+    return f"{entry['instruction']}|{entry['input']}"
+
+
+def is_near_duplicate(index: NearDuplicateIndex, entry: Dict[str, str]) -> bool:
+    """
+    Check an entry against the kept entries of its context; entries that are
+    not near-duplicates are added to the index.
+    """
+    return index.check_and_add(context_key(entry), normalize_text(entry['output']))
+
+
 def find_duplicates(dataset: List[Dict[str, str]], threshold: float) -> Set[int]:
     """
     Find duplicate entries based on similarity threshold.
     Only compares entries within the same instruction+input context to allow
     variations across different scenarios.
+    An entry is removed when calculate_similarity with an earlier kept entry of
+    its context reaches the threshold. Candidates come from a MinHash-LSH index,
+    so only likely pairs are compared instead of every pair in a context.
     Returns set of indices to remove.
     """
-    to_remove = set()
-    
-    # Group entries by instruction+input
-    context_groups = {}
-    for idx, entry in enumerate(dataset):
-        context_key = f"{entry['instruction']}|{entry['input']}"
-        if context_key not in context_groups:
-            context_groups[context_key] = []
-        context_groups[context_key].append((idx, entry['output']))
-    
-    # Only check similarity within each context group
-    for context_key, entries in context_groups.items():
-        # Skip if only one entry in this context
-        if len(entries) <= 1:
+    index = NearDuplicateIndex(threshold)
+    return {idx for idx, entry in enumerate(dataset) if is_near_duplicate(index, entry)}
+
+
+# Streaming quality control stages, in pipeline order
+QC_STAGES = ('inject_emoji', 'length_filter', 'exact_dedup', 'near_dedup')
+
+
+def new_stage_counters() -> Dict[str, Dict[str, int]]:
+    """Per-stage counters: entries pulled in and passed on by each stage"""
+    counters = {stage: {'in': 0, 'out': 0} for stage in QC_STAGES}
+    counters['inject_emoji']['injected'] = 0
+    return counters
+
+
+def stage_stats(counters: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    """The quality_control_pipeline stats keys derived from per-stage counters"""
+    removed_duplicates = counters['near_dedup']['in'] - counters['near_dedup']['out']
+    return {
+        'total_generated': counters['inject_emoji']['in'],
+        'removed_duplicates': removed_duplicates,
+        'removed_exact_duplicates': counters['exact_dedup']['in'] - counters['exact_dedup']['out'],
+        'removed_length': counters['length_filter']['in'] - counters['length_filter']['out'],
+        'emoji_injected': counters['inject_emoji']['injected'],
+        'removed_no_emoji': 0,
+        # near_dedup is skipped when similarity dedup is off
+        'final_count': counters['exact_dedup']['out'] - removed_duplicates
+    }
+
+
+def inject_emoji_stage(
+    entries: Iterable[Dict[str, str]],
+    rng: Optional[random.Random] = None,
+    counter: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, str]]:
+    """Step 1: inject an emoji into outputs without one (entries are edited in place)"""
+    counter = counter if counter is not None else {'in': 0, 'out': 0, 'injected': 0}
+    for entry in entries:
+        counter['in'] += 1
+        if not has_emoji(entry['output']):
+            entry['output'] = inject_emoji(entry['output'], rng)
+            counter['injected'] += 1
+        counter['out'] += 1
+        yield entry
+
+
+def length_filter_stage(
+    entries: Iterable[Dict[str, str]],
+    config: Dict,
+    counter: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, str]]:
+    """Step 2: drop entries whose output length is outside the configured range"""
+    counter = counter if counter is not None else {'in': 0, 'out': 0}
+    min_len, max_len = config['min_output_length'], config['max_output_length']
+    for entry in entries:
+        counter['in'] += 1
+        if check_length(entry['output'], min_len, max_len):
+            counter['out'] += 1
+            yield entry
+
+
+def exact_dedup_stage(
+    entries: Iterable[Dict[str, str]],
+    seen: DigestSet,
+    counter: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, str]]:
+    """
+    Step 3: drop entries whose full instruction+input+output was already seen.
+    Emitted entries' digests are added to `seen`, so it grows with the kept entries
+    (8 bytes each in a DigestSet; see utils/digest_set.py for the collision odds).
+    """
+    counter = counter if counter is not None else {'in': 0, 'out': 0}
+    for entry in entries:
+        counter['in'] += 1
+        if not seen.add(entry_digest(entry)):
             continue
-            
-        # Check for duplicates within this context group
-        for i in range(len(entries)):
-            idx_i, output_i = entries[i]
-            if idx_i in to_remove:
-                continue
-                
-            for j in range(i + 1, len(entries)):
-                idx_j, output_j = entries[j]
-                if idx_j in to_remove:
-                    continue
-                
-                similarity = calculate_similarity(output_i, output_j)
-                if similarity >= threshold:
-                    # Mark the later entry for removal
-                    to_remove.add(idx_j)
-    
-    return to_remove
+        counter['out'] += 1
+        yield entry
+
+
+def near_dedup_stage(
+    entries: Iterable[Dict[str, str]],
+    near_index: NearDuplicateIndex,
+    counter: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, str]]:
+    """Step 4: drop near-duplicates of earlier kept entries of the same instruction+input context"""
+    counter = counter if counter is not None else {'in': 0, 'out': 0}
+    for entry in entries:
+        counter['in'] += 1
+        if is_near_duplicate(near_index, entry):
+            continue
+        counter['out'] += 1
+        yield entry
+
+
+def quality_control_stream(
+    entries: Iterable[Dict[str, str]],
+    config: Dict,
+    rng: Optional[random.Random] = None,
+    seen: Optional[DigestSet] = None,
+    near_index: Optional[NearDuplicateIndex] = None,
+    counters: Optional[Dict[str, Dict[str, int]]] = None
+) -> Iterator[Dict[str, str]]:
+    """
+    Quality control as a chain of generator stages:
+    inject_emoji → length_filter → exact_dedup → near_dedup.
+    
+    Entries are pulled one at a time, so any iterable (e.g. iter_dataset over
+    a JSONL file) can be checked without loading it; only the dedup state
+    (`seen` digests and `near_index`) grows, with the number of kept entries.
+    `counters` (see new_stage_counters) is updated as entries flow through.
+    The kept entries and rng draws are the same as quality_control_pipeline's.
+    """
+    if counters is None:
+        counters = new_stage_counters()
+    if seen is None:
+        seen = DigestSet()
+    
+    stream = inject_emoji_stage(entries, rng, counters['inject_emoji'])
+    stream = length_filter_stage(stream, config, counters['length_filter'])
+    stream = exact_dedup_stage(stream, seen, counters['exact_dedup'])
+    if config.get('similarity_dedup', True):
+        if near_index is None:
+            near_index = NearDuplicateIndex(config['similarity_threshold'])
+        stream = near_dedup_stage(stream, near_index, counters['near_dedup'])
+    return stream
+
+
+def quality_control_file(
+    input_path: str,
+    output_path: str,
+    config: Dict,
+    seed: int = 0,
+    fmt: str = 'jsonl'
+) -> Tuple[str, Dict[str, Dict[str, int]]]:
+    """
+    Stream quality control from a dataset file (any format iter_dataset reads)
+    into `output_path`, one entry at a time.
+    Emoji injection uses the same derived random stream as generate_dataset_with_qc.
+    Returns (actual output path, per-stage counters).
+    """
+    counters = new_stage_counters()
+    stream = quality_control_stream(
+        iter_dataset(input_path), config, random.Random(derive_seed(seed, "qc")), counters=counters
+    )
+    output_path, _ = write_dataset(stream, output_path, fmt)
+    return output_path, counters
+
+
+# Entries per task when quality control runs in a process pool
+DEFAULT_QC_CHUNK_SIZE = 2048
+
+
+def _entry_qc_features(
+    entry: Dict[str, str],
+    config: Dict,
+    near_index: Optional[NearDuplicateIndex]
+) -> Tuple[bool, Optional[bytes], Optional[str], Optional[Tuple[int, ...]]]:
+    """
+    The per-entry quality control results that don't depend on other entries:
+    (length ok, exact-dedup digest, normalized output, near-dedup signature).
+    Digest, normalized output and signature are None for entries failing the length check.
+    """
+    output = entry['output']
+    if not check_length(output, config['min_output_length'], config['max_output_length']):
+        return False, None, None, None
+    if near_index is None:
+        return True, entry_digest(entry), None, None
+    normalized = normalize_text(output)
+    return True, entry_digest(entry), normalized, near_index.signature(normalized)
+
+
+@lru_cache(maxsize=None)
+def _qc_signature_index(threshold: float, num_perm: int) -> NearDuplicateIndex:
+    """An empty index with the pipeline's parameters, used only to compute signatures for a chunk"""
+    return NearDuplicateIndex(threshold, num_perm=num_perm)
+
+
+def _qc_features_task(args: Tuple[List[Dict[str, str]], Dict, Optional[Tuple[float, int]]]) -> List[Optional[Tuple]]:
+    """
+    Stateless QC stages for one chunk: emoji check, length check, digest,
+    normalization and signature. None marks entries that need emoji injection,
+    which must happen in order because it draws from the QC random stream.
+    """
+    chunk, config, index_params = args
+    near_index = _qc_signature_index(*index_params) if index_params is not None else None
+    return [
+        _entry_qc_features(entry, config, near_index) if has_emoji(entry['output']) else None
+        for entry in chunk
+    ]
 
 
 def quality_control_pipeline(
     dataset: List[Dict[str, str]],
-    config: Dict
+    config: Dict,
+    rng: Optional[random.Random] = None,
+    seen: Optional[DigestSet] = None,
+    near_index: Optional[NearDuplicateIndex] = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_QC_CHUNK_SIZE
 ) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
     """
     Apply quality control checks to the dataset.
     Returns cleaned dataset and statistics.
+    `rng` drives emoji injection; the module-level random is used when omitted.
+    `seen` holds the digests of entries already emitted by earlier calls and
+    `near_index` the outputs they kept for near-duplicate checks, so a
+    dataset can be checked batch by batch with the same result as in one call.
+    
+    The stateless stages (emoji and length checks, digests, normalization,
+    signatures) run chunk by chunk, in `workers` processes when workers > 1.
+    Emoji injection, exact dedup and near dedup then run over the results in
+    dataset order, so the output and stats don't depend on the worker count.
+    A single worker (or a single chunk) runs quality_control_stream directly.
     """
+    if workers <= 1 or len(dataset) <= chunk_size:
+        counters = new_stage_counters()
+        cleaned_dataset = list(quality_control_stream(dataset, config, rng, seen, near_index, counters))
+        return cleaned_dataset, stage_stats(counters)
+    
     stats = {
         'total_generated': len(dataset),
         'removed_duplicates': 0,
@@ -180,43 +337,46 @@ def quality_control_pipeline(
         'final_count': 0
     }
     
-    # Step 1: Check and inject entries without emojis
-    for entry in dataset:
-        if not has_emoji(entry['output']):
-            # Try to inject emoji first
-            entry['output'] = inject_emoji(entry['output'])
-            stats['emoji_injected'] += 1
+    similarity_dedup = config.get('similarity_dedup', True)
+    if similarity_dedup and near_index is None:
+        near_index = NearDuplicateIndex(config['similarity_threshold'])
+    seen_entries = seen if seen is not None else DigestSet()
+    
+    # Workers compute signatures with the same parameters as near_index
+    index_params = (near_index.threshold, near_index.hasher.num_perm) if similarity_dedup else None
+    tasks = [
+        (dataset[start:start + chunk_size], config, index_params)
+        for start in range(0, len(dataset), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk_features = list(pool.map(_qc_features_task, tasks))
     
-    # Step 2: Remove entries that don't meet length requirements
     cleaned_dataset = []
-    for entry in dataset:
-        if check_length(
-            entry['output'],
-            config['min_output_length'],
-            config['max_output_length']
-        ):
-            cleaned_dataset.append(entry)
-        else:
+    for entry, features in zip(dataset, (item for chunk in chunk_features for item in chunk)):
+        # Step 1: Inject an emoji into entries without one
+        if features is None:
+            entry['output'] = inject_emoji(entry['output'], rng)
+            stats['emoji_injected'] += 1
+            features = _entry_qc_features(entry, config, near_index if similarity_dedup else None)
+        length_ok, digest, normalized, signature = features
+        
+        # Step 2: Remove entries that don't meet length requirements
+        if not length_ok:
             stats['removed_length'] += 1
-    
-    # Step 3: Remove exact duplicates first (for efficiency)
-    # Use full entry as key to allow same output in different contexts
-    seen_entries = set()
-    unique_dataset = []
-    for entry in cleaned_dataset:
-        entry_key = f"{entry['instruction']}|{entry['input']}|{entry['output']}"
-        if entry_key not in seen_entries:
-            seen_entries.add(entry_key)
-            unique_dataset.append(entry)
-        else:
+            continue
+        
+        # Step 3: Remove exact duplicates first (for efficiency)
+        # Use full entry as key to allow same output in different contexts
+        if not seen_entries.add(digest):
             stats['removed_exact_duplicates'] += 1
-    
-    cleaned_dataset = unique_dataset
-    
-    # Step 4: Skip similarity deduplication entirely to allow word variations
-    # Exact deduplication already ensures no identical entries
-    stats['removed_duplicates'] = 0
-    print(f"Similarity deduplication skipped to preserve word variations")
+            continue
+        
+        # Step 4: Remove near-duplicates within the same instruction+input context
+        if similarity_dedup and near_index.check_and_add(context_key(entry), normalized, signature):
+            stats['removed_duplicates'] += 1
+            continue
+        
+        cleaned_dataset.append(entry)
     
     stats['final_count'] = len(cleaned_dataset)
     
@@ -292,131 +452,94 @@ def generate_all_possible_samples() -> List[Dict[str, str]]:
     return all_samples
 
 
-def create_output_variation(base_output: str, variation_id: int) -> str:
+# Substitution tables and their compiled matchers come from the shared lexicon bundle
+# (data/lexicon/default.json), loaded once per process. Each matcher finds all candidate
+# spans in a single scan (leftmost-longest, non-overlapping).
+LEXICON = load_lexicon()
+WORD_SUBSTITUTIONS = LEXICON.word_substitutions
+TONE_PARTICLE_SUBSTITUTIONS = LEXICON.particle_substitutions
+HAPPY_EMOJI_SUBSTITUTIONS = LEXICON.happy_emoji_substitutions
+LOVE_EMOJI_SUBSTITUTIONS = LEXICON.love_emoji_substitutions
+ANY_EMOJI_SUBSTITUTIONS = LEXICON.any_emoji_substitutions
+WORD_MATCHER = LEXICON.word_matcher
+TONE_PARTICLE_MATCHER = LEXICON.particle_matcher
+HAPPY_EMOJI_MATCHER = LEXICON.happy_emoji_matcher
+LOVE_EMOJI_MATCHER = LEXICON.love_emoji_matcher
+ANY_EMOJI_MATCHER = LEXICON.any_emoji_matcher
+
+
+def _pick_substitutions(
+    text: str,
+    matcher: PhraseMatcher,
+    substitutions: Dict[str, List[str]],
+    rng,
+    limit: int = 1
+) -> List[Tuple[int, int, str]]:
+    """Replacement spans for the first `limit` distinct matches of `matcher` in text order"""
+    spans = matcher.first_occurrences(text)[:limit]
+    return [(start, end, rng.choice(substitutions[phrase])) for start, end, phrase in spans]
+
+
+def create_output_variation(
+    base_output: str,
+    variation_id: int,
+    rng: Optional[random.Random] = None
+) -> str:
     """
     Create variations by modifying word choice, tone particles, and emojis.
     This creates more diverse outputs that pass similarity checks.
+    Random choices are drawn from `rng` (the module-level random when omitted).
+    All replacement spans are located on the base output and the result is rebuilt once.
     """
-    # Lists of equivalent elements for substitution
-    happy_emojis = ['😊', '😄', '😃', '😁', '🥰', '😍', '🤗']
-    love_emojis = ['💕', '💖', '💗', '💓', '💝', '❤️', '💜']
-    sparkle_emojis = ['✨', '⭐', '🌟', '💫']
-    flower_emojis = ['🌸', '🌺', '🌻', '🌼', '🌷', '🌹']
-    
-    # Word/phrase substitutions for semantic diversity
-    word_substitutions = {
-        '加油': ['努力吧', '坚持下去', '继续加油', '奋斗', '拼搏'],
-        '开心': ['高兴', '快乐', '愉快', '欢喜', '乐呵'],
-        '辛苦': ['累了', '不容易', '费心了', '劳累', '不简单'],
-        '陪': ['陪伴', '陪着', '守护', '相伴', '一直在'],
-        '一起': ['一同', '共同', '一块儿', '一道', '同时'],
-        '好好': ['认真', '用心', '仔细', '好生', '妥善'],
-        '记得': ['要记住', '别忘了', '一定要', '千万', '务必'],
-        '想': ['思念', '惦记', '牵挂', '想念', '念'],
-        '照顾': ['关心', '爱护', '呵护', '看护', '照料'],
-        '担心': ['牵挂', '挂念', '操心', '忧心', '挂怀'],
-        '难过': ['伤心', '不开心', '郁闷', '难受', '忧伤'],
-        '厉害': ['优秀', '棒', '了不起', '出色', '很强'],
-        '相信': ['信任', '确信', '肯定', '深信', '坚信'],
-        '喜欢': ['爱', '喜爱', '中意', '钟意', '喜爱'],
-        '美好': ['温馨', '甜蜜', '幸福', '美妙', '愉悦'],
-        '温暖': ['温馨', '暖心', '贴心', '暖和', '温煦'],
-        '可爱': ['乖', '萌', '迷人', '甜美', '讨喜'],
-        '幸福': ['快乐', '开心', '美好', '欢乐', '满足'],
-        '永远': ['一直', '始终', '总是', '从来', '向来'],
-        '很': ['非常', '十分', '特别', '格外', '相当'],
-        '真': ['确实', '实在', '的确', '真的', '真是'],
-        '都': ['全都', '全', '皆', '通通', '一概'],
-        '会': ['将会', '定会', '一定会', '肯定会', '必定会'],
-        '要': ['需要', '得', '应该', '必须', '务必'],
-        '不要': ['别', '不可以', '不能', '千万别', '不可'],
-        '没关系': ['不要紧', '没事', '不碍事', '无妨', '不打紧'],
-        '太': ['过于', '超', '太过', '极其', '过分'],
-        '真的': ['确实', '实在', '的确', '真是', '确真'],
-        '给': ['为', '替', '帮', '给予', '送给'],
-    }
-    
-    # Tone particle variations
-    tone_particles = {
-        '呀': ['呀', '啊', '哇'],
-        '啦': ['啦', '哦', '呢'],
-        '呢': ['呢', '哦', '嘛'],
-        '哦': ['哦', '呢', '啦'],
-        '~': ['~', '！', '~'],
-    }
-    
-    output = base_output
+    rng = rng if rng is not None else random
     
     # Multiple variation strategies with emphasis on text changes
     strategies = variation_id % 10
     
     if strategies <= 3:
         # Word/phrase substitution (give this higher priority)
-        for original, alternatives in word_substitutions.items():
-            if original in output and len(alternatives) > 0:
-                replacement = random.choice(alternatives)
-                output = output.replace(original, replacement, 1)
-                break
+        replacements = _pick_substitutions(base_output, WORD_MATCHER, WORD_SUBSTITUTIONS, rng)
     
     elif strategies == 4:
         # Replace tone particles
-        for original, alternatives in tone_particles.items():
-            if original in output and len(alternatives) > 1:
-                replacement = random.choice([a for a in alternatives if a != original])
-                output = output.replace(original, replacement, 1)
-                break
+        replacements = _pick_substitutions(
+            base_output, TONE_PARTICLE_MATCHER, TONE_PARTICLE_SUBSTITUTIONS, rng
+        )
     
     elif strategies == 5:
         # Replace happy emojis
-        for emoji in happy_emojis:
-            if emoji in output:
-                replacement = random.choice([e for e in happy_emojis if e != emoji])
-                output = output.replace(emoji, replacement, 1)
-                break
+        replacements = _pick_substitutions(
+            base_output, HAPPY_EMOJI_MATCHER, HAPPY_EMOJI_SUBSTITUTIONS, rng
+        )
     
     elif strategies == 6:
         # Replace love emojis
-        for emoji in love_emojis:
-            if emoji in output:
-                replacement = random.choice([e for e in love_emojis if e != emoji])
-                output = output.replace(emoji, replacement, 1)
-                break
+        replacements = _pick_substitutions(
+            base_output, LOVE_EMOJI_MATCHER, LOVE_EMOJI_SUBSTITUTIONS, rng
+        )
     
     elif strategies == 7:
-        # Combine word and tone particle changes
-        for original, alternatives in word_substitutions.items():
-            if original in output:
-                replacement = random.choice(alternatives)
-                output = output.replace(original, replacement, 1)
-                break
-        for original, alternatives in tone_particles.items():
-            if original in output and len(alternatives) > 1:
-                replacement = random.choice([a for a in alternatives if a != original])
-                output = output.replace(original, replacement, 1)
-                break
+        # Combine word and tone particle changes (the two tables share no characters,
+        # so their spans never overlap)
+        replacements = (
+            _pick_substitutions(base_output, WORD_MATCHER, WORD_SUBSTITUTIONS, rng)
+            + _pick_substitutions(base_output, TONE_PARTICLE_MATCHER, TONE_PARTICLE_SUBSTITUTIONS, rng)
+        )
     
     elif strategies == 8:
         # Replace multiple words
-        replace_count = 0
-        for original, alternatives in word_substitutions.items():
-            if original in output and replace_count < 2:
-                replacement = random.choice(alternatives)
-                output = output.replace(original, replacement, 1)
-                replace_count += 1
-    
-    elif strategies == 9:
+        replacements = _pick_substitutions(
+            base_output, WORD_MATCHER, WORD_SUBSTITUTIONS, rng, limit=2
+        )
+    
+    else:
         # Comprehensive variation: words + tone + emojis
-        for original, alternatives in word_substitutions.items():
-            if original in output:
-                replacement = random.choice(alternatives)
-                output = output.replace(original, replacement, 1)
-                break
-        for emoji in happy_emojis + love_emojis:
-            if emoji in output:
-                all_emojis = happy_emojis + love_emojis
-                replacement = random.choice([e for e in all_emojis if e != emoji])
-                output = output.replace(emoji, replacement, 1)
-                break
+        replacements = (
+            _pick_substitutions(base_output, WORD_MATCHER, WORD_SUBSTITUTIONS, rng)
+            + _pick_substitutions(base_output, ANY_EMOJI_MATCHER, ANY_EMOJI_SUBSTITUTIONS, rng)
+        )
+    
+    output = PhraseMatcher.rewrite(base_output, replacements)
     
     # If output hasn't changed and variation_id > 0, force a change by adding suffix
     if output == base_output and variation_id > 0:
@@ -429,16 +552,56 @@ def create_output_variation(base_output: str, variation_id: int) -> str:
     return output
 
 
-def generate_expanded_samples(target_count: int) -> List[Dict[str, str]]:
+def expand_variation_round(base_samples: List[Dict[str, str]], variation_id: int, seed: int = 0) -> List[Dict[str, str]]:
     """
-    Generate an expanded set of samples by creating variations of base outputs.
-    Uses emoji, tone particle, and punctuation substitution to create diverse responses.
+    为所有基础样本生成第 variation_id 轮变体
+    
+    每一轮使用由 (seed, variation_id) 派生的独立随机数流，按基础样本顺序依次取数，
+    因此结果与在哪个进程、以什么顺序执行各轮无关，也无需为每条样本重新播种。
+    """
+    rng = random.Random(derive_seed(seed, "variation", variation_id))
+    varied_samples = []
+    for base_sample in base_samples:
+        varied_output = create_output_variation(base_sample['output'], variation_id, rng)
+        
+        # Only add if it's actually different
+        if varied_output != base_sample['output']:
+            varied_samples.append({
+                "instruction": base_sample["instruction"],
+                "input": base_sample["input"],
+                "output": varied_output
+            })
+    return varied_samples
+
+
+def _expand_variation_round_task(args: Tuple[List[Dict[str, str]], int, int]) -> List[Dict[str, str]]:
+    """进程池任务包装"""
+    return expand_variation_round(*args)
+
+
+def iter_expansion_rounds(
+    target_count: int,
+    seed: int = 0,
+    workers: int = 1,
+    start_round: int = 0,
+    generated: int = 0
+) -> Iterator[Tuple[int, List[Dict[str, str]]]]:
+    """
+    Yield (round_index, samples) for the base samples (round 0) followed by
+    one round of variations per variation id, stopping once target_count * 2
+    samples have been produced.
+    
+    With workers > 1 the variation rounds are computed in a process pool, a batch
+    of rounds at a time; rounds are yielded in order, so the output is identical
+    to the serial run. `start_round` and `generated` (samples yielded by the
+    earlier rounds) let a resumed run skip the rounds it already has.
     """
     base_samples = generate_all_possible_samples()
-    expanded_samples = base_samples.copy()
     
     if len(base_samples) >= target_count:
-        return base_samples
+        if start_round == 0:
+            yield 0, base_samples
+        return
     
     # Calculate how many variations we need per sample
     # Generate more than needed to account for deduplication
@@ -448,27 +611,50 @@ def generate_expanded_samples(target_count: int) -> List[Dict[str, str]]:
     print(f"基础样本: {len(base_samples)} 条")
     print(f"每个样本生成 {variations_needed} 个变体")
     
-    for variation_id in range(1, variations_needed + 1):
-        for base_sample in base_samples:
-            # Generate variation with different seed for more diversity
-            random.seed(hash((base_sample['output'], variation_id)))
-            varied_output = create_output_variation(base_sample['output'], variation_id)
+    if start_round == 0:
+        # Yield copies: quality control edits entries in place, and the
+        # later rounds must still see the original base outputs
+        yield 0, [dict(sample) for sample in base_samples]
+        generated = len(base_samples)
+    
+    limit = target_count * 2
+    variation_ids = list(range(max(start_round, 1), variations_needed + 1))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    
+    try:
+        batch_size = workers if pool is not None else 1
+        for start in range(0, len(variation_ids), batch_size):
+            batch_ids = variation_ids[start:start + batch_size]
+            batch = [(base_samples, variation_id, seed) for variation_id in batch_ids]
+            if pool is not None:
+                rounds = pool.map(_expand_variation_round_task, batch)
+            else:
+                rounds = map(_expand_variation_round_task, batch)
             
-            # Only add if it's actually different
-            if varied_output != base_sample['output']:
-                varied_sample = {
-                    "instruction": base_sample["instruction"],
-                    "input": base_sample["input"],
-                    "output": varied_output
-                }
-                expanded_samples.append(varied_sample)
-                
+            for variation_id, varied_samples in zip(batch_ids, rounds):
                 # Stop early if we have enough
-                if len(expanded_samples) >= target_count * 2:
-                    print(f"已生成 {len(expanded_samples)} 个样本（含变体）")
-                    return expanded_samples
-    
-    print(f"已生成 {len(expanded_samples)} 个样本（含变体）")
+                if generated + len(varied_samples) >= limit:
+                    yield variation_id, varied_samples[:limit - generated]
+                    print(f"已生成 {limit} 个样本（含变体）")
+                    return
+                generated += len(varied_samples)
+                yield variation_id, varied_samples
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    print(f"已生成 {generated} 个样本（含变体）")
+
+
+def generate_expanded_samples(target_count: int, seed: int = 0, workers: int = 1) -> List[Dict[str, str]]:
+    """
+    Generate an expanded set of samples by creating variations of base outputs.
+    Uses emoji, tone particle, and punctuation substitution to create diverse responses.
+    See iter_expansion_rounds for the round structure and worker handling.
+    """
+    expanded_samples = []
+    for _, samples in iter_expansion_rounds(target_count, seed=seed, workers=workers):
+        expanded_samples.extend(samples)
     return expanded_samples
 
 
@@ -899,7 +1085,11 @@ def generate_variations(
 
 def generate_dataset_with_qc(
     num_samples: int = 500,
-    config: Dict = None
+    config: Dict = None,
+    seed: int = 0,
+    workers: int = 1,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False
 ) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
     """
     生成虚拟女友聊天数据集并应用质量控制
@@ -908,6 +1098,15 @@ def generate_dataset_with_qc(
     combinations each with 5 outputs = 135 unique entries total, which is
     less than 500, we simply use all of them and return the maximum available.
     The QC ensures they meet length and emoji requirements.
+    
+    Variation rounds and the stateless quality control stages of large rounds
+    can be spread over `workers` processes; all randomness is derived from
+    `seed`, so the result does not depend on the worker count.
+    
+    Quality control runs round by round. With `checkpoint_dir` set, every round's
+    cleaned samples are written there as a part file together with a checkpoint
+    (QC random state, emitted-entry digests, stats); `resume=True` continues from
+    that checkpoint and gives the same dataset as an uninterrupted run.
     """
     if config is None:
         config = QC_CONFIG
@@ -923,28 +1122,99 @@ def generate_dataset_with_qc(
         'final_count': 0,
         'regeneration_rounds': 1
     }
+    qc_keys = ['removed_duplicates', 'removed_exact_duplicates', 'removed_length', 'emoji_injected', 'removed_no_emoji']
+    qc_stats = {key: 0 for key in qc_keys}
     
     print(f"\n{'='*60}")
     print(f"开始生成数据集 - 目标数量: {num_samples}")
     print(f"{'='*60}\n")
     
-    # 生成扩展的样本集（包括变体）
+    checkpoint = None
+    if checkpoint_dir is not None:
+        # 只记录决定输出内容的参数；进程数不影响结果，恢复时可以不同
+        checkpoint = RunCheckpoint(checkpoint_dir, {
+            "dataset_size": num_samples,
+            "seed": seed,
+            "config": config,
+            "catalog_fingerprint": catalog_fingerprint() if USE_CATALOG else None,
+            "lexicon": LEXICON.digest,
+            # 代码改动后不能把新旧生成器写出的分片拼在一起
+            "generator_version": generator_version()
+        })
+    
+    qc_rng = random.Random(derive_seed(seed, "qc"))
+    # 有检查点时摘要集合记录每轮新加入的摘要，检查点只追加这些摘要
+    seen = JournaledDigestSet() if checkpoint is not None else DigestSet()
+    near_index = NearDuplicateIndex(config['similarity_threshold'])
+    next_round = 0
+    generated = 0
+    complete = False
+    cleaned_dataset = []
+    
+    state = checkpoint.load() if checkpoint is not None and resume else None
+    if state is not None:
+        qc_rng = decode_rng_state(state["rng"])
+        seen = state["seen"]
+        next_round = state["next_round"]
+        generated = state["generated"]
+        complete = state["complete"]
+        qc_stats = state["stats"]
+        if config.get('similarity_dedup', True):
+            # 近重复索引由已写出的分片按原顺序重建，不保存在检查点中
+            for entry in checkpoint.iter_parts(next_round):
+                is_near_duplicate(near_index, entry)
+        print(f"从检查点恢复: 已完成 {next_round} 轮，已生成 {generated} 条样本")
+    elif checkpoint is not None:
+        checkpoint.clear()
+    
+    def checkpoint_state(done: bool) -> Dict:
+        return {
+            "next_round": next_round,
+            "generated": generated,
+            "complete": done,
+            "rng": encode_rng_state(qc_rng),
+            "seen": seen,
+            "stats": qc_stats
+        }
+    
+    # 逐轮生成样本（基础模板 + 表情变体）并应用质量控制
     print("生成样本（基础模板 + 表情变体）...")
-    all_possible_samples = generate_expanded_samples(num_samples)
-    print(f"生成样本总数: {len(all_possible_samples)} 条")
+    if not complete:
+        rounds = iter_expansion_rounds(num_samples, seed=seed, workers=workers,
+                                       start_round=next_round, generated=generated)
+        for round_index, samples in rounds:
+            generated += len(samples)
+            round_dataset, round_stats = quality_control_pipeline(
+                samples, config, qc_rng, seen, near_index, workers=workers
+            )
+            for key in qc_keys:
+                qc_stats[key] += round_stats[key]
+            next_round = round_index + 1
+            
+            if checkpoint is None:
+                cleaned_dataset.extend(round_dataset)
+            else:
+                checkpoint.write_part(round_index, round_dataset)
+                checkpoint.commit(checkpoint_state(False))
+        
+        if checkpoint is not None:
+            checkpoint.commit(checkpoint_state(True))
+    
+    if checkpoint is not None:
+        cleaned_dataset = list(checkpoint.iter_parts(next_round))
     
-    total_stats['total_generated'] = len(all_possible_samples)
+    print(f"生成样本总数: {generated} 条")
+    if config.get('similarity_dedup', True):
+        print(f"相似去重: 同一上下文内相似度 >= {config['similarity_threshold']} 的输出只保留第一条")
+        print(f"  LSH 候选{near_index.cascade.summary()}")
+    else:
+        print(f"相似去重已关闭")
     
-    # 应用质量控制
-    print(f"\n应用质量控制检查...")
-    cleaned_dataset, qc_stats = quality_control_pipeline(all_possible_samples, config)
+    total_stats['total_generated'] = generated
     
     # 更新统计信息
-    total_stats['removed_duplicates'] = qc_stats['removed_duplicates']
-    total_stats['removed_exact_duplicates'] = qc_stats['removed_exact_duplicates']
-    total_stats['removed_length'] = qc_stats['removed_length']
-    total_stats['emoji_injected'] = qc_stats['emoji_injected']
-    total_stats['removed_no_emoji'] = qc_stats['removed_no_emoji']
+    for key in qc_keys:
+        total_stats[key] = qc_stats[key]
     
     print(f"\n质量控制后: {len(cleaned_dataset)} 条样本")
     print(f"  - 精确去重: {qc_stats['removed_exact_duplicates']} 条")
@@ -954,19 +1224,89 @@ def generate_dataset_with_qc(
     
     # Use all available samples (or up to num_samples if we have more)
     final_count = min(len(cleaned_dataset), num_samples)
-    random.shuffle(cleaned_dataset)
+    random.Random(derive_seed(seed, "shuffle")).shuffle(cleaned_dataset)
     dataset = cleaned_dataset[:final_count]
     total_stats['final_count'] = len(dataset)
     
     if len(dataset) < num_samples:
         print(f"\n⚠️  注意: 可用样本 ({len(dataset)}) 少于目标数量 ({num_samples})")
         print(f"      已生成所有可用的唯一、高质量样本")
+        if config.get('similarity_dedup', True):
+            print(f"      相似去重（阈值 {config['similarity_threshold']}）限制了可用样本数，"
+                  f"需要更多数据可提高 --similarity-threshold 或使用 --no-similarity-dedup")
     else:
         print(f"\n✅ 成功生成目标数量！")
     
     return dataset, total_stats
 
 
+def run_quality_control_file(args, config: Dict):
+    """对 --qc-input 指定的数据集文件做流式质量控制并打印各阶段计数"""
+    output_path = args.qc_output
+    if output_path is None:
+        base = args.qc_input
+        for ext in ('.jsonl.gz', '.jsonl', '.json', '.parquet'):
+            if base.endswith(ext):
+                base = base[:-len(ext)]
+                break
+        output_path = base + '_qc.jsonl'
+    
+    print(f"流式质量控制: {args.qc_input} -> {output_path}")
+    output_path, counters = quality_control_file(args.qc_input, output_path, config, seed=args.seed)
+    
+    stage_names = {
+        'inject_emoji': '表情注入',
+        'length_filter': '长度过滤',
+        'exact_dedup': '精确去重',
+        'near_dedup': '相似去重'
+    }
+    for stage in QC_STAGES:
+        counter = counters[stage]
+        line = f"  - {stage_names[stage]}: 输入 {counter['in']} 条，输出 {counter['out']} 条"
+        if stage == 'inject_emoji':
+            line += f"，注入 {counter['injected']} 条"
+        print(line)
+    stats = stage_stats(counters)
+    print(f"✅ 已写出 {stats['final_count']} 条: {output_path}")
+
+
+def run_sharded_generation(args, output_format: str, cache: Optional[BuildCache], cache_key: Optional[str],
+                           build_params: Optional[Dict]):
+    """
+    --shards: 用 sharding.generate_sharded_dataset 在进程池中并行生成分片和清单
+    
+    各分片的种子由 --seed 派生，输出与 --workers 无关；数据直接从场景目录采样，
+    不经过变体扩充和质量控制，适合生成远超质量控制可用样本数的大规模数据集。
+    """
+    if cache is not None:
+        output_dir = cache.begin(cache_key)
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = os.path.join(args.output_dir, f"{args.output_prefix}_{timestamp}")
+    
+    print(f"\n并行分片生成: 模式 {args.mode}，{args.shards} 个分片，{args.workers} 个进程")
+    manifest = generate_sharded_dataset(
+        output_dir,
+        args.dataset_size,
+        seed=args.seed,
+        workers=args.workers,
+        prefix=args.output_prefix,
+        output_format=output_format,
+        mode=args.mode,
+        num_shards=args.shards
+    )
+    
+    if cache is not None:
+        cache.commit(cache_key, output_dir, build_params, stats={'final_count': manifest['total_count']})
+        output_dir = cache.path(cache_key)
+        print(f"📦 构建已缓存: {cache_key[:12]} (latest)")
+        if args.gc:
+            removed = cache.gc()
+            print(f"🧹 清理旧构建: {len(removed)} 个")
+    print(f"✅ 已写出 {manifest['total_count']} 条，{len(manifest['shards'])} 个分片及清单 manifest.json")
+    print(f"📁 输出目录: {output_dir}")
+
+
 def main():
     """主函数"""
     import os
@@ -975,7 +1315,8 @@ def main():
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='虚拟女友聊天数据集生成器 (带质量控制)')
     parser.add_argument('--dataset-size', type=int, default=500, 
-                        help='要生成的数据集大小 (默认: 500)')
+                        help='要生成的数据集大小上限；质量控制后的可用样本不足时输出全部可用样本 '
+                             '(默认相似去重下约350条，关闭后约4000条) (默认: 500)')
     parser.add_argument('--output-dir', type=str, default='data/train',
                         help='输出目录路径 (默认: data/train)')
     parser.add_argument('--output-prefix', type=str, default='girlfriend_chat_dataset',
@@ -986,9 +1327,52 @@ def main():
                         help=f'输出最大长度 (默认: {QC_CONFIG["max_output_length"]})')
     parser.add_argument('--similarity-threshold', type=float, default=QC_CONFIG['similarity_threshold'],
                         help=f'相似度阈值 (默认: {QC_CONFIG["similarity_threshold"]})')
+    parser.add_argument('--no-similarity-dedup', action='store_true',
+                        help='关闭相似去重（只做精确去重）')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='随机种子，相同种子生成相同数据集 (默认: 0)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并行生成变体和质量控制的进程数 (默认: 1)')
+    parser.add_argument('--shard-size', type=int, default=0,
+                        help='按此大小将质量控制后的输出切分为分片并生成清单（只切分写出，不并行生成），'
+                             '0表示输出单个文件 (默认: 0)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='并行分片生成：在 --workers 个进程中生成这么多个分片（派生种子，输出与进程数无关，'
+                             '带清单），直接从场景目录采样，不经过变体扩充和质量控制 (默认: 0，不使用)')
+    parser.add_argument('--mode', type=str, default='random', choices=SHARD_MODES,
+                        help='--shards 的生成模式：random / balanced / deterministic (默认: random)')
+    parser.add_argument('--format', type=str, default='json', choices=sorted(DATASET_FORMATS),
+                        help='输出格式；parquet 需要 pyarrow，未安装时退回 jsonl.gz (默认: json)')
+    parser.add_argument('--checkpoint-dir', type=str, default=None,
+                        help='检查点目录，每轮生成后在此保存进度 (默认: <output-dir>/.<output-prefix>.checkpoint)')
+    parser.add_argument('--resume', action='store_true',
+                        help='从检查点继续中断的任务，结果与一次性跑完一致')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='构建缓存目录 (默认: <output-dir>/builds)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='不使用构建缓存，按时间戳输出到 output-dir')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='忽略已有的缓存构建，重新生成')
+    parser.add_argument('--gc', action='store_true',
+                        help='构建完成后删除缓存中没有指针引用的旧构建')
+    parser.add_argument('--qc-input', type=str, default=None,
+                        help='不生成数据，而是对已有数据集文件逐条做质量控制（流式，不整体载入内存）')
+    parser.add_argument('--qc-output', type=str, default=None,
+                        help='--qc-input 的输出路径 (默认: 输入文件名加 _qc 后缀的 JSONL)')
     
     args = parser.parse_args()
     
+    # 更新配置
+    config = QC_CONFIG.copy()
+    config['min_output_length'] = args.min_length
+    config['max_output_length'] = args.max_length
+    config['similarity_threshold'] = args.similarity_threshold
+    config['similarity_dedup'] = not args.no_similarity_dedup
+    
+    if args.qc_input:
+        run_quality_control_file(args, config)
+        return
+    
     print("="*60)
     print("虚拟女友聊天数据集生成器 (带质量控制)")
     print("="*60)
@@ -996,32 +1380,106 @@ def main():
     print(f"质量控制配置:")
     print(f"  - 最小长度: {args.min_length}")
     print(f"  - 最大长度: {args.max_length}")
-    print(f"  - 相似度阈值: {args.similarity_threshold}")
+    print(f"  - 相似度阈值: {args.similarity_threshold}" + ("（相似去重已关闭）" if args.no_similarity_dedup else ""))
+    print(f"随机种子: {args.seed}")
+    print(f"并行进程数: {args.workers}")
     print("="*60)
     
-    # 更新配置
-    config = QC_CONFIG.copy()
-    config['min_output_length'] = args.min_length
-    config['max_output_length'] = args.max_length
-    config['similarity_threshold'] = args.similarity_threshold
-    
     # 生成数据集并应用质量控制
     target_samples = args.dataset_size
+    checkpoint_dir = args.checkpoint_dir or os.path.join(args.output_dir, f".{args.output_prefix}.checkpoint")
+    output_format = resolve_format(args.format)
+    
+    # 构建缓存：相同输入（目录内容、词库、配置、种子、生成器代码）直接复用已有产物
+    cache = None
+    if not args.no_cache:
+        cache = BuildCache(args.cache_dir or os.path.join(args.output_dir, "builds"))
+        build_params = {
+            "catalog_fingerprint": catalog_fingerprint() if USE_CATALOG else None,
+            "lexicon": LEXICON.digest,
+            "config": config,
+            "seed": args.seed,
+            "dataset_size": target_samples,
+            "format": output_format,
+            "shard_size": args.shard_size,
+            "output_prefix": args.output_prefix,
+            "generator_version": generator_version()
+        }
+        if args.shards > 0:
+            build_params.update(shards=args.shards, mode=args.mode)
+            # 分片生成不经过质量控制，输出与质量控制配置无关
+            build_params.pop("config")
+        cache_key = build_key(build_params)
+        record = None if args.rebuild else cache.lookup(cache_key)
+        if record is not None:
+            cache.set_ref(LATEST_REF, cache_key)
+            print(f"\n♻️  命中构建缓存: {cache_key[:12]}")
+            print(f"📁 构建目录: {cache.path(cache_key)}")
+            for item in record["files"]:
+                print(f"   - {item['file']} ({item['size']} bytes)")
+            print(f"📊 数据条数: {record['stats']['final_count']}")
+            if args.gc:
+                removed = cache.gc()
+                print(f"🧹 清理旧构建: {len(removed)} 个")
+            return
+    
+    if args.shards > 0:
+        run_sharded_generation(args, output_format, cache, cache_key if cache is not None else None,
+                               build_params if cache is not None else None)
+        return
     
     try:
-        dataset, stats = generate_dataset_with_qc(target_samples, config)
+        dataset, stats = generate_dataset_with_qc(
+            target_samples,
+            config,
+            seed=args.seed,
+            workers=args.workers,
+            checkpoint_dir=checkpoint_dir,
+            resume=args.resume
+        )
         
         # 创建输出目录
         output_dir = args.output_dir
         os.makedirs(output_dir, exist_ok=True)
         
-        # 生成文件名（包含时间戳）
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"{output_dir}/{args.output_prefix}_{timestamp}.json"
+        if cache is not None:
+            # 先写入临时目录，完成后原子地移动到以构建键命名的目录
+            staging_dir = cache.begin(cache_key)
+            output_base = os.path.join(staging_dir, args.output_prefix)
+        else:
+            # 生成文件名（包含时间戳）
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_base = f"{output_dir}/{args.output_prefix}_{timestamp}"
+        
+        if args.shard_size > 0:
+            # 切分为分片，并生成包含条数和哈希的清单
+            output_file = staging_dir if cache is not None else output_base
+            manifest = write_shards(
+                dataset,
+                output_file,
+                shard_size=args.shard_size,
+                prefix=args.output_prefix,
+                output_format=output_format,
+                seed=args.seed,
+                dataset_size=target_samples
+            )
+            print(f"\n📦 已写出 {len(manifest['shards'])} 个分片及清单 manifest.json")
+        else:
+            output_file = output_base + format_extension(output_format)
+            
+            # 按所选格式逐条写出（json格式与原先的 json.dump(indent=2) 输出一致）
+            output_file, _ = write_dataset(dataset, output_file, output_format)
+        
+        if cache is not None:
+            cache.commit(cache_key, staging_dir, build_params, stats=stats)
+            output_file = os.path.normpath(os.path.join(cache.path(cache_key), os.path.relpath(output_file, staging_dir)))
+            print(f"\n📦 构建已缓存: {cache_key[:12]} (latest)")
+            if args.gc:
+                removed = cache.gc()
+                print(f"🧹 清理旧构建: {len(removed)} 个")
         
-        # 保存为JSON文件
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        # 输出已完整写出，检查点不再需要
+        RunCheckpoint(checkpoint_dir, {}).clear()
         
         # 显示质量控制统计摘要
         print(f"\n{'='*60}")
@@ -1041,11 +1499,10 @@ def main():
         print("质量验证")
         print(f"{'='*60}")
         
-        # 验证没有重复
-        full_entries = [f"{e['instruction']}|{e['input']}|{e['output']}" for e in dataset]
-        unique_entries = set(full_entries)
-        uniqueness_pct = 100 * len(unique_entries) / len(full_entries) if len(full_entries) > 0 else 0
-        print(f"✅ 条目唯一性: {len(unique_entries)}/{len(full_entries)} ({uniqueness_pct:.1f}%)")
+        # 验证没有重复（按条目摘要计数，不保存拼接后的完整文本）
+        unique_entries = DigestSet(entry_digest(e) for e in dataset)
+        uniqueness_pct = 100 * len(unique_entries) / len(dataset) if len(dataset) > 0 else 0
+        print(f"✅ 条目唯一性: {len(unique_entries)}/{len(dataset)} ({uniqueness_pct:.1f}%)")
         
         # Also check output uniqueness for information
         outputs = [entry['output'] for entry in dataset]
@@ -1067,25 +1524,19 @@ def main():
         emoji_valid = sum(1 for entry in dataset if has_emoji(entry['output']))
         print(f"✅ 包含表情符号: {emoji_valid}/{len(dataset)} ({100*emoji_valid/len(dataset):.1f}%)")
         
-        # 验证相似度
-        print(f"\n检查相似度...")
-        max_similarity = 0.0
-        similar_pairs = 0
-        sample_size = min(100, len(dataset))  # Sample to avoid O(n^2) for large datasets
-        import random as rand
-        sampled_indices = rand.sample(range(len(dataset)), sample_size)
-        
-        for idx, i in enumerate(sampled_indices):
-            for j in sampled_indices[idx + 1:]:
-                entry_i = f"{dataset[i]['instruction']}|{dataset[i]['input']}|{dataset[i]['output']}"
-                entry_j = f"{dataset[j]['instruction']}|{dataset[j]['input']}|{dataset[j]['output']}"
-                sim = calculate_similarity(entry_i, entry_j)
-                max_similarity = max(max_similarity, sim)
-                if sim >= QC_CONFIG['similarity_threshold']:
-                    similar_pairs += 1
-        
-        print(f"✅ 最高相似度 (抽样{sample_size}条): {max_similarity:.3f} (阈值: {QC_CONFIG['similarity_threshold']})")
-        print(f"✅ 高相似度对数: {similar_pairs}")
+        # 验证相似度：对全部数据做 MinHash-LSH 近邻查找（同一 instruction 内）
+        print(f"\n检查相似度（全量近邻审计）...")
+        threshold = config['similarity_threshold']
+        # 阈值不高于默认 floor 时，把 floor 降到阈值，才能统计到全部达到阈值的文本对
+        audit_floor = min(DEFAULT_AUDIT_FLOOR, threshold) if threshold > 0 else DEFAULT_AUDIT_FLOOR
+        audit = audit_similarity(
+            dataset, floor=audit_floor, threshold=threshold if threshold >= audit_floor else None
+        )
+        print(f"✅ {audit.summary()} (阈值: {threshold})")
+        print(f"   近邻相似度分布: " + ", ".join(
+            f"{label}: {count}" for label, count in audit.histogram().items() if count
+        ))
+        print(f"   完整报告（每个 instruction 最相似的文本对）: python scripts/audit_similarity.py <数据集文件>")
         
         print(f"\n{'='*60}")
         print(f"✨ 数据集生成完成！")
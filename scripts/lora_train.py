@@ -12,7 +12,7 @@ import evaluate
 # 配置参数
 model_path = "./models"  # 从项目根目录的 models 目录加载基础模型
 output_dir = "./models/qwen-ai-girlfriend-lora"
-dataset_path = "./data/train/girlfriend_chat_dataset_20251117_055552.json"  # 2000条训练数据
+dataset_path = "./data/train/girlfriend_chat_dataset_20251117_055552.json"  # 2000条训练数据（也支持 .jsonl / .jsonl.gz / .parquet）
 
 print("加载模型和tokenizer...")
 tokenizer = AutoTokenizer.from_pretrained(model_path, trust_remote_code=True)
@@ -96,8 +96,16 @@ def preprocess_function(examples):
     return tokenized
 
 
+def load_training_dataset(path):
+    """按扩展名加载训练数据，支持 .json / .jsonl / .jsonl.gz / .parquet"""
+    if path.endswith('.parquet'):
+        return load_dataset('parquet', data_files=path)
+    # json 构建器可以直接读取 JSON 数组、JSONL，并按扩展名自动解压 .gz
+    return load_dataset('json', data_files=path)
+
+
 # 加载并分割数据
-dataset = load_dataset('json', data_files=dataset_path)
+dataset = load_training_dataset(dataset_path)
 
 # 对小数据集进行训练/验证分割
 if len(dataset['train']) > 100:  # 确保有足够数据分割
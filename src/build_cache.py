@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据集构建缓存
+以决定输出内容的全部输入（场景目录内容、质量控制配置、种子、生成器版本等）的哈希作为键，
+把每次构建的产物保存在以键命名的目录中。相同输入再次构建时直接返回已有产物。
+
+目录结构:
+    <root>/<key>/            构建产物（数据集文件或分片目录）以及 build.json
+    <root>/refs/<name>       指针文件，内容为构建键；"latest" 指向最近一次构建
+    <root>/.tmp-*            构建中的临时目录，完成后原子地重命名为 <root>/<key>
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+from sharding import file_sha256
+
+
+BUILD_RECORD_FILENAME = "build.json"
+LATEST_REF = "latest"
+# 临时目录超过这个时间（秒）没有修改时视为遗留，即使记录的进程号仍然存在（可能已被其他进程复用）
+STALE_STAGING_SECONDS = 7 * 24 * 3600
+
+
+def _process_alive(pid: int) -> bool:
+    """进程是否仍在运行；无法判断时按仍在运行处理"""
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        # Windows 上 os.kill 会结束目标进程，只能依靠过期时间判断
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在但属于其他用户
+        return True
+    return True
+
+
+def build_key(params: Dict[str, Any]) -> str:
+    """
+    计算构建键
+
+    Args:
+        params: 决定构建结果的参数，必须可JSON序列化
+
+    Returns:
+        参数规范化JSON的SHA-256十六进制摘要
+    """
+    canonical = json.dumps(params, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def source_digest(*paths: str) -> str:
+    """
+    计算若干源文件内容的摘要，作为生成器版本的一部分，代码改动后旧缓存自动失效
+
+    Returns:
+        SHA-256十六进制摘要的前16位
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\x1f')
+    return digest.hexdigest()[:16]
+
+
+class BuildCache:
+    """内容寻址的构建缓存目录"""
+
+    def __init__(self, root: str):
+        """
+        初始化缓存
+
+        Args:
+            root: 缓存根目录，不存在时自动创建
+        """
+        self.root = root
+        self.refs_dir = os.path.join(root, "refs")
+
+    def path(self, key: str) -> str:
+        """构建产物目录"""
+        return os.path.join(self.root, key)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查找已完成的构建
+
+        Returns:
+            构建记录（build.json 的内容），不存在时返回None
+        """
+        record_path = os.path.join(self.path(key), BUILD_RECORD_FILENAME)
+        if not os.path.exists(record_path):
+            return None
+        with open(record_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def begin(self, key: str) -> str:
+        """
+        开始一次构建
+
+        Returns:
+            临时目录路径，产物写在这里，完成后调用 commit
+        """
+        staging = os.path.join(self.root, f".tmp-{key}-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        return staging
+
+    def commit(self, key: str, staging: str, params: Dict[str, Any], **extra) -> Dict[str, Any]:
+        """
+        完成构建：写出构建记录，把临时目录原子地重命名为构建目录，并更新 latest 指针
+
+        Args:
+            key: 构建键
+            staging: begin 返回的临时目录
+            params: 构建参数（写入记录，便于排查）
+            **extra: 额外写入记录的字段（如统计信息）
+
+        Returns:
+            构建记录
+        """
+        files = []
+        for directory, _, names in os.walk(staging):
+            for name in names:
+                path = os.path.join(directory, name)
+                files.append({
+                    "file": os.path.relpath(path, staging),
+                    "size": os.path.getsize(path),
+                    "sha256": file_sha256(path)
+                })
+        files.sort(key=lambda item: item["file"])
+
+        record = {"key": key, "params": params, "files": files, **extra}
+        with open(os.path.join(staging, BUILD_RECORD_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+
+        target = self.path(key)
+        if os.path.exists(target):
+            # 另一个进程已经完成了相同的构建，内容相同，保留已有的即可
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, target)
+        self.set_ref(LATEST_REF, key)
+        return record
+
+    def set_ref(self, name: str, key: str):
+        """原子地更新指针"""
+        os.makedirs(self.refs_dir, exist_ok=True)
+        path = os.path.join(self.refs_dir, name)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(key + '\n')
+        os.replace(path + ".tmp", path)
+
+    def get_ref(self, name: str = LATEST_REF) -> Optional[str]:
+        """读取指针指向的构建键，不存在时返回None"""
+        path = os.path.join(self.refs_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+
+    def builds(self) -> List[str]:
+        """全部已完成构建的键"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, BUILD_RECORD_FILENAME))
+        )
+
+    def _staging_abandoned(self, name: str, stale_after: float) -> bool:
+        """
+        临时目录 .tmp-<key>-<pid> 是否为中断构建的遗留：
+        创建它的进程已不存在，或目录超过 stale_after 秒没有修改
+        """
+        try:
+            pid = int(name.rsplit("-", 1)[1])
+        except (IndexError, ValueError):
+            pid = 0
+        if pid == os.getpid():
+            return False
+        if not _process_alive(pid):
+            return True
+        try:
+            return time.time() - os.path.getmtime(os.path.join(self.root, name)) > stale_after
+        except OSError:
+            return False
+
+    def gc(self, keep: Optional[List[str]] = None, stale_after: float = STALE_STAGING_SECONDS) -> List[str]:
+        """
+        删除没有任何指针引用的构建，以及中断构建遗留的临时目录
+
+        同一缓存上正在进行的其他构建的临时目录会被保留，见 _staging_abandoned。
+
+        Args:
+            keep: 额外保留的构建键
+            stale_after: 进程仍存在时，临时目录超过多少秒未修改才视为遗留
+
+        Returns:
+            被删除的构建键
+        """
+        referenced = set(keep or [])
+        if os.path.isdir(self.refs_dir):
+            for name in os.listdir(self.refs_dir):
+                if not name.endswith(".tmp"):
+                    referenced.add(self.get_ref(name))
+
+        removed = []
+        for key in self.builds():
+            if key not in referenced:
+                shutil.rmtree(self.path(key))
+                removed.append(key)
+
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            if name.startswith(".tmp-") and self._staging_abandoned(name, stale_after):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return removed
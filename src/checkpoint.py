@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成任务检查点
+长时间的生成任务按轮次推进，每完成一轮就把该轮的结果写成一个分片文件，
+并原子地更新检查点（随机数流状态、已输出条目的摘要集合、统计信息）。
+中断后可以从最后一个检查点继续，结果与一次性跑完完全一致。
+
+摘要集合以8字节键追加写入 seen.bin，每轮只写新加入的摘要；checkpoint.json 记录有效的键数，
+中断在追加之后、提交之前时，文件末尾多出的键在恢复时被截掉。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from dataset_io import iter_jsonl, write_jsonl
+from utils.digest_set import DEFAULT_CAPACITY, DIGEST_BYTES, DigestSet
+
+
+CHECKPOINT_FILENAME = "checkpoint.json"
+SEEN_FILENAME = "seen.bin"
+
+
+def entry_digest(entry: Dict[str, str]) -> bytes:
+    """
+    计算条目（instruction + input + output）的摘要，用作精确去重的键
+
+    Returns:
+        16字节摘要
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(entry["instruction"].encode('utf-8'))
+    digest.update(b'\x1f')
+    digest.update(entry["input"].encode('utf-8'))
+    digest.update(b'\x1f')
+    digest.update(entry["output"].encode('utf-8'))
+    return digest.digest()
+
+
+class JournaledDigestSet(DigestSet):
+    """记录上次保存以来新加入的摘要的 DigestSet，检查点只需追加这些摘要"""
+
+    def __init__(self, digests: Iterable[bytes] = (), capacity: int = DEFAULT_CAPACITY):
+        """
+        Args:
+            digests: 初始摘要（视为已保存，不计入待写出的摘要）
+            capacity: 初始槽位数
+        """
+        self._journal = array('Q')
+        super().__init__(digests, capacity)
+        self._journal = array('Q')
+
+    def add(self, digest: bytes) -> bool:
+        added = super().add(digest)
+        if added:
+            self._journal.append(int.from_bytes(digest[:DIGEST_BYTES], 'big'))
+        return added
+
+    def drain(self) -> bytes:
+        """取出待写出的摘要（按加入顺序，每个8字节大端序）并清空记录"""
+        journal, self._journal = self._journal, array('Q')
+        if sys.byteorder == 'little':
+            journal.byteswap()
+        return journal.tobytes()
+
+
+class RunCheckpoint:
+    """管理一个生成任务的检查点目录"""
+
+    def __init__(self, directory: str, params: Dict[str, Any]):
+        """
+        初始化检查点
+
+        Args:
+            directory: 检查点目录（分片文件和 checkpoint.json 都写在这里）
+            params: 决定生成结果的全部参数（种子、目标数量、质量控制配置等），
+                    恢复时必须与保存时一致
+        """
+        self.directory = directory
+        self.params = params
+        self.path = os.path.join(directory, CHECKPOINT_FILENAME)
+        self.seen_path = os.path.join(directory, SEEN_FILENAME)
+
+    def part_path(self, index: int) -> str:
+        """第 index 轮结果的分片文件路径"""
+        return os.path.join(self.directory, f"part-{index:05d}.jsonl")
+
+    def exists(self) -> bool:
+        """是否存在可恢复的检查点"""
+        return os.path.exists(self.path)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        读取检查点
+
+        Returns:
+            保存的状态（"seen" 恢复为 JournaledDigestSet）；不存在检查点时返回None
+
+        Raises:
+            ValueError: 检查点的任务参数与当前参数不一致
+        """
+        if not self.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+
+        # 参数经过一次JSON往返后再比较，避免元组/列表等类型差异
+        params = json.loads(json.dumps(self.params))
+        if checkpoint["params"] != params:
+            changed = sorted(
+                key for key in set(params) | set(checkpoint["params"])
+                if params.get(key) != checkpoint["params"].get(key)
+            )
+            raise ValueError(f"检查点参数与当前任务不一致，无法恢复: {', '.join(changed)}")
+
+        state = checkpoint["state"]
+        count = state.pop("seen_count")
+        size = count * DIGEST_BYTES
+        # 截掉提交前中断时多追加的摘要，之后的追加从有效末尾开始
+        with open(self.seen_path, 'r+b') as f:
+            data = f.read(size)
+            f.truncate(size)
+        if len(data) != size:
+            raise ValueError(f"检查点摘要文件不完整: 需要 {count} 个摘要，只有 {len(data) // DIGEST_BYTES} 个")
+        state["seen"] = JournaledDigestSet(
+            (data[pos:pos + DIGEST_BYTES] for pos in range(0, size, DIGEST_BYTES)), capacity=count * 2
+        )
+        return state
+
+    def write_part(self, index: int, entries: Iterable[Dict[str, str]]) -> int:
+        """
+        写出一轮的结果分片（先写临时文件再替换，中断时不会留下半个分片）
+
+        Returns:
+            写入的条数
+        """
+        path = self.part_path(index)
+        count = write_jsonl(entries, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return count
+
+    def iter_parts(self, count: int) -> Iterator[Dict[str, str]]:
+        """按顺序读取前 count 轮的结果分片"""
+        for index in range(count):
+            yield from iter_jsonl(self.part_path(index))
+
+    def commit(self, state: Dict[str, Any]):
+        """
+        原子地保存检查点
+
+        Args:
+            state: 可JSON序列化的状态；其中 "seen" 为摘要集合（JournaledDigestSet），
+                   只把上次提交以来新加入的摘要追加到 seen.bin
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        state = dict(state)
+        seen = state.pop("seen")
+        with open(self.seen_path, 'ab') as f:
+            f.write(seen.drain())
+        state["seen_count"] = len(seen)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"params": self.params, "state": state}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """任务完成后删除检查点目录"""
+        shutil.rmtree(self.directory, ignore_errors=True)
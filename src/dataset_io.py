@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据集读写工具
+逐条写出/读取数据集，内存占用与数据集大小无关。
+
+支持的格式（可通过 register_format 扩展）:
+    json      - 缩进为2的JSON数组（与 json.dump(indent=2) 输出逐字节一致）
+    jsonl     - 每行一条JSON
+    jsonl.gz  - gzip压缩的JSONL（固定文件头时间戳，相同内容输出逐字节一致）
+    parquet   - 列式存储，需要 pyarrow；未安装时自动退回 jsonl.gz
+"""
+
+import gzip
+import json
+import os
+import warnings
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+
+class JsonlWriter:
+    """逐行写出JSONL数据的写入器，每条数据写完即释放"""
+
+    def __init__(self, path: str):
+        """
+        初始化写入器
+
+        Args:
+            path: 输出文件路径，父目录不存在时自动创建
+        """
+        self.path = path
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = self._open(path)
+
+    def _open(self, path: str):
+        """打开底层文件"""
+        return open(path, 'w', encoding='utf-8')
+
+    def write(self, entry: Dict[str, str]):
+        """写入一条数据"""
+        self._file.write(json.dumps(entry, ensure_ascii=False))
+        self._file.write('\n')
+        self.count += 1
+
+    def write_all(self, entries: Iterable[Dict[str, str]]) -> int:
+        """
+        写入一个数据迭代器中的全部数据
+
+        Returns:
+            本次写入的条数
+        """
+        start = self.count
+        for entry in entries:
+            self.write(entry)
+        return self.count - start
+
+    def close(self):
+        """关闭文件"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GzipJsonlWriter(JsonlWriter):
+    """写出gzip压缩的JSONL数据"""
+
+    def _open(self, path: str):
+        # 文件头中不记录文件名和修改时间，保证相同内容的输出逐字节一致
+        raw = open(path, 'wb')
+        self._raw = raw
+        compressed = gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0)
+        return _TextAdapter(compressed)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            self._raw.close()
+
+
+class _TextAdapter:
+    """将字符串写入编码为UTF-8后转交给二进制文件对象"""
+
+    def __init__(self, binary_file):
+        self._binary = binary_file
+
+    @property
+    def closed(self) -> bool:
+        return self._binary.closed
+
+    def write(self, text: str):
+        self._binary.write(text.encode('utf-8'))
+
+    def close(self):
+        self._binary.close()
+
+
+class JsonArrayWriter(JsonlWriter):
+    """逐条写出缩进为2的JSON数组，输出与 json.dump(dataset, indent=2) 一致"""
+
+    def write(self, entry: Dict[str, str]):
+        self._file.write('[\n  ' if self.count == 0 else ',\n  ')
+        self._file.write(json.dumps(entry, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.write('[]' if self.count == 0 else '\n]')
+            self._file.close()
+
+
+class ParquetWriter:
+    """按行组批量写出Parquet文件（需要 pyarrow）"""
+
+    def __init__(self, path: str, row_group_size: int = 10000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = path
+        self.count = 0
+        self.row_group_size = row_group_size
+        self._schema = pa.schema([
+            ("instruction", pa.string()),
+            ("input", pa.string()),
+            ("output", pa.string()),
+        ])
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._columns = {name: [] for name in self._schema.names}
+        self._closed = False
+
+    def _flush(self):
+        if self._columns["output"]:
+            table = self._pa.table(self._columns, schema=self._schema)
+            self._writer.write_table(table)
+            self._columns = {name: [] for name in self._schema.names}
+
+    def write(self, entry: Dict[str, str]):
+        for name, column in self._columns.items():
+            column.append(entry[name])
+        self.count += 1
+        if len(self._columns["output"]) >= self.row_group_size:
+            self._flush()
+
+    def write_all(self, entries: Iterable[Dict[str, str]]) -> int:
+        start = self.count
+        for entry in entries:
+            self.write(entry)
+        return self.count - start
+
+    def close(self):
+        if not self._closed:
+            self._flush()
+            self._writer.close()
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# 格式名 -> (文件扩展名, 写入器工厂)
+DATASET_FORMATS: Dict[str, Tuple[str, Callable]] = {
+    "json": (".json", JsonArrayWriter),
+    "jsonl": (".jsonl", JsonlWriter),
+    "jsonl.gz": (".jsonl.gz", GzipJsonlWriter),
+    "parquet": (".parquet", ParquetWriter),
+}
+
+
+def register_format(name: str, extension: str, writer_factory: Callable):
+    """
+    注册新的数据集输出格式
+
+    Args:
+        name: 格式名（命令行 --format 使用的名字）
+        extension: 文件扩展名（含点号）
+        writer_factory: 以输出路径为参数、返回写入器的可调用对象
+    """
+    DATASET_FORMATS[name] = (extension, writer_factory)
+
+
+def resolve_format(fmt: str) -> str:
+    """
+    检查格式是否可用，不可用的可选格式退回到标准库实现
+
+    Returns:
+        实际使用的格式名
+    """
+    if fmt not in DATASET_FORMATS:
+        raise ValueError(f"不支持的数据集格式: {fmt}，可选: {', '.join(DATASET_FORMATS)}")
+    if fmt == "parquet" and not _parquet_available():
+        warnings.warn("未安装 pyarrow，parquet 格式退回为 jsonl.gz")
+        return "jsonl.gz"
+    return fmt
+
+
+def format_extension(fmt: str) -> str:
+    """格式对应的文件扩展名"""
+    return DATASET_FORMATS[fmt][0]
+
+
+def with_format_extension(path: str, fmt: str) -> str:
+    """将路径的扩展名替换为指定格式的扩展名"""
+    for extension, _ in sorted(DATASET_FORMATS.values(), key=lambda item: -len(item[0])):
+        if path.endswith(extension):
+            path = path[:-len(extension)]
+            break
+    return path + format_extension(fmt)
+
+
+def open_dataset_writer(path: str, fmt: str = "jsonl"):
+    """
+    打开指定格式的写入器
+
+    Args:
+        path: 输出路径（应已带有 format_extension(fmt) 扩展名）
+        fmt: 格式名，应先经过 resolve_format
+
+    Returns:
+        支持 write / write_all / close 和上下文管理的写入器
+    """
+    return DATASET_FORMATS[fmt][1](path)
+
+
+def write_dataset(
+    entries: Iterable[Dict[str, str]],
+    path: str,
+    fmt: str = "jsonl"
+) -> Tuple[str, int]:
+    """
+    以指定格式逐条写出数据流
+
+    不可用的可选格式会退回到标准库格式，此时输出路径的扩展名也会随之调整。
+
+    Returns:
+        (实际输出路径, 写入条数)
+    """
+    actual_fmt = resolve_format(fmt)
+    if actual_fmt != fmt:
+        path = with_format_extension(path, actual_fmt)
+    with open_dataset_writer(path, actual_fmt) as writer:
+        writer.write_all(entries)
+    return path, writer.count
+
+
+def write_jsonl(entries: Iterable[Dict[str, str]], path: str) -> int:
+    """
+    将数据流写入JSONL文件
+
+    Args:
+        entries: 数据迭代器（可以是生成器）
+        path: 输出文件路径
+
+    Returns:
+        写入的条数
+    """
+    with JsonlWriter(path) as writer:
+        return writer.write_all(entries)
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, str]]:
+    """逐行读取JSONL文件，跳过空行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict[str, str]]:
+    """
+    增量解析顶层为数组的JSON文件，逐个产出数组元素
+
+    文件按块读取，已解析的部分会被丢弃，因此内存占用只与单条数据大小有关。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            # 跳过空白和分隔符
+            while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+                pos += 1
+
+            if pos >= len(buffer):
+                if eof:
+                    raise ValueError(f"JSON数组不完整: {path}")
+                buffer = f.read(chunk_size)
+                pos = 0
+                eof = not buffer
+                continue
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"文件顶层不是JSON数组: {path}")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # 解析失败或恰好解析到缓冲区末尾（元素可能被截断）时读入更多数据再试
+            if end is None or (end == len(buffer) and not eof):
+                more = f.read(chunk_size)
+                if not more:
+                    if end is None:
+                        raise ValueError(f"JSON数组不完整: {path}")
+                    eof = True
+                else:
+                    buffer = buffer[pos:] + more
+                    pos = 0
+                    continue
+
+            yield obj
+            pos = end
+
+
+def iter_jsonl_gz(path: str) -> Iterator[Dict[str, str]]:
+    """逐行读取gzip压缩的JSONL文件"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_parquet(path: str, batch_size: int = 10000) -> Iterator[Dict[str, str]]:
+    """按批读取Parquet文件（需要 pyarrow）"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(f"读取 {path} 需要安装 pyarrow") from e
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+def iter_dataset(path: str) -> Iterator[Dict[str, str]]:
+    """
+    逐条读取数据集文件，支持JSON、JSONL、JSONL.GZ和Parquet格式
+
+    JSON格式支持顶层数组（增量解析），以及 save_dataset(include_metadata=True)
+    写出的 {"dataset": [...], "metadata": {...}} 结构。
+    """
+    if path.endswith('.jsonl'):
+        yield from iter_jsonl(path)
+        return
+    if path.endswith('.jsonl.gz'):
+        yield from iter_jsonl_gz(path)
+        return
+    if path.endswith('.parquet'):
+        yield from iter_parquet(path)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(1024).lstrip()
+
+    if head.startswith('['):
+        yield from iter_json_array(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        yield from data.get("dataset", data.get("data", []))
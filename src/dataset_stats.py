@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据集统计
+以在线累加的方式单遍计算数据集统计信息，可以直接处理JSON/JSONL文件，
+并支持合并多个分片的部分结果
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from dataset_io import iter_dataset
+from utils.emoji import has_emoji
+
+
+class DatasetStatistics:
+    """数据集统计累加器：逐条添加数据，单遍得到全部统计结果"""
+
+    def __init__(self, bucket_size: int = 20):
+        """
+        初始化累加器
+
+        Args:
+            bucket_size: 长度直方图的桶宽度（字符数）
+        """
+        self.bucket_size = bucket_size
+        self.total = 0
+        self.instruction_counts: Dict[str, int] = {}
+        self.emoji_count = 0
+        self.empty_input_count = 0
+        self.output_length_sum = 0
+        self.output_length_histogram: Dict[int, int] = {}
+        self.input_length_histogram: Dict[int, int] = {}
+
+    def add(self, entry: Dict[str, str]):
+        """添加一条数据"""
+        instruction = entry["instruction"]
+        output = entry["output"]
+        input_text = entry["input"]
+
+        self.total += 1
+        self.instruction_counts[instruction] = self.instruction_counts.get(instruction, 0) + 1
+        if has_emoji(output):
+            self.emoji_count += 1
+        if not input_text:
+            self.empty_input_count += 1
+
+        output_length = len(output)
+        self.output_length_sum += output_length
+        bucket = output_length // self.bucket_size
+        self.output_length_histogram[bucket] = self.output_length_histogram.get(bucket, 0) + 1
+        bucket = len(input_text) // self.bucket_size
+        self.input_length_histogram[bucket] = self.input_length_histogram.get(bucket, 0) + 1
+
+    def update(self, entries: Iterable[Dict[str, str]]) -> "DatasetStatistics":
+        """添加一批数据（可以是任意迭代器），返回自身以便链式调用"""
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def merge(self, other: "DatasetStatistics") -> "DatasetStatistics":
+        """
+        合并另一个累加器的部分结果（例如来自其他分片）
+
+        Returns:
+            自身，以便链式调用
+        """
+        if other.bucket_size != self.bucket_size:
+            raise ValueError(f"直方图桶宽度不一致: {self.bucket_size} != {other.bucket_size}")
+
+        self.total += other.total
+        self.emoji_count += other.emoji_count
+        self.empty_input_count += other.empty_input_count
+        self.output_length_sum += other.output_length_sum
+        for target, source in (
+            (self.instruction_counts, other.instruction_counts),
+            (self.output_length_histogram, other.output_length_histogram),
+            (self.input_length_histogram, other.input_length_histogram),
+        ):
+            for key, count in source.items():
+                target[key] = target.get(key, 0) + count
+        return self
+
+    def _format_histogram(self, histogram: Dict[int, int]) -> Dict[str, int]:
+        """将桶编号转换为 "起始-结束" 形式的区间标签"""
+        return {
+            f"{bucket * self.bucket_size}-{(bucket + 1) * self.bucket_size - 1}": histogram[bucket]
+            for bucket in sorted(histogram)
+        }
+
+    def result(self) -> Dict[str, Any]:
+        """
+        生成统计结果
+
+        前六个字段与 GirlfriendDatasetGenerator.get_statistics 的历史返回值相同，
+        另外附带输出/输入长度直方图。
+        """
+        total = self.total
+        return {
+            "total_samples": total,
+            "unique_instructions": len(self.instruction_counts),
+            "instruction_distribution": dict(self.instruction_counts),
+            "emoji_coverage": f"{self.emoji_count / total * 100 if total else 0:.2f}%",
+            "empty_input_ratio": f"{self.empty_input_count / total * 100 if total else 0:.2f}%",
+            "avg_output_length": self.output_length_sum / total if total else 0.0,
+            "output_length_histogram": self._format_histogram(self.output_length_histogram),
+            "input_length_histogram": self._format_histogram(self.input_length_histogram)
+        }
+
+
+def compute_file_statistics(
+    path: str,
+    bucket_size: int = 20,
+    stats: Optional[DatasetStatistics] = None
+) -> DatasetStatistics:
+    """
+    单遍扫描数据集文件（JSON或JSONL）计算统计信息
+
+    Args:
+        path: 数据集文件路径
+        bucket_size: 长度直方图的桶宽度
+        stats: 已有的累加器，传入时在其基础上继续累加（用于多个分片）
+
+    Returns:
+        累加器，调用 result() 得到统计结果
+    """
+    if stats is None:
+        stats = DatasetStatistics(bucket_size)
+    return stats.update(iter_dataset(path))
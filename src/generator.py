@@ -8,23 +8,36 @@
 import json
 import random
 from datetime import datetime
-from typing import List, Dict, Any
-from scenarios import SCENARIO_CATALOG, validate_catalog, get_catalog_metadata
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from dataset_io import format_extension, write_dataset, write_jsonl
+from dataset_stats import DatasetStatistics, compute_file_statistics
+from sampling import ScenarioSampler
+from scenarios import (
+    SCENARIO_CATALOG,
+    cached_catalog_fingerprint,
+    validate_catalog,
+    get_catalog_metadata
+)
 
 
 class GirlfriendDatasetGenerator:
     """虚拟女友数据集生成器类"""
     
-    def __init__(self, scenarios=None):
+    def __init__(self, scenarios=None, seed: int = None):
         """
         初始化生成器
         
         Args:
             scenarios: 场景列表，如果为None则使用默认的SCENARIO_CATALOG
+            seed: 生成器自身随机数流的种子（未显式指定种子的生成方法使用它）
         """
+        # 每个生成器持有独立的随机数流，不修改全局 random 状态
+        self.rng = random.Random(seed)
         self.scenarios = scenarios if scenarios is not None else SCENARIO_CATALOG
-        validate_catalog()
-        self.metadata = get_catalog_metadata()
+        # 验证结果和元数据按目录内容哈希缓存，哈希本身按目录对象缓存，重复构造生成器几乎没有开销
+        self.catalog_fingerprint = cached_catalog_fingerprint()
+        validate_catalog(fingerprint=self.catalog_fingerprint)
+        self.metadata = get_catalog_metadata(fingerprint=self.catalog_fingerprint)
     
     def generate_single_entry(self, scenario, variation_index: int = 0) -> Dict[str, str]:
         """
@@ -48,87 +61,198 @@ class GirlfriendDatasetGenerator:
             "output": response_template
         }
     
-    def generate_deterministic_dataset(self, variations_per_scenario: int = 1) -> List[Dict[str, str]]:
+    def iter_deterministic(self, variations_per_scenario: int = 1) -> Iterator[Dict[str, str]]:
         """
-        确定性地生成数据集（每个场景按顺序生成）
+        确定性地逐条生成数据（每个场景按顺序生成）
         
         Args:
             variations_per_scenario: 每个场景生成的变体数量
         
-        Returns:
-            数据集列表
+        Yields:
+            包含instruction, input, output的字典
         """
-        dataset = []
-        
         # 按顺序遍历所有场景
         for scenario in self.scenarios:
             # 为每个场景生成指定数量的变体
             for i in range(variations_per_scenario):
-                entry = self.generate_single_entry(scenario, i)
-                dataset.append(entry)
-        
-        return dataset
+                yield self.generate_single_entry(scenario, i)
     
-    def generate_random_dataset(self, num_samples: int = 500, seed: int = None) -> List[Dict[str, str]]:
+    def generate_deterministic_dataset(self, variations_per_scenario: int = 1) -> List[Dict[str, str]]:
         """
-        随机生成数据集（旧版兼容模式）
+        确定性地生成数据集（每个场景按顺序生成）
         
         Args:
-            num_samples: 要生成的样本数量
-            seed: 随机种子，用于复现
+            variations_per_scenario: 每个场景生成的变体数量
         
         Returns:
             数据集列表
         """
-        if seed is not None:
-            random.seed(seed)
+        return list(self.iter_deterministic(variations_per_scenario))
+    
+    def iter_random(self, num_samples: int = 500, seed: int = None) -> Iterator[Dict[str, str]]:
+        """
+        随机逐条生成数据
         
-        dataset = []
+        Args:
+            num_samples: 要生成的样本数量
+            seed: 随机种子，用于复现；指定时使用独立的随机数流，否则使用生成器自身的随机数流
+        
+        Yields:
+            包含instruction, input, output的字典
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
         
         for _ in range(num_samples):
             # 随机选择一个场景
-            scenario = random.choice(self.scenarios)
+            scenario = rng.choice(self.scenarios)
             # 随机选择一个响应模板
-            response = random.choice(scenario.response_templates)
+            response = rng.choice(scenario.response_templates)
             
-            entry = {
+            yield {
                 "instruction": scenario.instruction,
                 "input": scenario.input,
                 "output": response
             }
-            dataset.append(entry)
-        
-        return dataset
     
-    def generate_balanced_dataset(self, samples_per_scenario: int = 10) -> List[Dict[str, str]]:
+    def generate_random_dataset(self, num_samples: int = 500, seed: int = None) -> List[Dict[str, str]]:
         """
-        生成平衡的数据集（每个场景生成相同数量的样本）
+        随机生成数据集（旧版兼容模式）
         
         Args:
-            samples_per_scenario: 每个场景生成的样本数量
+            num_samples: 要生成的样本数量
+            seed: 随机种子，用于复现
         
         Returns:
             数据集列表
         """
-        dataset = []
+        return list(self.iter_random(num_samples, seed))
+    
+    def iter_balanced(self, samples_per_scenario: int = 10, seed: int = None) -> Iterator[Dict[str, str]]:
+        """
+        平衡地逐条生成数据
         
-        for scenario in self.scenarios:
-            for _ in range(samples_per_scenario):
+        按轮次生成：每一轮以随机顺序为每个场景各生成一条数据，
+        因此只需保存一轮的场景顺序，内存占用与样本总数无关。
+        
+        Args:
+            samples_per_scenario: 每个场景生成的样本数量（即轮数）
+            seed: 随机种子，用于复现；指定时使用独立的随机数流，否则使用生成器自身的随机数流
+        
+        Yields:
+            包含instruction, input, output的字典
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        order = list(self.scenarios)
+        
+        for _ in range(samples_per_scenario):
+            rng.shuffle(order)
+            for scenario in order:
                 # 随机选择一个响应模板
-                response = random.choice(scenario.response_templates)
+                response = rng.choice(scenario.response_templates)
                 
-                entry = {
+                yield {
                     "instruction": scenario.instruction,
                     "input": scenario.input,
                     "output": response
                 }
-                dataset.append(entry)
+    
+    def generate_balanced_dataset(self, samples_per_scenario: int = 10, seed: int = None) -> List[Dict[str, str]]:
+        """
+        生成平衡的数据集（每个场景生成相同数量的样本）
+        
+        Args:
+            samples_per_scenario: 每个场景生成的样本数量
+            seed: 随机种子，用于复现
+        
+        Returns:
+            数据集列表
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        dataset = list(self.iter_balanced(samples_per_scenario, seed=rng.getrandbits(64)))
         
         # 打乱数据集
-        random.shuffle(dataset)
+        rng.shuffle(dataset)
         
         return dataset
     
+    def create_sampler(
+        self,
+        category_weights: Dict[str, float] = None,
+        tag_weights: Dict[str, float] = None,
+        seed: int = None
+    ) -> ScenarioSampler:
+        """
+        创建按分类或标签加权的场景采样器
+        
+        Args:
+            category_weights: 分类权重（各分类在结果中的目标比例），默认各分类相同
+            tag_weights: 标签权重（与 category_weights 二选一）
+            seed: 随机种子，用于复现
+        
+        Returns:
+            ScenarioSampler，抽样后可调用 report() 查看实际分布与目标分布
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        return ScenarioSampler(self.scenarios, category_weights, tag_weights, rng)
+    
+    def iter_weighted(
+        self,
+        num_samples: int = 500,
+        category_weights: Dict[str, float] = None,
+        tag_weights: Dict[str, float] = None,
+        seed: int = None,
+        sampler: ScenarioSampler = None,
+        batch_size: int = 4096
+    ) -> Iterator[Dict[str, str]]:
+        """
+        按分类或标签权重逐条生成数据（别名表采样，每条 O(1)）
+        
+        不指定任何权重时各分类的样本数量相同，而不是像随机模式那样按场景数量偏向大分类。
+        
+        Args:
+            num_samples: 要生成的样本数量
+            category_weights: 分类权重
+            tag_weights: 标签权重（与 category_weights 二选一）
+            seed: 随机种子，用于复现
+            sampler: 已创建的采样器；指定时忽略权重和种子参数
+            batch_size: 每批抽取的场景下标数量
+        
+        Yields:
+            包含instruction, input, output的字典
+        """
+        if sampler is None:
+            sampler = self.create_sampler(category_weights, tag_weights, seed)
+        rng = sampler.rng
+        scenarios = sampler.scenarios
+        
+        remaining = num_samples
+        while remaining > 0:
+            indices = sampler.sample(min(batch_size, remaining))
+            remaining -= len(indices)
+            for index in indices:
+                scenario = scenarios[index]
+                yield {
+                    "instruction": scenario.instruction,
+                    "input": scenario.input,
+                    "output": rng.choice(scenario.response_templates)
+                }
+    
+    def generate_weighted_dataset(
+        self,
+        num_samples: int = 500,
+        category_weights: Dict[str, float] = None,
+        tag_weights: Dict[str, float] = None,
+        seed: int = None,
+        sampler: ScenarioSampler = None
+    ) -> List[Dict[str, str]]:
+        """
+        按分类或标签权重生成数据集（参数同 iter_weighted）
+        
+        Returns:
+            数据集列表
+        """
+        return list(self.iter_weighted(num_samples, category_weights, tag_weights, seed, sampler))
+    
     def generate_dataset_with_metadata(
         self,
         num_samples: int = 500,
@@ -140,7 +264,7 @@ class GirlfriendDatasetGenerator:
         
         Args:
             num_samples: 样本数量（仅在random模式下使用）
-            mode: 生成模式，可选 "random", "deterministic", "balanced"
+            mode: 生成模式，可选 "random", "deterministic", "balanced", "weighted"
             **kwargs: 其他参数
         
         Returns:
@@ -151,41 +275,58 @@ class GirlfriendDatasetGenerator:
             dataset = self.generate_deterministic_dataset(variations_per_scenario)
         elif mode == "balanced":
             samples_per_scenario = kwargs.get("samples_per_scenario", 10)
-            dataset = self.generate_balanced_dataset(samples_per_scenario)
+            dataset = self.generate_balanced_dataset(samples_per_scenario, kwargs.get("seed", None))
+        elif mode == "weighted":
+            sampler = self.create_sampler(
+                kwargs.get("category_weights", None),
+                kwargs.get("tag_weights", None),
+                kwargs.get("seed", None)
+            )
+            dataset = self.generate_weighted_dataset(num_samples, sampler=sampler)
         else:  # random
             seed = kwargs.get("seed", None)
             dataset = self.generate_random_dataset(num_samples, seed)
         
+        metadata = {
+            "total_samples": len(dataset),
+            "total_scenarios": len(self.scenarios),
+            "mode": mode,
+            "generation_time": datetime.now().isoformat(),
+            **kwargs
+        }
+        if mode == "weighted":
+            # 记录实际分布与目标分布的对比
+            metadata["distribution_report"] = sampler.report()
+        
         return {
             "data": dataset,
-            "metadata": {
-                "total_samples": len(dataset),
-                "total_scenarios": len(self.scenarios),
-                "mode": mode,
-                "generation_time": datetime.now().isoformat(),
-                **kwargs
-            }
+            "metadata": metadata
         }
     
     def save_dataset(
         self,
-        dataset: List[Dict[str, str]],
+        dataset: Iterable[Dict[str, str]],
         output_path: str = None,
-        include_metadata: bool = False
+        include_metadata: bool = False,
+        output_format: str = "json"
     ) -> str:
         """
-        保存数据集到JSON文件
+        保存数据集到文件
         
         Args:
-            dataset: 数据集列表
+            dataset: 数据集列表或数据迭代器
             output_path: 输出文件路径，如果为None则自动生成
-            include_metadata: 是否在文件中包含元数据
+            include_metadata: 是否在文件中包含元数据（仅json格式支持）
+            output_format: 输出格式，可选 "json", "jsonl", "jsonl.gz", "parquet"
         
         Returns:
-            保存的文件路径
+            保存的文件路径（可选格式不可用而退回时，扩展名会随之变化）
         """
         import os
         
+        if include_metadata and output_format != "json":
+            raise ValueError("只有json格式支持在文件中包含元数据")
+        
         # 创建输出目录
         output_dir = "train_data/dataset"
         os.makedirs(output_dir, exist_ok=True)
@@ -193,56 +334,67 @@ class GirlfriendDatasetGenerator:
         # 生成文件名
         if output_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = f"{output_dir}/girlfriend_chat_dataset_{timestamp}.json"
+            output_path = f"{output_dir}/girlfriend_chat_dataset_{timestamp}{format_extension(output_format)}"
         
-        # 准备保存的数据
         if include_metadata:
             save_data = {
-                "dataset": dataset,
+                "dataset": list(dataset),
                 "metadata": self.metadata
             }
-        else:
-            save_data = dataset
-        
-        # 保存为JSON文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2)
+            # 保存为JSON文件
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(save_data, f, ensure_ascii=False, indent=2)
+            return output_path
         
+        # 逐条写出，json格式的输出与 json.dump(indent=2) 一致
+        output_path, _ = write_dataset(dataset, output_path, output_format)
         return output_path
     
-    def get_statistics(self, dataset: List[Dict[str, str]]) -> Dict[str, Any]:
+    def stream_dataset(
+        self,
+        entries: Iterable[Dict[str, str]],
+        output_path: str = None
+    ) -> Tuple[str, int]:
+        """
+        以JSONL格式逐条保存数据集，内存占用与数据集大小无关
+        
+        Args:
+            entries: 数据迭代器，通常是 iter_random / iter_balanced / iter_deterministic 的返回值
+            output_path: 输出文件路径，如果为None则自动生成
+        
+        Returns:
+            (保存的文件路径, 写入条数)
+        """
+        if output_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = f"train_data/dataset/girlfriend_chat_dataset_{timestamp}.jsonl"
+        
+        count = write_jsonl(entries, output_path)
+        return output_path, count
+    
+    def get_statistics(self, dataset: Iterable[Dict[str, str]]) -> Dict[str, Any]:
         """
         获取数据集统计信息
         
         Args:
-            dataset: 数据集列表
+            dataset: 数据集列表或数据迭代器（单遍统计）
         
         Returns:
             统计信息字典
         """
-        # 统计各个指令的出现次数
-        instruction_counts = {}
-        for entry in dataset:
-            instruction = entry["instruction"]
-            instruction_counts[instruction] = instruction_counts.get(instruction, 0) + 1
-        
-        # 统计emoji覆盖率
-        emoji_count = sum(1 for entry in dataset if any(
-            char for char in entry["output"] 
-            if ord(char) > 0x1F000
-        ))
+        return DatasetStatistics().update(dataset).result()
+    
+    def get_file_statistics(self, path: str) -> Dict[str, Any]:
+        """
+        单遍扫描数据集文件（JSON或JSONL）获取统计信息，无需整体加载到内存
         
-        # 统计输入为空的比例
-        empty_input_count = sum(1 for entry in dataset if not entry["input"])
+        Args:
+            path: 数据集文件路径
         
-        return {
-            "total_samples": len(dataset),
-            "unique_instructions": len(instruction_counts),
-            "instruction_distribution": instruction_counts,
-            "emoji_coverage": f"{emoji_count / len(dataset) * 100:.2f}%",
-            "empty_input_ratio": f"{empty_input_count / len(dataset) * 100:.2f}%",
-            "avg_output_length": sum(len(entry["output"]) for entry in dataset) / len(dataset)
-        }
+        Returns:
+            统计信息字典（与 get_statistics 相同）
+        """
+        return compute_file_statistics(path).result()
     
     def print_sample_data(self, dataset: List[Dict[str, str]], num_samples: int = 3):
         """
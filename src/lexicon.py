@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词库包
+变化引擎和数据集生成脚本使用的表情、语气词、同义词、占位符等词表统一保存在
+data/lexicon/*.json 中。每个词库包在进程内只加载、校验和编译一次，由所有引擎共享。
+
+词库包格式（format 1）:
+    {
+        "format": 1,
+        "name": "default",
+        "version": "1.0.0",
+        "engine": {                      VariationEngine 使用
+            "emoji_sets": {基调: [表情, ...]},            必须包含 "happy"（未知基调的回退）
+            "tone_particles": {类别: [语气词, ...]},       必须包含 soft/cute/emphasis/question/exclamation
+            "synonym_pools": {词条: [同义词, ...]},
+            "placeholder_pools": {占位符: [候选, ...]},
+            "supportive_suffixes": [后缀, ...],
+            "sentence_starters": {基调: [开头, ...]}
+        },
+        "dataset": {                     scripts/generate_dataset.py 的输出变体使用
+            "word_substitutions": {词条: [替换, ...]},
+            "tone_particles": {语气词: [替换, ...]},       候选中与原语气词相同的项会被忽略
+            "emoji_groups": {"happy": [表情, ...], "love": [表情, ...]}
+        }
+    }
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from utils.matcher import PhraseMatcher
+
+
+LEXICON_FORMAT = 1
+LEXICON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'lexicon'))
+DEFAULT_LEXICON = "default"
+
+_ENGINE_TABLES = (
+    "emoji_sets", "tone_particles", "synonym_pools", "placeholder_pools", "sentence_starters"
+)
+_REQUIRED_PARTICLE_KINDS = ("soft", "cute", "emphasis", "question", "exclamation")
+_DATASET_TABLES = ("word_substitutions", "tone_particles", "emoji_groups")
+_REQUIRED_EMOJI_GROUPS = ("happy", "love")
+
+
+def _check_word_list(value: Any, where: str) -> List[str]:
+    """校验非空字符串列表"""
+    if not isinstance(value, list) or not value:
+        raise ValueError(f"{where} 必须是非空列表")
+    for item in value:
+        if not isinstance(item, str) or not item:
+            raise ValueError(f"{where} 只能包含非空字符串，发现 {item!r}")
+    return value
+
+
+def _check_table(value: Any, where: str) -> Dict[str, List[str]]:
+    """校验 {键: 非空字符串列表} 形式的词表"""
+    if not isinstance(value, dict) or not value:
+        raise ValueError(f"{where} 必须是非空对象")
+    for key, words in value.items():
+        if not key:
+            raise ValueError(f"{where} 不能包含空键")
+        _check_word_list(words, f"{where}.{key}")
+    return value
+
+
+def _require_keys(table: Dict[str, Any], keys, where: str):
+    missing = [key for key in keys if key not in table]
+    if missing:
+        raise ValueError(f"{where} 缺少: {', '.join(missing)}")
+
+
+def _group_substitutions(emojis: List[str]) -> Dict[str, List[str]]:
+    """把每个表情映射到同组的其他表情"""
+    return {emoji: [e for e in emojis if e != emoji] for emoji in emojis}
+
+
+class Lexicon:
+    """加载并编译好的词库包（在进程内共享，不要原地修改其中的词表）"""
+
+    def __init__(self, data: Dict[str, Any], source: str = "<memory>", digest: Optional[str] = None):
+        """
+        校验并编译词库包
+
+        Args:
+            data: 词库包内容（见模块说明中的格式）
+            source: 来源（文件路径），用于错误信息
+            digest: 内容摘要，为None时由内容计算
+
+        Raises:
+            ValueError: 格式版本不支持或词表不合法
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"词库包 {source} 必须是JSON对象")
+        if data.get("format") != LEXICON_FORMAT:
+            raise ValueError(f"词库包 {source} 的格式版本 {data.get('format')!r} 不受支持（需要 {LEXICON_FORMAT}）")
+        _require_keys(data, ("name", "version", "engine", "dataset"), f"词库包 {source}")
+
+        engine = data["engine"]
+        _require_keys(engine, _ENGINE_TABLES + ("supportive_suffixes",), f"{source}: engine")
+        for name in _ENGINE_TABLES:
+            _check_table(engine[name], f"{source}: engine.{name}")
+        _check_word_list(engine["supportive_suffixes"], f"{source}: engine.supportive_suffixes")
+        _require_keys(engine["emoji_sets"], ("happy",), f"{source}: engine.emoji_sets")
+        _require_keys(engine["tone_particles"], _REQUIRED_PARTICLE_KINDS, f"{source}: engine.tone_particles")
+
+        dataset = data["dataset"]
+        _require_keys(dataset, _DATASET_TABLES, f"{source}: dataset")
+        for name in _DATASET_TABLES:
+            _check_table(dataset[name], f"{source}: dataset.{name}")
+        _require_keys(dataset["emoji_groups"], _REQUIRED_EMOJI_GROUPS, f"{source}: dataset.emoji_groups")
+
+        self.name: str = data["name"]
+        self.version: str = data["version"]
+        self.source = source
+        if digest is None:
+            canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+            digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        self.digest = digest
+
+        # 变化引擎的词表
+        self.emoji_sets: Dict[str, List[str]] = engine["emoji_sets"]
+        self.tone_particles: Dict[str, List[str]] = engine["tone_particles"]
+        self.synonym_pools: Dict[str, List[str]] = engine["synonym_pools"]
+        self.placeholder_pools: Dict[str, List[str]] = engine["placeholder_pools"]
+        self.supportive_suffixes: List[str] = engine["supportive_suffixes"]
+        self.sentence_starters: Dict[str, List[str]] = engine["sentence_starters"]
+        self.synonym_matcher = PhraseMatcher(self.synonym_pools)
+
+        # 数据集输出变体的词表，编译成替换表和匹配器
+        self.word_substitutions: Dict[str, List[str]] = dataset["word_substitutions"]
+        self.particle_substitutions: Dict[str, List[str]] = {
+            particle: [a for a in alternatives if a != particle]
+            for particle, alternatives in dataset["tone_particles"].items()
+        }
+        empty = [particle for particle, alternatives in self.particle_substitutions.items() if not alternatives]
+        if empty:
+            raise ValueError(f"{source}: dataset.tone_particles 中 {', '.join(empty)} 没有不同于自身的替换")
+        self.happy_emojis: List[str] = dataset["emoji_groups"]["happy"]
+        self.love_emojis: List[str] = dataset["emoji_groups"]["love"]
+        self.happy_emoji_substitutions = _group_substitutions(self.happy_emojis)
+        self.love_emoji_substitutions = _group_substitutions(self.love_emojis)
+        self.any_emoji_substitutions = _group_substitutions(self.happy_emojis + self.love_emojis)
+
+        self.word_matcher = PhraseMatcher(self.word_substitutions)
+        self.particle_matcher = PhraseMatcher(self.particle_substitutions)
+        self.happy_emoji_matcher = PhraseMatcher(self.happy_emoji_substitutions)
+        self.love_emoji_matcher = PhraseMatcher(self.love_emoji_substitutions)
+        self.any_emoji_matcher = PhraseMatcher(self.any_emoji_substitutions)
+
+    def engine_tables(self) -> Dict[str, Any]:
+        """变化引擎使用的词表（属性名 → 词表）"""
+        return {
+            "emoji_sets": self.emoji_sets,
+            "tone_particles": self.tone_particles,
+            "synonym_pools": self.synonym_pools,
+            "placeholder_pools": self.placeholder_pools,
+            "supportive_suffixes": self.supportive_suffixes,
+            "sentence_starters": self.sentence_starters,
+        }
+
+    def __repr__(self) -> str:
+        return f"Lexicon(name={self.name!r}, version={self.version!r}, digest={self.digest!r})"
+
+
+def lexicon_path(name: str = DEFAULT_LEXICON) -> str:
+    """词库名或路径 → 词库文件路径（不含路径分隔符和扩展名时视为 data/lexicon 下的词库名）"""
+    if os.sep in name or name.endswith('.json'):
+        return os.path.abspath(name)
+    return os.path.join(LEXICON_DIR, f"{name}.json")
+
+
+@lru_cache(maxsize=None)
+def _load(path: str) -> Lexicon:
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"词库包 {path} 不是合法的JSON: {e}") from e
+    return Lexicon(data, source=path, digest=hashlib.sha256(raw).hexdigest()[:16])
+
+
+def load_lexicon(name: str = DEFAULT_LEXICON) -> Lexicon:
+    """
+    加载词库包（每个文件在进程内只加载一次，后续调用返回同一个对象）
+
+    Args:
+        name: data/lexicon 下的词库名，或词库文件路径
+
+    Returns:
+        校验并编译好的 Lexicon
+
+    Raises:
+        FileNotFoundError: 词库文件不存在
+        ValueError: 词库包不合法
+    """
+    return _load(lexicon_path(name))
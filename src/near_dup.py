@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近重复检测索引
+在同一上下文（instruction + input）内查找与已保留文本相似度达到阈值的新文本。
+相似度与 scripts/generate_dataset.calculate_similarity 相同（归一化文本上的
+SequenceMatcher.ratio），但不再与组内所有文本两两比较：先用字符集合的 MinHash 签名和
+LSH 分带找出候选，只对候选做分级比较（SimilarityCascade）。
+
+召回：相似度达到阈值的文本对，其字符集合 Jaccard 相似度有严格下界（见 jaccard_floor），
+分带参数保证 Jaccard 相似度为该下界的文本对以不低于 recall 的概率成为候选；重复字符较多、
+下界不成立的文本不进入 LSH，改为逐一比较。
+
+候选数量取决于数据：LSH 只排除字符集合明显不同的文本对。同组文本用字多有重叠时
+（如本项目的回复模板在阈值 0.65 下），仍有相当一部分文本对成为候选，这时主要靠分级比较省时间。
+"""
+
+from typing import Dict, Hashable, List, Optional
+
+from utils.minhash import MinHasher, LSHIndex, Signature, lsh_bands
+from utils.text import SimilarityCascade
+
+
+DEFAULT_NUM_PERM = 128
+# 候选召回率：相似度恰好在阈值附近的文本对成为候选的最低概率
+DEFAULT_RECALL = 0.999
+# 重复字符占比超过它的文本不进入 LSH，与同组文本逐一比较
+MAX_REPEAT_SHARE = 0.2
+
+
+def repeat_share(text: str) -> float:
+    """文本中重复出现的字符（除每种字符的第一次出现外）所占比例"""
+    return (len(text) - len(set(text))) / len(text) if text else 0.0
+
+
+def jaccard_floor(threshold: float, repeat_share: float = 0.0) -> float:
+    """
+    SequenceMatcher 相似度达到 threshold 的两段文本，其字符集合 Jaccard 相似度的下界
+
+    记两段文本总长 L = |a| + |b|，字符集合为 A、B，重复字符数 d_a = |a| - |A|、d_b = |b| - |B|。
+    ratio = 2M / L，匹配字符数 M 不超过字符多重集合的交集，而多重集合交集不超过
+    |A∩B| + min(d_a, d_b)，因此 |A∩B| >= (ratio·L - d_a - d_b) / 2。
+    又 |A∪B| = L - d_a - d_b - |A∩B|，记 δ = (d_a + d_b) / L，得
+    Jaccard >= (ratio - δ) / (2 - ratio - δ)，随 δ 增大而减小。
+    两段文本的重复字符占比都不超过 repeat_share 时 δ <= repeat_share，下界成立。
+
+    Args:
+        threshold: SequenceMatcher 相似度阈值
+        repeat_share: 两段文本重复字符占比的上限
+
+    Returns:
+        Jaccard 相似度下界，不小于0
+    """
+    return max(0.0, (threshold - repeat_share) / (2.0 - threshold - repeat_share))
+
+
+class CandidateIndex:
+    """
+    按分组查找相似度可能达到阈值的已加入文本
+
+    重复字符占比不超过 MAX_REPEAT_SHARE 的文本之间用 MinHash-LSH 找候选；占比更高的文本
+    与同组所有文本互为候选。阈值过低、下界为0时所有文本都逐一比较。
+    """
+
+    def __init__(self, threshold: float, num_perm: int = DEFAULT_NUM_PERM, recall: float = DEFAULT_RECALL):
+        """
+        Args:
+            threshold: 相似度阈值
+            num_perm: MinHash 签名长度
+            recall: 相似度恰好为阈值的文本对成为候选的最低概率
+        """
+        self.lsh_threshold = min(jaccard_floor(threshold, MAX_REPEAT_SHARE), 1.0)
+        # 字符集合（1-gram）：下界按字符推导
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=1)
+        self.exhaustive = self.lsh_threshold <= 0.0
+        self.lsh = LSHIndex(*lsh_bands(num_perm, self.lsh_threshold, recall)) if not self.exhaustive else None
+        # 每组全部文本（供重复字符多的新文本逐一比较）与其中不在 LSH 里的文本
+        self._members: Dict[Hashable, List[Hashable]] = {}
+        self._unindexed: Dict[Hashable, List[Hashable]] = {}
+
+    def signature(self, text: str) -> Optional[Signature]:
+        """
+        文本的 LSH 签名（只依赖文本和索引参数，可以在其他进程中预先计算）
+
+        Returns:
+            签名；文本不进入 LSH（空文本、重复字符过多或逐一比较模式）时为None
+        """
+        if not text or self.exhaustive or repeat_share(text) > MAX_REPEAT_SHARE:
+            return None
+        return self.hasher.signature(text)
+
+    def candidates(self, group: Hashable, text: str, signature: Optional[Signature] = None) -> List[Hashable]:
+        """
+        同组中可能与文本相似度达到阈值的已加入元素
+
+        Args:
+            group: 分组键
+            text: 文本
+            signature: 预先计算的 signature(text)，为None时现场计算
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return list(self._members.get(group, ()))
+        return self.lsh.candidates(signature, group) + self._unindexed.get(group, [])
+
+    def add(self, key: Hashable, group: Hashable, text: str, signature: Optional[Signature] = None):
+        """加入元素；signature 同 candidates"""
+        if signature is None:
+            signature = self.signature(text)
+        self._members.setdefault(group, []).append(key)
+        if signature is None:
+            self._unindexed.setdefault(group, []).append(key)
+        else:
+            self.lsh.add(key, signature, group)
+
+
+class NearDuplicateIndex:
+    """按上下文分组的近重复索引（CandidateIndex 找候选，SequenceMatcher 精确验证）"""
+
+    def __init__(self, threshold: float, num_perm: int = DEFAULT_NUM_PERM, recall: float = DEFAULT_RECALL):
+        """
+        初始化索引
+
+        Args:
+            threshold: 相似度阈值，与已保留文本的 SequenceMatcher 相似度 >= threshold 即为近重复
+            num_perm: MinHash 签名长度
+            recall: 候选召回率目标，决定 LSH 分带参数
+        """
+        self.threshold = threshold
+        self.index = CandidateIndex(threshold, num_perm, recall)
+        self.hasher = self.index.hasher
+        self._texts: List[str] = []
+        # 候选验证的分级比较，计数可用于报告各级排除比例
+        self.cascade = SimilarityCascade(threshold)
+
+    def __len__(self) -> int:
+        """已保留的文本数量"""
+        return len(self._texts)
+
+    def signature(self, text: str) -> Optional[Signature]:
+        """
+        文本在本索引中使用的签名（只依赖文本和索引参数，可以在其他进程中预先计算）
+
+        Returns:
+            签名；不需要签名（阈值大于1或文本不进入 LSH）时为None
+        """
+        if self.threshold > 1.0:
+            return None
+        return self.index.signature(text)
+
+    def check_and_add(self, group: Hashable, text: str, signature: Optional[Signature] = None) -> bool:
+        """
+        判断文本是否与同组已保留的文本近重复；不重复时加入索引
+
+        Args:
+            group: 上下文分组键
+            text: 归一化后的文本
+            signature: 预先计算的 signature(text)，为None时现场计算
+
+        Returns:
+            是近重复时为True（文本不会加入索引）
+        """
+        # 空文本与任何文本的相似度都视为0，不参与比较
+        if not text:
+            return False
+        if self.threshold > 1.0:
+            return False
+
+        if signature is None:
+            signature = self.index.signature(text)
+        # 与 calculate_similarity(已保留文本, 新文本) 的参数顺序一致，新文本的字符索引只建一次
+        for key in self.index.candidates(group, text, signature):
+            if self.cascade.check(self._texts[key], text) is not None:
+                return True
+
+        self.index.add(len(self._texts), group, text, signature)
+        self._texts.append(text)
+        return False
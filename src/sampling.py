@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+加权采样
+基于 Walker 别名方法（Vose 实现）的离散分布采样器：建表 O(n)，每次抽样 O(1)。
+ScenarioSampler 在此基础上按分类或标签权重对场景进行采样，并报告实际分布与目标分布的偏差。
+"""
+
+import random
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class AliasSampler:
+    """Walker 别名表采样器"""
+
+    def __init__(self, weights: Sequence[float], rng: Optional[random.Random] = None):
+        """
+        构建别名表
+
+        Args:
+            weights: 非负权重序列（无需归一化）
+            rng: 随机数流，为None时新建一个
+        """
+        n = len(weights)
+        if n == 0:
+            raise ValueError("权重序列不能为空")
+        if any(w < 0 for w in weights):
+            raise ValueError("权重不能为负数")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("权重之和必须大于0")
+
+        self.rng = rng if rng is not None else random.Random()
+        self.size = n
+        self.probabilities = [w / total for w in weights]
+
+        # Vose 算法：把每一列补齐到平均高度 1，不足部分由一个“别名”列填充
+        scaled = [p * n for p in self.probabilities]
+        self._prob = array('d', [0.0]) * n
+        self._alias = array('l', [0]) * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # 剩余列由于浮点误差可能略偏离 1，直接视为满列
+        for i in large + small:
+            self._prob[i] = 1.0
+            self._alias[i] = i
+
+    def draw(self) -> int:
+        """抽取一个下标"""
+        rng_random = self.rng.random
+        column = int(rng_random() * self.size)
+        return column if rng_random() < self._prob[column] else self._alias[column]
+
+    def sample(self, n: int) -> array:
+        """
+        批量抽取下标
+
+        Args:
+            n: 抽样数量
+
+        Returns:
+            下标数组（array('l')）
+        """
+        rng_random = self.rng.random
+        size = self.size
+        prob = self._prob
+        alias = self._alias
+        result = array('l', [0]) * n
+        for k in range(n):
+            column = int(rng_random() * size)
+            result[k] = column if rng_random() < prob[column] else alias[column]
+        return result
+
+
+class ScenarioSampler:
+    """按分类或标签权重对场景进行加权采样"""
+
+    def __init__(
+        self,
+        scenarios: Sequence[Any],
+        category_weights: Optional[Dict[str, float]] = None,
+        tag_weights: Optional[Dict[str, float]] = None,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        初始化采样器
+
+        分类（或标签）的权重代表该组在结果中所占的比例，组内的场景平分这部分权重，
+        因此场景数量多的分类不会因此被过度采样。未在权重表中出现的组权重为0。
+
+        Args:
+            scenarios: 场景列表
+            category_weights: 分类权重；与 tag_weights 都为None时各分类权重相同
+            tag_weights: 标签权重；一个场景有多个标签时累加各标签分到的权重
+            rng: 随机数流
+        """
+        if category_weights is not None and tag_weights is not None:
+            raise ValueError("category_weights 和 tag_weights 只能指定一个")
+
+        self.scenarios = list(scenarios)
+        if tag_weights is not None:
+            self.group_by = "tag"
+            groups_of = [list(dict.fromkeys(s.tags)) for s in self.scenarios]
+            group_weights = tag_weights
+        else:
+            self.group_by = "category"
+            groups_of = [[s.category] for s in self.scenarios]
+            if category_weights is None:
+                category_weights = {s.category: 1.0 for s in self.scenarios}
+            group_weights = category_weights
+
+        group_sizes: Dict[str, int] = {}
+        for groups in groups_of:
+            for group in groups:
+                group_sizes[group] = group_sizes.get(group, 0) + 1
+
+        unknown = set(group_weights) - set(group_sizes)
+        if unknown:
+            raise ValueError(f"权重中包含不存在的{self.group_by}: {', '.join(sorted(unknown))}")
+
+        # 每个场景的权重，以及它的权重在各组之间的分配比例（用于统计实际分布）
+        weights = []
+        self._contributions: List[Dict[str, float]] = []
+        for groups in groups_of:
+            parts = {g: group_weights.get(g, 0.0) / group_sizes[g] for g in groups}
+            weight = sum(parts.values())
+            weights.append(weight)
+            self._contributions.append(
+                {g: part / weight for g, part in parts.items() if part > 0} if weight > 0 else {}
+            )
+
+        self._alias = AliasSampler(weights, rng)
+        self.rng = self._alias.rng
+        self.counts = array('l', [0]) * len(self.scenarios)
+
+    def draw(self) -> Any:
+        """抽取一个场景"""
+        index = self._alias.draw()
+        self.counts[index] += 1
+        return self.scenarios[index]
+
+    def sample(self, n: int) -> array:
+        """
+        批量抽取场景下标
+
+        Returns:
+            场景下标数组（array('l')），对应 self.scenarios
+        """
+        indices = self._alias.sample(n)
+        counts = self.counts
+        for index in indices:
+            counts[index] += 1
+        return indices
+
+    def _group_distribution(self, scenario_mass: Sequence[float]) -> Dict[str, float]:
+        distribution: Dict[str, float] = {}
+        for mass, contribution in zip(scenario_mass, self._contributions):
+            if mass:
+                for group, share in contribution.items():
+                    distribution[group] = distribution.get(group, 0.0) + mass * share
+        return distribution
+
+    def target_distribution(self) -> Dict[str, float]:
+        """各组的目标比例"""
+        return self._group_distribution(self._alias.probabilities)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        报告已抽取样本的实际分布与目标分布
+
+        Returns:
+            {"group_by", "total_draws", "groups": {组: {"target", "realized", "deviation"}},
+             "total_variation": 总变差距离}
+        """
+        total = sum(self.counts)
+        target = self.target_distribution()
+        realized = self._group_distribution([c / total for c in self.counts]) if total else {}
+
+        groups = {}
+        for group in sorted(set(target) | set(realized)):
+            t = target.get(group, 0.0)
+            r = realized.get(group, 0.0)
+            groups[group] = {"target": t, "realized": r, "deviation": r - t}
+
+        return {
+            "group_by": self.group_by,
+            "total_draws": total,
+            "groups": groups,
+            "total_variation": sum(abs(g["deviation"]) for g in groups.values()) / 2
+        }
@@ -5,7 +5,8 @@
 定义所有对话场景的结构化数据，包含指令、用户输入和响应模板
 """
 
-from typing import List, Dict, Any
+import hashlib
+from typing import List, Dict, Any, Tuple
 
 
 class Scenario:
@@ -1129,32 +1130,133 @@ SCENARIO_CATALOG = [
 ]
 
 
-def validate_catalog():
-    """验证场景目录，确保满足要求"""
+# 验证结果与元数据缓存（按目录内容哈希索引，目录内容不变时无需重复验证）
+_VALIDATION_CACHE: Dict[str, bool] = {}
+_METADATA_CACHE: Dict[str, Dict[str, Any]] = {}
+# 目录对象 id -> (目录对象, 内容哈希)；保存目录对象本身，防止 id 被新对象复用
+_FINGERPRINT_CACHE: Dict[int, Tuple[List[Scenario], str]] = {}
+
+
+def catalog_fingerprint(catalog: List[Scenario] = None) -> str:
+    """
+    计算场景目录的内容哈希
+    
+    Args:
+        catalog: 场景列表，如果为None则使用SCENARIO_CATALOG
+    
+    Returns:
+        目录内容的SHA-256十六进制摘要
+    """
+    if catalog is None:
+        catalog = SCENARIO_CATALOG
+    
+    # 字段之间用不可见分隔符隔开，避免不同字段拼接后产生歧义
+    records = [
+        "\x1f".join((
+            scenario.name,
+            scenario.instruction,
+            scenario.input,
+            scenario.category,
+            "\x1e".join(scenario.tags),
+            "\x1e".join(scenario.response_templates)
+        ))
+        for scenario in catalog
+    ]
+    digest = hashlib.sha256("\x1d".join(records).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cached_catalog_fingerprint(catalog: List[Scenario] = None) -> str:
+    """
+    按目录对象缓存的内容哈希：同一个目录列表只在第一次调用时计算哈希
+
+    用于验证和元数据缓存的查找，重复构造生成器时不必每次重新哈希整个目录。
+    原地修改目录列表或其中的场景不会被察觉，修改后应调用 catalog_fingerprint 重新计算并显式传入。
+
+    Args:
+        catalog: 场景列表，如果为None则使用SCENARIO_CATALOG
+
+    Returns:
+        目录内容的SHA-256十六进制摘要
+    """
+    if catalog is None:
+        catalog = SCENARIO_CATALOG
+    cached = _FINGERPRINT_CACHE.get(id(catalog))
+    if cached is not None and cached[0] is catalog:
+        return cached[1]
+    fingerprint = catalog_fingerprint(catalog)
+    _FINGERPRINT_CACHE[id(catalog)] = (catalog, fingerprint)
+    return fingerprint
+
+
+def _check_catalog(catalog: List[Scenario], min_scenarios: int):
+    """单次遍历完成目录的全部结构与唯一性检查"""
     # 检查场景数量
-    assert len(SCENARIO_CATALOG) >= 50, f"场景数量不足50个，当前只有{len(SCENARIO_CATALOG)}个"
+    assert len(catalog) >= min_scenarios, f"场景数量不足{min_scenarios}个，当前只有{len(catalog)}个"
     
-    # 检查每个场景的唯一性
-    scenario_names = [s.name for s in SCENARIO_CATALOG]
-    assert len(scenario_names) == len(set(scenario_names)), "场景名称存在重复"
+    scenario_names = set()
+    instructions = set()
     
-    instructions = [s.instruction for s in SCENARIO_CATALOG]
-    assert len(instructions) == len(set(instructions)), "场景指令存在重复"
-    
-    # 检查每个场景的完整性
-    for scenario in SCENARIO_CATALOG:
+    for scenario in catalog:
+        # 检查每个场景的完整性
         assert scenario.name, "场景必须有名称"
         assert scenario.instruction, "场景必须有指令"
+        assert isinstance(scenario.input, str), f"场景输入必须是字符串: {scenario.name}"
         assert scenario.response_templates, "场景必须有响应模板"
         assert len(scenario.response_templates) > 0, "场景至少需要一个响应模板"
         assert scenario.category, "场景必须有分类"
         assert scenario.tags, "场景必须有标签"
         
+        # 检查每个场景的唯一性
+        assert scenario.name not in scenario_names, f"场景名称存在重复: {scenario.name}"
+        scenario_names.add(scenario.name)
+        assert scenario.instruction not in instructions, f"场景指令存在重复: {scenario.instruction}"
+        instructions.add(scenario.instruction)
+        
+        for tag in scenario.tags:
+            assert isinstance(tag, str) and tag, f"场景标签必须是非空字符串: {scenario.name}"
+        
         # 检查响应模板是否符合女友persona（应包含emoji和温柔语气）
+        seen_templates = set()
         for template in scenario.response_templates:
+            assert isinstance(template, str), f"响应模板必须是字符串: {scenario.name}"
             assert template.strip(), "响应模板不能为空"
-    
-    print(f"✅ 场景目录验证通过！共有 {len(SCENARIO_CATALOG)} 个场景")
+            assert template not in seen_templates, f"响应模板存在重复: {scenario.name}"
+            seen_templates.add(template)
+
+
+def validate_catalog(
+    catalog: List[Scenario] = None,
+    min_scenarios: int = 50,
+    fingerprint: str = None
+):
+    """
+    验证场景目录，确保满足要求
+    
+    验证结果按目录内容哈希缓存，同一版本的目录只会完整检查一次。
+    
+    Args:
+        catalog: 场景列表，如果为None则使用SCENARIO_CATALOG
+        min_scenarios: 目录至少需要包含的场景数量
+        fingerprint: 预先计算好的目录内容哈希，为None时取 cached_catalog_fingerprint(catalog)
+    
+    Returns:
+        验证通过时返回True，否则抛出AssertionError
+    """
+    if catalog is None:
+        catalog = SCENARIO_CATALOG
+    
+    if fingerprint is None:
+        fingerprint = cached_catalog_fingerprint(catalog)
+    
+    cache_key = f"{fingerprint}:{min_scenarios}"
+    if cache_key in _VALIDATION_CACHE:
+        return True
+    
+    _check_catalog(catalog, min_scenarios)
+    _VALIDATION_CACHE[cache_key] = True
+    
+    print(f"✅ 场景目录验证通过！共有 {len(catalog)} 个场景")
     return True
 
 
@@ -1189,13 +1291,42 @@ def get_all_tags() -> List[str]:
     return list(set(tags))
 
 
-def get_catalog_metadata() -> Dict[str, Any]:
-    """获取场景目录的元数据"""
+def get_catalog_metadata(
+    catalog: List[Scenario] = None,
+    fingerprint: str = None
+) -> Dict[str, Any]:
+    """
+    获取场景目录的元数据
+    
+    元数据按目录内容哈希缓存，返回的是缓存的副本，调用方可以随意修改。
+    
+    Args:
+        catalog: 场景列表，如果为None则使用SCENARIO_CATALOG
+        fingerprint: 预先计算好的目录内容哈希，为None时取 cached_catalog_fingerprint(catalog)
+    """
+    if catalog is None:
+        catalog = SCENARIO_CATALOG
+    
+    if fingerprint is None:
+        fingerprint = cached_catalog_fingerprint(catalog)
+    metadata = _METADATA_CACHE.get(fingerprint)
+    if metadata is None:
+        categories = set()
+        tags = set()
+        for scenario in catalog:
+            categories.add(scenario.category)
+            tags.update(scenario.tags)
+        metadata = {
+            "total_scenarios": len(catalog),
+            "categories": list(categories),
+            "tags": list(tags),
+            "scenario_names": [s.name for s in catalog]
+        }
+        _METADATA_CACHE[fingerprint] = metadata
+    
     return {
-        "total_scenarios": len(SCENARIO_CATALOG),
-        "categories": get_all_categories(),
-        "tags": get_all_tags(),
-        "scenario_names": [s.name for s in SCENARIO_CATALOG]
+        key: list(value) if isinstance(value, list) else value
+        for key, value in metadata.items()
     }
 
 
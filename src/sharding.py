@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片数据集生成
+将生成任务切分为固定大小的分片，在进程池中并行生成。
+每个分片使用由基础种子派生的独立种子，分片划分只取决于样本数量和分片大小，
+因此输出与工作进程数量无关，逐字节一致。
+
+支持生成器的三种模式：
+- random: 每个分片独立随机采样
+- balanced: 按整轮切分（每轮每个场景各一条），样本数向上取整为场景数的整数倍
+- deterministic: 按顺序遍历场景的确定性序列切分，每个场景的变体数为样本数除以场景数向上取整
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dataset_io import format_extension, iter_dataset, open_dataset_writer, resolve_format
+from utils.rng import derive_seed
+
+
+# 默认每个分片的样本数量
+DEFAULT_SHARD_SIZE = 10000
+
+# 分片生成支持的模式
+SHARD_MODES = ("random", "balanced", "deterministic")
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def plan_shards(num_samples: int, shard_size: int = DEFAULT_SHARD_SIZE) -> List[Tuple[int, int]]:
+    """
+    规划分片
+
+    Args:
+        num_samples: 样本总数
+        shard_size: 每个分片的样本数量
+
+    Returns:
+        (分片编号, 分片样本数) 列表
+    """
+    if shard_size <= 0:
+        raise ValueError(f"分片大小必须为正数，当前为 {shard_size}")
+
+    shards = []
+    remaining = num_samples
+    index = 0
+    while remaining > 0:
+        count = min(shard_size, remaining)
+        shards.append((index, count))
+        remaining -= count
+        index += 1
+    return shards
+
+
+def shard_filename(prefix: str, index: int, fmt: str = "jsonl") -> str:
+    """分片文件名"""
+    return f"{prefix}-{index:05d}{format_extension(fmt)}"
+
+
+def file_sha256(path: str) -> str:
+    """计算文件的SHA-256摘要"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _shard_record(path: str, index: int, count: int, **extra) -> Dict[str, Any]:
+    """生成清单中单个分片的记录"""
+    return {
+        "index": index,
+        "file": os.path.basename(path),
+        "count": count,
+        "sha256": file_sha256(path),
+        **extra
+    }
+
+
+def _generate_shard(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在工作进程中生成一个分片
+
+    task["count"] 的单位随模式而定：random 为样本数，balanced 为轮数，
+    deterministic 为从 task["start"] 开始的确定性序列条数
+    """
+    # 在工作进程内导入，避免父进程导入顺序影响子进程
+    from generator import GirlfriendDatasetGenerator
+
+    generator = GirlfriendDatasetGenerator()
+    path = os.path.join(task["output_dir"], shard_filename(task["prefix"], task["index"], task["format"]))
+    extra = {}
+
+    if task["mode"] == "deterministic":
+        # 确定性序列按场景顺序排列，第 k 条为第 k // variations 个场景的第 k % variations 个变体
+        variations = task["variations"]
+        scenarios = generator.scenarios
+        entries = (
+            generator.generate_single_entry(scenarios[k // variations], k % variations)
+            for k in range(task["start"], task["start"] + task["count"])
+        )
+        extra["start"] = task["start"]
+    else:
+        shard_seed = derive_seed(task["seed"], "shard", task["index"])
+        if task["mode"] == "balanced":
+            entries = generator.iter_balanced(task["count"], seed=shard_seed)
+        else:
+            entries = generator.iter_random(task["count"], seed=shard_seed)
+        extra["seed"] = shard_seed
+
+    with open_dataset_writer(path, task["format"]) as writer:
+        writer.write_all(entries)
+
+    return _shard_record(path, task["index"], writer.count, **extra)
+
+
+def write_manifest(output_dir: str, manifest: Dict[str, Any]) -> str:
+    """
+    写出分片清单
+
+    Returns:
+        清单文件路径
+    """
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+    return path
+
+
+def generate_sharded_dataset(
+    output_dir: str,
+    num_samples: int,
+    seed: int = 0,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: Optional[int] = None,
+    prefix: str = "girlfriend_chat_dataset",
+    output_format: str = "jsonl",
+    mode: str = "random",
+    num_shards: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    在进程池中并行生成分片数据集
+
+    Args:
+        output_dir: 输出目录（分片文件和清单都写在这里）
+        num_samples: 样本总数（balanced/deterministic 模式向上取整为场景数的整数倍）
+        seed: 基础随机种子，每个分片的种子由它派生（deterministic 模式不使用）
+        shard_size: 每个分片的样本数量（balanced 模式向上取整为整轮）
+        workers: 工作进程数量，None表示使用全部CPU核心
+        prefix: 分片文件名前缀
+        output_format: 分片文件格式（见 dataset_io.DATASET_FORMATS）
+        mode: 生成模式，见 SHARD_MODES
+        num_shards: 分片数量；指定时忽略 shard_size，把全部样本尽量均分为这么多个分片
+
+    Returns:
+        分片清单（同时写入 output_dir/manifest.json）
+    """
+    from scenarios import SCENARIO_CATALOG, catalog_fingerprint
+
+    if mode not in SHARD_MODES:
+        raise ValueError(f"未知的分片生成模式: {mode}，可选 {', '.join(SHARD_MODES)}")
+    if num_shards is not None and num_shards <= 0:
+        raise ValueError(f"分片数量必须为正数，当前为 {num_shards}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_format = resolve_format(output_format)
+
+    # 按模式的计数单位（样本、轮或确定性序列中的条目）规划分片
+    scenario_count = len(SCENARIO_CATALOG)
+    rounds = -(-num_samples // scenario_count)
+    if mode == "random":
+        units, unit_size = num_samples, shard_size
+    elif mode == "balanced":
+        units, unit_size = rounds, -(-shard_size // scenario_count)
+    else:
+        units, unit_size = rounds * scenario_count, shard_size
+    if num_shards is not None:
+        unit_size = max(1, -(-units // num_shards))
+        # 清单中记录实际的分片大小（样本数）
+        shard_size = unit_size * scenario_count if mode == "balanced" else unit_size
+
+    tasks = []
+    start = 0
+    for index, count in plan_shards(units, unit_size):
+        tasks.append({
+            "index": index,
+            "start": start,
+            "count": count,
+            "seed": seed,
+            "mode": mode,
+            "variations": rounds,
+            "output_dir": output_dir,
+            "prefix": prefix,
+            "format": output_format
+        })
+        start += count
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shards = list(pool.map(_generate_shard, tasks))
+
+    # 清单中不记录工作进程数量和时间戳，保证相同参数下清单本身也逐字节一致
+    manifest = {
+        "mode": mode,
+        "format": output_format,
+        "seed": seed,
+        "shard_size": shard_size,
+        "total_count": sum(shard["count"] for shard in shards),
+        "catalog_fingerprint": catalog_fingerprint(),
+        "shards": shards
+    }
+    write_manifest(output_dir, manifest)
+    return manifest
+
+
+def write_shards(
+    entries: Iterable[Dict[str, str]],
+    output_dir: str,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    prefix: str = "girlfriend_chat_dataset",
+    output_format: str = "jsonl",
+    **manifest_fields
+) -> Dict[str, Any]:
+    """
+    将已生成的数据流按顺序切分写出为分片，并生成清单
+
+    Args:
+        entries: 数据迭代器
+        output_dir: 输出目录
+        shard_size: 每个分片的样本数量
+        prefix: 分片文件名前缀
+        output_format: 分片文件格式（见 dataset_io.DATASET_FORMATS）
+        **manifest_fields: 额外写入清单的字段
+
+    Returns:
+        分片清单
+    """
+    if shard_size <= 0:
+        raise ValueError(f"分片大小必须为正数，当前为 {shard_size}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_format = resolve_format(output_format)
+    shards = []
+    writer = None
+
+    for entry in entries:
+        if writer is None:
+            path = os.path.join(output_dir, shard_filename(prefix, len(shards), output_format))
+            writer = open_dataset_writer(path, output_format)
+        writer.write(entry)
+        if writer.count >= shard_size:
+            writer.close()
+            shards.append(_shard_record(writer.path, len(shards), writer.count))
+            writer = None
+
+    if writer is not None:
+        writer.close()
+        shards.append(_shard_record(writer.path, len(shards), writer.count))
+
+    manifest = {
+        **manifest_fields,
+        "format": output_format,
+        "shard_size": shard_size,
+        "total_count": sum(shard["count"] for shard in shards),
+        "shards": shards
+    }
+    write_manifest(output_dir, manifest)
+    return manifest
+
+
+def verify_manifest(output_dir: str) -> bool:
+    """校验目录中的分片文件与清单记录的哈希和条数是否一致"""
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    for shard in manifest["shards"]:
+        path = os.path.join(output_dir, shard["file"])
+        if not os.path.exists(path) or file_sha256(path) != shard["sha256"]:
+            return False
+        if sum(1 for _ in iter_dataset(path)) != shard["count"]:
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='并行分片生成虚拟女友数据集')
+    parser.add_argument('--num-samples', type=int, default=100000, help='样本总数 (默认: 100000)')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f'每个分片的样本数量 (默认: {DEFAULT_SHARD_SIZE})')
+    parser.add_argument('--shards', type=int, default=None, help='分片数量，指定时忽略 --shard-size')
+    parser.add_argument('--mode', type=str, default='random', choices=SHARD_MODES,
+                        help='生成模式 (默认: random)')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数量 (默认: CPU核心数)')
+    parser.add_argument('--seed', type=int, default=0, help='基础随机种子 (默认: 0)')
+    parser.add_argument('--output-dir', type=str, default='train_data/shards', help='输出目录')
+    parser.add_argument('--format', type=str, default='jsonl', choices=['jsonl', 'jsonl.gz', 'parquet'],
+                        help='分片文件格式 (默认: jsonl)')
+    args = parser.parse_args()
+
+    start = time.time()
+    manifest = generate_sharded_dataset(
+        args.output_dir,
+        args.num_samples,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        output_format=args.format,
+        mode=args.mode,
+        num_shards=args.shards
+    )
+    elapsed = time.time() - start
+
+    print(f"✅ 生成 {manifest['total_count']} 条数据，共 {len(manifest['shards'])} 个分片")
+    print(f"   耗时: {elapsed:.2f}秒")
+    print(f"   清单: {os.path.join(args.output_dir, MANIFEST_FILENAME)}")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全量相似度审计
+对整个数据集做一遍近邻查找：同一 instruction 下的每条输出，与之前所有输出中相似度
+（归一化文本上的 SequenceMatcher.ratio，与质量控制相同）不低于 floor 的都会被找到。
+候选由 near_dup.CandidateIndex（MinHash-LSH，重复字符多的文本逐一比较）给出，只对候选做
+分级比较：相似度不低于 floor 的文本对以不低于 recall 的概率成为候选，LSH 排除字符集合明显
+不同的文本对，因此不再需要抽样后两两比较。
+
+相似度低于 floor 的文本对不会被逐一计算：最近邻相似度低于 floor 的条目在直方图中
+归入 "<floor" 一栏，最高相似度低于 floor 时也只报告 "低于 floor"。
+"""
+
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dataset_io import iter_dataset
+from near_dup import DEFAULT_RECALL, CandidateIndex
+from utils.text import SimilarityCascade, normalize_text
+
+
+DEFAULT_FLOOR = 0.6
+DEFAULT_NUM_PERM = 128
+DEFAULT_TOP_K = 3
+DEFAULT_BINS = 10
+
+
+class SimilarityAudit:
+    """相似度审计累加器：逐条添加数据，单遍得到最高相似度、近邻直方图和每个 instruction 的最相似文本对"""
+
+    def __init__(
+        self,
+        floor: float = DEFAULT_FLOOR,
+        num_perm: int = DEFAULT_NUM_PERM,
+        top_k: int = DEFAULT_TOP_K,
+        bins: int = DEFAULT_BINS,
+        threshold: Optional[float] = None,
+        recall: float = DEFAULT_RECALL
+    ):
+        """
+        初始化累加器
+
+        Args:
+            floor: 需要精确找出的最低相似度，低于它的文本对只计入 "<floor"
+            num_perm: MinHash 签名长度
+            top_k: 每个 instruction 保留的最相似文本对数量
+            bins: [floor, 1] 区间上近邻相似度直方图的桶数
+            threshold: 统计相似度达到该阈值的文本对数量（如质量控制的相似度阈值），为None时不统计
+            recall: 相似度为 floor 的文本对成为候选的最低概率
+        """
+        if not 0.0 < floor <= 1.0:
+            raise ValueError(f"floor 必须在 (0, 1] 之间，当前为 {floor}")
+        if threshold is not None and threshold < floor:
+            raise ValueError(f"threshold ({threshold}) 不能低于 floor ({floor})，否则无法统计全部文本对")
+        self.floor = floor
+        self.top_k = top_k
+        self.bins = bins
+        self.threshold = threshold
+        self.index = CandidateIndex(floor, num_perm, recall)
+        self.cascade = SimilarityCascade(floor)
+
+        self.total = 0
+        self._entries: List[Tuple[str, str, str]] = []
+        self._texts: List[str] = []
+        # 每条数据与同一 instruction 下其他数据的最高相似度（低于 floor 时为0）
+        self._nearest: List[float] = []
+        self.pairs_above_threshold = 0
+        self._top_pairs: Dict[str, List[Tuple[float, int, int]]] = {}
+
+    def add(self, entry: Dict[str, str]):
+        """添加一条数据，并与同一 instruction 下已添加的数据比较"""
+        index = self.total
+        self.total += 1
+        instruction = entry["instruction"]
+        text = normalize_text(entry["output"])
+        self._entries.append((instruction, entry["input"], entry["output"]))
+        self._texts.append(text)
+        self._nearest.append(0.0)
+        # 空文本与任何文本的相似度都视为0
+        if not text:
+            return
+
+        signature = self.index.signature(text)
+        for other in self.index.candidates(instruction, text, signature):
+            similarity = self.cascade.check(self._texts[other], text)
+            if similarity is None:
+                continue
+            self._nearest[index] = max(self._nearest[index], similarity)
+            self._nearest[other] = max(self._nearest[other], similarity)
+            if self.threshold is not None and similarity >= self.threshold:
+                self.pairs_above_threshold += 1
+            top = self._top_pairs.setdefault(instruction, [])
+            item = (similarity, other, index)
+            if len(top) < self.top_k:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+        self.index.add(index, instruction, text, signature)
+
+    def update(self, entries: Iterable[Dict[str, str]]) -> "SimilarityAudit":
+        """添加一批数据（可以是任意迭代器），返回自身以便链式调用"""
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    @property
+    def max_similarity(self) -> float:
+        """同一 instruction 下两条数据的最高相似度；低于 floor 时为0"""
+        return max(self._nearest, default=0.0)
+
+    def histogram(self) -> Dict[str, int]:
+        """每条数据的近邻相似度直方图：[floor, 1] 等分为 bins 个区间，另有 "<floor" 一栏"""
+        width = (1.0 - self.floor) / self.bins
+        counts = [0] * self.bins
+        below = 0
+        for similarity in self._nearest:
+            if similarity < self.floor:
+                below += 1
+            else:
+                counts[min(int((similarity - self.floor) / width), self.bins - 1) if width else 0] += 1
+        histogram = {f"<{self.floor:.2f}": below}
+        for bucket, count in enumerate(counts):
+            start = self.floor + bucket * width
+            histogram[f"{start:.2f}-{start + width:.2f}"] = count
+        return histogram
+
+    def top_pairs(self) -> Dict[str, List[Dict[str, Any]]]:
+        """每个 instruction 中相似度最高的 top_k 对（按相似度从高到低）"""
+        result = {}
+        for instruction in sorted(self._top_pairs):
+            result[instruction] = [
+                {
+                    "similarity": round(similarity, 4),
+                    "first": {"index": first, "input": self._entries[first][1], "output": self._entries[first][2]},
+                    "second": {"index": second, "input": self._entries[second][1], "output": self._entries[second][2]},
+                }
+                for similarity, first, second in sorted(self._top_pairs[instruction], reverse=True)
+            ]
+        return result
+
+    def result(self) -> Dict[str, Any]:
+        """生成审计结果"""
+        max_similarity = self.max_similarity
+        return {
+            "total_samples": self.total,
+            "floor": self.floor,
+            # 最高相似度低于 floor 时只知道上界
+            "max_similarity": round(max_similarity, 4) if max_similarity >= self.floor else None,
+            "threshold": self.threshold,
+            "pairs_above_threshold": self.pairs_above_threshold if self.threshold is not None else None,
+            "nearest_neighbor_histogram": self.histogram(),
+            "top_pairs": self.top_pairs(),
+            "similarity_cascade": self.cascade.as_dict()
+        }
+
+    def summary(self) -> str:
+        """一行文字摘要"""
+        max_similarity = self.max_similarity
+        text = (f"{max_similarity:.3f}" if max_similarity >= self.floor else f"< {self.floor:.2f}")
+        line = f"全量 {self.total} 条，同一 instruction 内最高相似度 {text}"
+        if self.threshold is not None:
+            line += f"，相似度 >= {self.threshold} 的文本对 {self.pairs_above_threshold} 对"
+        return line
+
+
+def audit_similarity(
+    entries: Iterable[Dict[str, str]],
+    floor: float = DEFAULT_FLOOR,
+    top_k: int = DEFAULT_TOP_K,
+    threshold: Optional[float] = None,
+    **kwargs
+) -> SimilarityAudit:
+    """
+    对数据集做全量相似度审计
+
+    Args:
+        entries: 数据（可以是任意迭代器）
+        floor: 需要精确找出的最低相似度
+        top_k: 每个 instruction 报告的最相似文本对数量
+        threshold: 统计相似度达到该阈值的文本对数量
+        **kwargs: 传给 SimilarityAudit 的其他参数
+
+    Returns:
+        累加器，调用 result() 得到审计结果
+    """
+    return SimilarityAudit(floor=floor, top_k=top_k, threshold=threshold, **kwargs).update(entries)
+
+
+def audit_file(path: str, **kwargs) -> SimilarityAudit:
+    """单遍扫描数据集文件做全量相似度审计（参数同 audit_similarity）"""
+    return audit_similarity(iter_dataset(path), **kwargs)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+布隆过滤器
+固定大小的位数组，用于在大规模生成中判断文本是否已经出现过。内存占用只由容量和
+目标误判率决定，与实际加入的元素数量无关；代价是可能把从未出现过的文本误判为已出现
+（误判率可配置并可随时估计），但不会漏判已加入的文本。
+"""
+
+import hashlib
+import math
+
+
+DEFAULT_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """固定大小的布隆过滤器（双重哈希）"""
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        """
+        按预期容量和目标误判率分配位数组
+
+        Args:
+            capacity: 预期加入的元素数量；超出后仍可继续加入，但误判率会上升
+            error_rate: 加入 capacity 个元素时的目标误判率，取值在 (0, 1) 之间
+        """
+        if capacity <= 0:
+            raise ValueError(f"容量必须为正数，当前为 {capacity}")
+        if not 0 < error_rate < 1:
+            raise ValueError(f"误判率必须在0和1之间，当前为 {error_rate}")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # 最优位数 m = -n ln p / (ln 2)^2，最优哈希个数 k = m / n * ln 2
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        """元素对应的 k 个位下标（由一个128位摘要的两半做双重哈希）"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> bool:
+        """
+        加入元素
+
+        Returns:
+            元素此前不在过滤器中时为True（可能因误判而返回False）
+        """
+        bits = self._bits
+        added = False
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        """已加入的（被判定为新的）元素数量"""
+        return self.count
+
+    @property
+    def size_bytes(self) -> int:
+        """位数组占用的字节数"""
+        return len(self._bits)
+
+    def false_positive_rate(self) -> float:
+        """按当前元素数量估计的误判率 (1 - e^(-kn/m))^k"""
+        return (1.0 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
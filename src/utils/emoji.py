@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表情符号识别
+数据集生成、质量控制、统计和变化引擎共用的表情判定。表情字符由一张码位区间表定义，
+模块加载时编译成一个字符类（用于判断是否含有表情）和一个表情序列正则（用于计数、查找和删除）。
+
+计数和删除以完整的表情序列为单位：变体选择符（U+FE0E/U+FE0F）、肤色修饰符、标签序列和
+零宽连接符（U+200D）连起来的组合表情（如 "❤️"、"👨‍👩‍👧"）、国旗（两个区域指示符）和
+键帽（"1️⃣"）都算作一个表情。
+"""
+
+import re
+from typing import List, Tuple
+
+
+# 表情码位区间（闭区间）
+EMOJI_RANGES = (
+    (0x203C, 0x203C),    # double exclamation mark
+    (0x2049, 0x2049),    # exclamation question mark
+    (0x2300, 0x23FF),    # miscellaneous technical
+    (0x2600, 0x26FF),    # miscellaneous symbols
+    (0x2700, 0x27BF),    # dingbats
+    (0x2B05, 0x2B07),    # arrows
+    (0x2B1B, 0x2B1C),    # large squares
+    (0x2B50, 0x2B50),    # star
+    (0x2B55, 0x2B55),    # heavy circle
+    (0x3030, 0x3030),    # wavy dash
+    (0x303D, 0x303D),    # part alternation mark
+    (0x3297, 0x3297),    # circled ideograph congratulation
+    (0x3299, 0x3299),    # circled ideograph secret
+    (0x1F004, 0x1F0CF),  # mahjong tiles / playing cards
+    (0x1F170, 0x1F1FF),  # enclosed alphanumerics / regional indicators (flags)
+    (0x1F200, 0x1F2FF),  # enclosed ideographic supplement
+    (0x1F300, 0x1F5FF),  # symbols & pictographs
+    (0x1F600, 0x1F64F),  # emoticons
+    (0x1F680, 0x1F6FF),  # transport & map symbols
+    (0x1F7E0, 0x1F7EB),  # geometric shapes extended
+    (0x1F900, 0x1F9FF),  # supplemental symbols and pictographs
+    (0x1FA00, 0x1FAFF),  # extended-A / extended-B
+)
+
+_ZWJ = '\u200d'
+_KEYCAP = '\u20e3'
+_KEYCAP_BASES = '0-9#*'
+_REGIONAL_INDICATORS = '\U0001F1E6-\U0001F1FF'
+
+_RANGE_CLASS = "".join(f"{re.escape(chr(start))}-{re.escape(chr(end))}" for start, end in EMOJI_RANGES)
+# 变体选择符、肤色修饰符、标签字符
+_MODIFIERS = "[\ufe0e\ufe0f\U0001F3FB-\U0001F3FF\U000E0020-\U000E007F]*"
+_ELEMENT = "[" + _RANGE_CLASS + "]" + _MODIFIERS
+
+# 任一表情字符（含键帽符号）
+_EMOJI_CHAR = re.compile("[" + _RANGE_CLASS + _KEYCAP + "]")
+# 完整的表情序列。整个模式以一个字符类开头，re 可以直接跳到可能的起点，
+# 不必在每个位置尝试各个分支；分支只在起点字符确定后用前后断言区分
+_EMOJI_SEQUENCE = re.compile(
+    "[" + _RANGE_CLASS + _KEYCAP_BASES + _KEYCAP + "]"
+    "(?:(?<=[" + _KEYCAP_BASES + "])\ufe0f?" + _KEYCAP         # 键帽：数字、#、* 之后必须是键帽符号
+    + "|(?<=[" + _REGIONAL_INDICATORS + "])[" + _REGIONAL_INDICATORS + "]"  # 国旗：两个区域指示符
+    + "|(?<![" + _KEYCAP_BASES + "]))"                           # 其他表情
+    + _MODIFIERS + "(?:" + _ZWJ + _ELEMENT + ")*"               # 修饰符和零宽连接的后续表情
+)
+
+
+def has_emoji(text: str) -> bool:
+    """判断文本中是否含有表情"""
+    return _EMOJI_CHAR.search(text) is not None
+
+
+def count_emoji(text: str) -> int:
+    """文本中的表情数量（组合表情、国旗、键帽各算一个）"""
+    return len(_EMOJI_SEQUENCE.findall(text))
+
+
+def strip_emoji(text: str) -> str:
+    """删除文本中的全部表情（连同其变体选择符、修饰符和零宽连接符）"""
+    return _EMOJI_SEQUENCE.sub('', text)
+
+
+def find_emoji(text: str) -> List[Tuple[int, str]]:
+    """
+    文本中的全部表情
+
+    Returns:
+        (起始下标, 表情) 列表，按出现顺序排列
+    """
+    return [(match.start(), match.group()) for match in _EMOJI_SEQUENCE.finditer(text)]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多模式短语匹配
+把一组短语编译成一个匹配器，一次扫描找出文本中所有可替换的位置，
+再一次性重建输出字符串。同一位置有多个短语可以匹配时取最长的一个，
+匹配结果互不重叠。
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+
+# (起始下标, 结束下标, 命中的短语)
+Span = Tuple[int, int, str]
+
+
+class PhraseMatcher:
+    """编译好的多短语匹配器（最左最长匹配，结果互不重叠）"""
+
+    def __init__(self, phrases: Iterable[str]):
+        """
+        编译匹配器
+
+        Args:
+            phrases: 短语集合（重复和空串会被忽略）
+        """
+        self.phrases = tuple(dict.fromkeys(phrase for phrase in phrases if phrase))
+        # 按长度降序排列的字面量分支：正则引擎在每个位置按顺序尝试分支，
+        # 第一个命中的就是该位置最长的短语，整段文本只扫描一遍
+        ordered = sorted(self.phrases, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, ordered))) if ordered else None
+
+    def find_all(self, text: str, limit: Optional[int] = None) -> List[Span]:
+        """
+        找出文本中所有匹配位置
+
+        Args:
+            text: 待匹配文本
+            limit: 最多返回的匹配数量，None表示不限
+
+        Returns:
+            按位置排列的 (起始下标, 结束下标, 短语) 列表
+        """
+        if self._pattern is None or limit == 0:
+            return []
+        spans = []
+        for match in self._pattern.finditer(text):
+            spans.append((match.start(), match.end(), match.group()))
+            if limit is not None and len(spans) >= limit:
+                break
+        return spans
+
+    def first_occurrences(self, text: str) -> List[Span]:
+        """每个短语只保留第一次出现的位置（按位置排列）"""
+        seen = set()
+        spans = []
+        for span in self.find_all(text):
+            if span[2] not in seen:
+                seen.add(span[2])
+                spans.append(span)
+        return spans
+
+    @staticmethod
+    def rewrite(text: str, replacements: Iterable[Span]) -> str:
+        """
+        按替换列表一次性重建字符串
+
+        Args:
+            text: 原文本
+            replacements: (起始下标, 结束下标, 替换文本) 列表，区间互不重叠，顺序不限
+
+        Returns:
+            替换后的文本
+        """
+        parts = []
+        pos = 0
+        for start, end, replacement in sorted(replacements):
+            parts.append(text[pos:start])
+            parts.append(replacement)
+            pos = end
+        if pos == 0 and not parts:
+            return text
+        parts.append(text[pos:])
+        return ''.join(parts)
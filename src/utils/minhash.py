@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MinHash 签名
+把文本的字符 n-gram 集合压缩成固定长度的签名，两个签名中相同位置取值相等的比例
+是两段文本 Jaccard 相似度的无偏估计。签名只依赖文本内容和种子，
+不受 PYTHONHASHSEED 影响，在不同进程、不同运行之间保持一致。
+"""
+
+import hashlib
+import operator
+import random
+from functools import lru_cache
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE_SIZE = 2
+
+# 空文本签名的取值：大于任何64位哈希，因此与任何非空文本的签名都不相等
+_EMPTY_VALUE = 1 << 64
+_MASK64 = (1 << 64) - 1
+# n-gram 行缓存的总容量（缓存的哈希值个数）：每组签名参数最多缓存 _ROW_CACHE_VALUES // num_perm 行，
+# 每个值（64位 Python 整数加元组槽位）约44字节，即每组参数约11MB
+_ROW_CACHE_VALUES = 1 << 18
+# 按 (seed, num_perm) 共享的行缓存：参数相同的签名生成器置换相同，各索引和审计无需各自缓存一份
+_ROW_CACHES: Dict[Tuple[int, int], Dict[str, Tuple[int, ...]]] = {}
+
+Signature = Tuple[int, ...]
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> Set[str]:
+    """
+    文本的字符 n-gram 集合
+
+    Args:
+        text: 文本
+        size: n-gram 长度
+
+    Returns:
+        n-gram 集合；文本短于 size 时为只含文本本身的集合（空文本为空集）
+    """
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+@lru_cache(maxsize=1 << 16)
+def _shingle_hash(shingle: str) -> int:
+    """n-gram 的稳定64位哈希"""
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 终结函数：把64位整数打散成近似独立均匀的64位值"""
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+
+class MinHasher:
+    """固定参数的 MinHash 签名生成器"""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        """
+        初始化签名生成器
+
+        Args:
+            num_perm: 签名长度（哈希置换数量），越长估计越准、计算越慢
+            shingle_size: 字符 n-gram 长度
+            seed: 生成哈希置换参数的种子，比较签名时双方必须一致
+        """
+        if num_perm <= 0:
+            raise ValueError(f"签名长度必须为正数，当前为 {num_perm}")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # 每个"置换"是 mix(n-gram 哈希 ^ 随机掩码)。只做异或而不打散时，各 n-gram 成为最小值的
+        # 概率不均等，会系统性地低估相似度。n-gram 在所有置换下的取值按行缓存，
+        # 签名只需在C层对各行逐列取最小值
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+        self._rows = _ROW_CACHES.setdefault((seed, num_perm), {})
+        self._row_cache_size = max(256, _ROW_CACHE_VALUES // num_perm)
+
+    def _row(self, shingle: str) -> Tuple[int, ...]:
+        """n-gram 在各个置换下的哈希值"""
+        row = self._rows.get(shingle)
+        if row is None:
+            h = _shingle_hash(shingle)
+            row = tuple([_mix64(h ^ mask) for mask in self._masks])
+            if len(self._rows) < self._row_cache_size:
+                self._rows[shingle] = row
+        return row
+
+    def signature(self, text: str) -> Signature:
+        """
+        计算文本的签名
+
+        Returns:
+            长度为 num_perm 的整数元组；空文本的签名与任何非空文本都不相等
+        """
+        rows = [self._row(shingle) for shingle in shingles(text, self.shingle_size)]
+        if not rows:
+            return (_EMPTY_VALUE,) * self.num_perm
+        if len(rows) == 1:
+            return rows[0]
+        return tuple(map(min, *rows))
+
+    def signatures(self, texts: Sequence[str]) -> List[Signature]:
+        """批量计算签名（相同文本只计算一次）"""
+        cache = {}
+        result = []
+        for text in texts:
+            if text not in cache:
+                cache[text] = self.signature(text)
+            result.append(cache[text])
+        return result
+
+
+def estimate_similarity(sig_a: Signature, sig_b: Signature) -> float:
+    """
+    由两个签名估计 Jaccard 相似度
+
+    Returns:
+        0到1之间的相似度估计
+    """
+    if len(sig_a) != len(sig_b):
+        raise ValueError(f"签名长度不一致: {len(sig_a)} != {len(sig_b)}")
+    return sum(map(operator.eq, sig_a, sig_b)) / len(sig_a)
+
+
+def select_diverse(signatures: Sequence[Signature], k: int) -> List[int]:
+    """
+    贪心地选出 k 个两两最不相似的元素（最远点采样）
+
+    第一个元素总被选中；之后每一步选择与已选集合最大相似度最小的候选，
+    相同时取下标较小者，因此结果是确定的。
+
+    Args:
+        signatures: 候选签名列表
+        k: 要选出的数量
+
+    Returns:
+        被选中候选的下标（按选择顺序）
+    """
+    n = len(signatures)
+    if k <= 0 or n == 0:
+        return []
+    if k >= n:
+        return list(range(n))
+
+    selected = [0]
+    # 每个候选与已选集合的最大相似度，随选择增量更新
+    closest = [estimate_similarity(signatures[0], sig) for sig in signatures]
+    closest[0] = float('inf')
+    while len(selected) < k:
+        best = min(range(n), key=closest.__getitem__)
+        selected.append(best)
+        closest[best] = float('inf')
+        for i in range(n):
+            if closest[i] != float('inf'):
+                closest[i] = max(closest[i], estimate_similarity(signatures[best], signatures[i]))
+    return selected
+
+
+def diversity_score(signatures: Sequence[Signature]) -> float:
+    """
+    一组文本的多样性得分：1 减去两两估计相似度的平均值
+
+    Returns:
+        0到1之间的得分，越高越多样；少于两个元素时为0.0
+    """
+    n = len(signatures)
+    if n < 2:
+        return 0.0
+    total = 0.0
+    for i in range(n):
+        for j in range(i + 1, n):
+            total += estimate_similarity(signatures[i], signatures[j])
+    return 1.0 - total / (n * (n - 1) / 2)
+
+
+def lsh_bands(num_perm: int, threshold: float, recall: float = 0.999) -> Tuple[int, int]:
+    """
+    选择 LSH 分带参数
+
+    两个 Jaccard 相似度为 j 的集合至少在一个带上完全相同（成为候选对）的概率是
+    1 - (1 - j^r)^b。在保证相似度为 threshold 的集合对以不低于 recall 的概率成为候选的前提下，
+    取每带行数 r 最大（候选对最少）的方案。
+
+    Args:
+        num_perm: 签名长度
+        threshold: 需要保证召回的 Jaccard 相似度
+        recall: 目标召回率
+
+    Returns:
+        (带数 b, 每带行数 r)，b * r <= num_perm
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1.0 - (1.0 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+        else:
+            break
+    return best
+
+
+class LSHIndex:
+    """MinHash 签名的分带 LSH 索引：签名在任一带上完全相同的元素互为候选"""
+
+    def __init__(self, bands: int, rows: int):
+        """
+        Args:
+            bands: 带数
+            rows: 每带行数（签名长度至少为 bands * rows）
+        """
+        self.bands = bands
+        self.rows = rows
+        self._buckets: Dict[Tuple, List[Hashable]] = {}
+
+    def _band_keys(self, signature: Signature, namespace: Hashable) -> List[Tuple]:
+        rows = self.rows
+        return [
+            (namespace, band, signature[band * rows:(band + 1) * rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: Hashable, signature: Signature, namespace: Hashable = None):
+        """
+        加入元素
+
+        Args:
+            key: 元素标识
+            signature: 元素的 MinHash 签名
+            namespace: 命名空间，只有同一命名空间中的元素互为候选
+        """
+        for band_key in self._band_keys(signature, namespace):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def candidates(self, signature: Signature, namespace: Hashable = None) -> List[Hashable]:
+        """与签名至少在一个带上相同的已加入元素（按加入顺序去重）"""
+        found: Dict[Hashable, None] = {}
+        for band_key in self._band_keys(signature, namespace):
+            for key in self._buckets.get(band_key, ()):
+                found[key] = None
+        return list(found)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+随机种子工具
+由基础种子和任意键派生稳定的子种子，结果不受 PYTHONHASHSEED 影响，
+在不同进程、不同运行之间保持一致
+"""
+
+import hashlib
+import random
+
+
+def derive_seed(*parts) -> int:
+    """
+    由若干部分派生一个稳定的64位种子
+
+    Args:
+        *parts: 基础种子及任意可 repr 的键（如分片编号、文本内容）
+
+    Returns:
+        64位无符号整数种子
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return int.from_bytes(digest.digest(), 'big')
+
+
+def encode_rng_state(rng: random.Random) -> list:
+    """
+    将随机数流的内部状态转换为可JSON序列化的列表
+
+    Args:
+        rng: 随机数流
+
+    Returns:
+        [版本, 状态整数列表, gauss_next]
+    """
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def decode_rng_state(state: list) -> random.Random:
+    """
+    由 encode_rng_state 的结果恢复随机数流
+
+    Returns:
+        从保存时的位置继续取数的新随机数流
+    """
+    version, internal, gauss_next = state
+    rng = random.Random()
+    rng.setstate((version, tuple(internal), gauss_next))
+    return rng
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本归一化
+去重、相似度比较和多样性挑选共用的文本归一化。正则在模块加载时编译一次，
+归一化结果按文本缓存：同一条文本在一次运行中无论参与多少次比较都只归一化一次。
+"""
+
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from utils.emoji import strip_emoji
+
+
+# 每种归一化缓存的文本数量
+NORMALIZE_CACHE_SIZE = 1 << 16
+
+_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+# 表情、标点、空白和下划线
+_NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """
+    去重使用的归一化：去掉表情和标点，转为小写，合并连续空白
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        归一化后的文本
+    """
+    text = strip_emoji(text)
+    text = _PUNCTUATION_PATTERN.sub('', text).lower().strip()
+    return _WHITESPACE_PATTERN.sub(' ', text)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def compact_text(text: str) -> str:
+    """
+    多样性比较使用的归一化：去掉表情、标点和空白（只差一个表情或标点的文本视为相同）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        只包含文字的文本
+    """
+    return _NON_WORD_PATTERN.sub('', text)
+
+
+def normalized_similarity(normalized1: str, normalized2: str) -> float:
+    """
+    两段已归一化文本的 SequenceMatcher 相似度
+
+    Returns:
+        0到1之间的相似度；任一文本为空时为0.0
+    """
+    if not normalized1 or not normalized2:
+        return 0.0
+    return SequenceMatcher(None, normalized1, normalized2).ratio()
+
+
+class SimilarityCascade:
+    """
+    分级相似度判定：只需要知道相似度是否达到阈值时，先用两个廉价的上界排除不可能达到阈值的文本对
+
+    1. 长度上界 2·min(|a|, |b|) / (|a| + |b|)（SequenceMatcher.real_quick_ratio）
+    2. 字符多重集合重叠上界（SequenceMatcher.quick_ratio）
+    3. 精确相似度 SequenceMatcher.ratio
+
+    两个上界都不小于精确相似度，因此判定结果与直接计算 ratio 完全相同。
+    连续比较时第二段文本不变则复用其字符索引，把固定的一方放在 b 可以减少重复计算。
+    """
+
+    TIERS = ("length", "multiset", "exact")
+
+    def __init__(self, threshold: float):
+        """
+        Args:
+            threshold: 相似度阈值
+        """
+        self.threshold = threshold
+        self._matcher = SequenceMatcher(None)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清空各级计数"""
+        self.pairs = 0
+        # 每一级判定为达不到阈值的文本对数量
+        self.pruned = {tier: 0 for tier in self.TIERS}
+        self.matched = 0
+
+    def check(self, normalized1: str, normalized2: str) -> Optional[float]:
+        """
+        判断两段已归一化文本的相似度（与 normalized_similarity 的参数顺序相同）是否达到阈值
+
+        Returns:
+            达到阈值时为精确相似度，否则为None
+        """
+        self.pairs += 1
+        if not normalized1 or not normalized2:
+            # 空文本相似度为0
+            if self.threshold <= 0.0:
+                self.matched += 1
+                return 0.0
+            self.pruned["length"] += 1
+            return None
+
+        threshold = self.threshold
+        matcher = self._matcher
+        matcher.set_seq2(normalized2)
+        matcher.set_seq1(normalized1)
+        if matcher.real_quick_ratio() < threshold:
+            self.pruned["length"] += 1
+            return None
+        if matcher.quick_ratio() < threshold:
+            self.pruned["multiset"] += 1
+            return None
+        similarity = matcher.ratio()
+        if similarity < threshold:
+            self.pruned["exact"] += 1
+            return None
+        self.matched += 1
+        return similarity
+
+    def prune_rates(self) -> Dict[str, float]:
+        """各级排除的文本对占全部比较的比例"""
+        return {tier: count / self.pairs if self.pairs else 0.0 for tier, count in self.pruned.items()}
+
+    def as_dict(self) -> Dict[str, Any]:
+        """计数和各级排除比例"""
+        return {
+            "pairs": self.pairs,
+            "pruned": dict(self.pruned),
+            "matched": self.matched,
+            "prune_rates": {tier: round(rate, 4) for tier, rate in self.prune_rates().items()},
+        }
+
+    def summary(self) -> str:
+        """一行文字摘要"""
+        rates = self.prune_rates()
+        return (
+            f"比较 {self.pairs} 对：长度上界排除 {rates['length']:.1%}，"
+            f"字符上界排除 {rates['multiset']:.1%}，精确比较排除 {rates['exact']:.1%}，"
+            f"达到阈值 {self.matched} 对"
+        )
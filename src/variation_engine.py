@@ -5,244 +5,773 @@
 为虚拟女友聊天数据生成多样化的回复变体
 """
 
+import math
 import random
-from typing import List, Dict, Optional, Set
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Callable, List, Dict, Iterator, Optional, Sequence, Tuple, Union
 import re
 
+from lexicon import Lexicon, load_lexicon
+from utils.bloom import DEFAULT_ERROR_RATE, BloomFilter
+from utils.emoji import find_emoji, has_emoji
+from utils.matcher import PhraseMatcher
+from utils.minhash import MinHasher, diversity_score, select_diverse
+from utils.rng import derive_seed
+from utils.text import compact_text
+
+
+# 模式和词表在模块加载时编译一次，不在每次调用时重建
+_PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+_SENTENCE_DELIMITERS = frozenset(['！', '~', '。', '？'])
+
+# 人设校验使用的积极/安慰性词汇
+_POSITIVE_WORDS = (
+    '好', '开心', '快乐', '爱', '喜欢', '加油', '相信', '支持', '陪',
+    '温暖', '美好', '幸福', '棒', '厉害', '优秀', '可以', '没问题',
+    '放心', '安心', '舒服', '甜', '可爱', '亲爱', '宝贝', '呢', '呀',
+    '啦', '哦', '嘛', '吖'
+)
+
+# 每个引擎默认缓存的已编译模板数量
+DEFAULT_TEMPLATE_CACHE_SIZE = 1024
+
+# 开启多样性挑选时建议的候选倍数：生成 num_variants 的3倍候选，再从中挑选两两差异最大的 num_variants 个
+DEFAULT_DIVERSITY_OVERSAMPLE = 3
+# 变体很短，32位签名足以区分候选的远近
+DIVERSITY_NUM_PERM = 32
+
+# 变体流布隆过滤器的默认容量（约1.8MB，误判率0.1%时）
+DEFAULT_STREAM_CAPACITY = 1_000_000
+# 变体流的随机策略阶段连续这么多次没有产出新变体后，转为遍历变体空间
+STREAM_MISS_LIMIT = 100
+
+# 随机模式可选的变换策略；保持结构时只使用不改变句序的策略
+_STRATEGIES = (
+    "synonym_replace",
+    "emoji_variation",
+    "tone_modifier",
+    "placeholder_fill",
+    "sentence_reorder",
+    "prefix_suffix",
+    "combined"
+)
+_STRUCTURE_PRESERVING_STRATEGIES = (
+    "synonym_replace",
+    "emoji_variation",
+    "tone_modifier",
+    "placeholder_fill",
+    "prefix_suffix"
+)
+
+# 批量生成时每个任务块包含的模板数量
+DEFAULT_BATCH_CHUNK_SIZE = 256
+
+class CompiledTemplate:
+    """
+    模板的编译结果：一次扫描得到各变换策略需要的结构
+
+    Attributes:
+        text: 原始文本
+        segments: (是否为占位符, 文本或占位符名) 序列，按原文顺序交替排列
+        placeholders: 占位符名（按出现顺序，可重复）
+        sentences: 按句末标点切分的句子（含标点）
+        sentence_ends: 各句末标点之后的下标
+        emojis: 表情符号（按出现顺序，带变体选择符或零宽连接的组合表情整体算一个）
+        emoji_positions: 各表情符号在原文中的下标
+        synonym_spans: 同义词库词条第一次出现的位置 (起始, 结束, 词条)，最长匹配、互不重叠
+        synonym_hits: 原文中出现的同义词库词条（按出现位置）
+    """
+
+    __slots__ = (
+        "text", "segments", "placeholders", "sentences", "sentence_ends", "emojis", "emoji_positions",
+        "synonym_spans", "synonym_hits"
+    )
+
+    def __init__(self, text: str, synonym_matcher: PhraseMatcher):
+        segments = []
+        pos = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(text):
+            if match.start() > pos:
+                segments.append((False, text[pos:match.start()]))
+            segments.append((True, match.group(1)))
+            pos = match.end()
+        if pos < len(text):
+            segments.append((False, text[pos:]))
+
+        sentence_ends = [i + 1 for i, char in enumerate(text) if char in _SENTENCE_DELIMITERS]
+        found = [(start, emoji) for start, emoji in find_emoji(text)]
+        self._assign(text, segments, sentence_ends, found, synonym_matcher.first_occurrences(text))
+
+    def _assign(
+        self,
+        text: str,
+        segments: List[Tuple[bool, str]],
+        sentence_ends: List[int],
+        found_emojis: List[Tuple[int, str]],
+        synonym_spans: List[Tuple[int, int, str]]
+    ):
+        """由各结构的位置设置属性（位置均已按原文排序）"""
+        self.text = text
+        self.segments = tuple(segments)
+        self.placeholders = tuple(value for is_slot, value in segments if is_slot)
+
+        sentences = []
+        start = 0
+        for end in sentence_ends:
+            sentences.append(text[start:end])
+            start = end
+        if start < len(text):
+            sentences.append(text[start:])
+        self.sentences = tuple(sentences)
+        self.sentence_ends = tuple(sentence_ends)
+
+        self.emojis = tuple(emoji for _, emoji in found_emojis)
+        self.emoji_positions = tuple(start for start, _ in found_emojis)
+        self.synonym_spans = tuple(synonym_spans)
+        self.synonym_hits = tuple(word for _, _, word in self.synonym_spans)
+
+    def fill(
+        self,
+        values: Sequence[Optional[str]],
+        fragment: Callable[[str], "CompiledTemplate"]
+    ) -> "CompiledTemplate":
+        """
+        填充占位符，并由模板和取值各自的编译结果得到填充后文本的结构，不再扫描整段文本
+
+        模板中各结构的位置按前面占位符的长度变化平移，取值中的结构平移到取值所在位置；
+        同义词词条仍只保留第一次出现的位置。跨越占位符边界的词条和表情不会被识别。
+
+        Args:
+            values: 与 placeholders 一一对应的取值，None 表示保留原占位符
+            fragment: 取值 → 取值本身的编译结果
+
+        Returns:
+            填充后文本的编译结果
+        """
+        parts: List[str] = []
+        segments: List[Tuple[bool, str]] = []
+        # 模板中保留下来的片段：(模板中的起始下标, 平移量)
+        shifts: List[Tuple[int, int]] = []
+        sentence_ends: List[int] = []
+        found_emojis: List[Tuple[int, str]] = []
+        spans: List[Tuple[int, int, str]] = []
+
+        pending = iter(values)
+        template_pos = filled_pos = 0
+        for is_slot, value in self.segments:
+            length = len(value) + 2 if is_slot else len(value)
+            fill = next(pending) if is_slot else None
+            if fill is None:
+                shifts.append((template_pos, filled_pos - template_pos))
+                piece = '{' + value + '}' if is_slot else value
+                if segments and not is_slot and not segments[-1][0]:
+                    segments[-1] = (False, segments[-1][1] + piece)
+                else:
+                    segments.append((is_slot, value))
+            else:
+                compiled = fragment(fill)
+                sentence_ends.extend(end + filled_pos for end in compiled.sentence_ends)
+                found_emojis.extend(
+                    (start + filled_pos, emoji) for start, emoji in zip(compiled.emoji_positions, compiled.emojis)
+                )
+                spans.extend((start + filled_pos, end + filled_pos, word) for start, end, word in compiled.synonym_spans)
+                piece = fill
+                if segments and not segments[-1][0]:
+                    segments[-1] = (False, segments[-1][1] + piece)
+                else:
+                    segments.append((False, piece))
+            parts.append(piece)
+            template_pos += length
+            filled_pos += len(piece)
+
+        starts = [start for start, _ in shifts]
+
+        def shift(pos: int) -> int:
+            return pos + shifts[bisect_right(starts, pos) - 1][1]
+
+        sentence_ends.extend(shift(end - 1) + 1 for end in self.sentence_ends)
+        found_emojis.extend((shift(start), emoji) for start, emoji in zip(self.emoji_positions, self.emojis))
+        spans.extend((shift(start), shift(start) + end - start, word) for start, end, word in self.synonym_spans)
+
+        seen = set()
+        first_spans = []
+        for span in sorted(spans):
+            if span[2] not in seen:
+                seen.add(span[2])
+                first_spans.append(span)
+
+        filled = CompiledTemplate.__new__(CompiledTemplate)
+        filled._assign(''.join(parts), segments, sorted(sentence_ends), sorted(found_emojis), first_spans)
+        return filled
+
+
+class VariantSpace:
+    """
+    模板的变体空间：若干互不重叠的编辑位置，每个位置有一组可选文本
+
+    变体空间中的点用混合进制整数编号（第一个编辑位置为最低位），
+    编号 0 对应每个位置都取第一个选项。
+
+    Attributes:
+        text: 原始模板
+        edits: (起始下标, 结束下标, 选项元组) 序列，按位置排列；起止相同表示插入
+        radices: 每个编辑位置的选项数
+        size: 变体空间大小（所有选项数之积）
+    """
+
+    __slots__ = ("text", "edits", "radices", "size")
+
+    def __init__(self, text: str, edits: List[Tuple[int, int, Tuple[str, ...]]]):
+        self.text = text
+        self.edits = tuple(edits)
+        self.radices = tuple(len(choices) for _, _, choices in self.edits)
+        self.size = math.prod(self.radices)
+
+    def render(self, index: int) -> str:
+        """渲染编号为 index 的变体"""
+        if not 0 <= index < self.size:
+            raise IndexError(f"变体编号超出范围: {index} (空间大小 {self.size})")
+
+        text = self.text
+        parts = []
+        pos = 0
+        for start, end, choices in self.edits:
+            index, digit = divmod(index, len(choices))
+            parts.append(text[pos:start])
+            parts.append(choices[digit])
+            pos = end
+        parts.append(text[pos:])
+        return ''.join(parts)
+
+
+def _permuted_indices(rng: random.Random, total: int) -> Iterator[int]:
+    """
+    以固定内存按伪随机顺序不重复地产出 [0, total) 中的整数
+
+    4轮 Feistel 网络在不小于 total 的 2 的偶数次幂区间上构成一个置换，
+    落在 [0, total) 之外的值继续迭代置换直到落回区间内（cycle walking），
+    因此得到 [0, total) 上的置换，且不需要记录已产出的编号。
+    """
+    if total <= 0:
+        return
+    half = max(1, ((total - 1).bit_length() + 1) // 2)
+    mask = (1 << half) - 1
+    keys = [rng.getrandbits(64) for _ in range(4)]
+
+    def permute(x: int) -> int:
+        left, right = x >> half, x & mask
+        for key in keys:
+            left, right = right, left ^ (((right * 0x9E3779B97F4A7C15 + key) >> 17) & mask)
+        return (left << half) | right
+
+    for i in range(total):
+        x = permute(i)
+        while x >= total:
+            x = permute(x)
+        yield x
+
+
+class VariantStream:
+    """
+    模板变体的惰性流：不断产出新变体，直到调用方停止或变体空间耗尽
+    
+    先用随机策略生成；连续 STREAM_MISS_LIMIT 次没有新变体后，转为以固定内存的伪随机顺序
+    遍历变体空间（见 VariationEngine.variant_space），空间遍历完后结束。去重使用固定大小的
+    布隆过滤器，内存与已产出的变体数量无关；误判会跳过少量实际未出现过的变体，但不会产出重复。
+    """
+    
+    def __init__(
+        self,
+        engine: "VariationEngine",
+        template: str,
+        tone: str,
+        preserve_structure: bool,
+        capacity: int,
+        error_rate: float
+    ):
+        self.engine = engine
+        self.template = template
+        self.tone = tone
+        self.preserve_structure = preserve_structure
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.emitted = 0
+        self.exhausted = False
+    
+    def __iter__(self) -> Iterator[str]:
+        return self._generate()
+    
+    def false_positive_rate(self) -> float:
+        """按已产出的变体数量估计的当前误判率（超过容量后会高于配置值）"""
+        return self.bloom.false_positive_rate()
+    
+    def _attempt(self, variation: str, strategy: str, started: float) -> bool:
+        """校验并去重一个候选，返回是否应当产出"""
+        engine = self.engine
+        valid = engine._validate_variation(variation)
+        new = valid and self.bloom.add(variation)
+        if engine.stats is not None:
+            outcome = "accepted" if new else "duplicates" if valid else "rejected"
+            engine.stats.record(strategy, self.tone, outcome, perf_counter() - started)
+        if new:
+            self.emitted += 1
+        return new
+    
+    def _generate(self) -> Iterator[str]:
+        engine = self.engine
+        template, tone = self.template, self.tone
+        strategies = _STRUCTURE_PRESERVING_STRATEGIES if self.preserve_structure else _STRATEGIES
+        
+        misses = 0
+        while misses < STREAM_MISS_LIMIT:
+            strategy = engine.rng.choice(strategies)
+            started = perf_counter() if engine.stats is not None else 0.0
+            variation = engine._apply_strategy(template, strategy, tone)
+            if self._attempt(variation, strategy, started):
+                misses = 0
+                yield variation
+            else:
+                misses += 1
+        
+        space = engine.variant_space(template, tone)
+        for index in _permuted_indices(engine.rng, space.size):
+            started = perf_counter() if engine.stats is not None else 0.0
+            variation = space.render(index)
+            if self._attempt(variation, "enumerate", started):
+                yield variation
+        self.exhausted = True
+
+
+class StrategyStats:
+    """按 (策略, 基调) 累计的生成统计：尝试次数、接受/校验失败/重复次数和累计耗时"""
+    
+    FIELDS = ("attempts", "accepted", "rejected", "duplicates", "seconds")
+    _OUTCOME_INDEX = {"accepted": 1, "rejected": 2, "duplicates": 3}
+    
+    def __init__(self):
+        self._counters: Dict[Tuple[str, str], List[float]] = {}
+    
+    def record(self, strategy: str, tone: str, outcome: str, seconds: float):
+        """
+        记录一次尝试
+        
+        Args:
+            strategy: 策略名称
+            tone: 情感基调
+            outcome: "accepted"（新变体）、"rejected"（未通过人设校验）或 "duplicates"（与已有变体重复）
+            seconds: 本次尝试的耗时（生成与校验）
+        """
+        counters = self._counters.get((strategy, tone))
+        if counters is None:
+            counters = self._counters[(strategy, tone)] = [0, 0, 0, 0, 0.0]
+        counters[0] += 1
+        counters[self._OUTCOME_INDEX[outcome]] += 1
+        counters[4] += seconds
+    
+    def merge(self, stats: Dict[str, Dict[str, Dict[str, float]]]):
+        """合并 as_dict 格式的统计（例如来自工作进程）"""
+        for strategy, by_tone in stats.items():
+            for tone, values in by_tone.items():
+                counters = self._counters.setdefault((strategy, tone), [0, 0, 0, 0, 0.0])
+                for i, field in enumerate(self.FIELDS):
+                    counters[i] += values[field]
+    
+    def reset(self):
+        """清空统计"""
+        self._counters.clear()
+    
+    def as_dict(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        导出统计
+        
+        Returns:
+            {策略: {基调: {"attempts", "accepted", "rejected", "duplicates", "seconds"}}}
+        """
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (strategy, tone), counters in sorted(self._counters.items()):
+            result.setdefault(strategy, {})[tone] = dict(zip(self.FIELDS, counters))
+        return result
+    
+    def format_table(self) -> str:
+        """按策略汇总（合并所有基调）的文本表格"""
+        totals: Dict[str, List[float]] = {}
+        for (strategy, _), counters in self._counters.items():
+            row = totals.setdefault(strategy, [0, 0, 0, 0, 0.0])
+            for i, value in enumerate(counters):
+                row[i] += value
+        # 列名与 as_dict 的字段一致，避免中文列名在等宽终端中错位
+        lines = [f"{'strategy':<18}{'attempts':>10}{'accepted':>10}{'rejected':>10}{'duplicates':>12}{'rate':>8}{'avg_us':>10}"]
+        for strategy, (attempts, accepted, rejected, duplicates, seconds) in sorted(totals.items()):
+            lines.append(
+                f"{strategy:<18}{attempts:>10}{accepted:>10}{rejected:>10}{duplicates:>12}"
+                f"{accepted / attempts:>8.1%}{seconds / attempts * 1e6:>10.1f}"
+            )
+        return "\n".join(lines)
+
 
 class VariationEngine:
     """变化引擎：生成风格一致但措辞不同的回复变体"""
     
-    def __init__(self, seed: Optional[int] = None):
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        template_cache_size: int = DEFAULT_TEMPLATE_CACHE_SIZE,
+        instrument: bool = False,
+        lexicon: Optional[Lexicon] = None
+    ):
         """
         初始化变化引擎
         
         Args:
             seed: 随机种子，用于确定性生成
+            template_cache_size: 已编译模板的LRU缓存容量
+            instrument: 是否按策略和基调记录生成统计（见 strategy_stats）；关闭时几乎没有额外开销
+            lexicon: 词库包，默认使用 load_lexicon() 加载的默认词库
+        
+        词表属性（emoji_sets、synonym_pools 等）与词库包共享同一份对象；如需为单个引擎定制，
+        请为属性赋一个新的副本，而不是原地修改。
         """
         self.seed = seed
-        if seed is not None:
-            random.seed(seed)
-        
-        # 情感基调对应的表情符号集合
-        self.emoji_sets = {
-            "happy": ["😊", "😄", "🥰", "💕", "✨", "🌸", "💖", "🎉", "😁", "🌟"],
-            "care": ["🥺", "💕", "🫂", "❤️", "💗", "🌸", "✨", "💝", "💓", "🤗"],
-            "encourage": ["💪", "✨", "🌟", "⭐", "🔥", "👍", "💯", "🎯", "🚀", "💫"],
-            "comfort": ["🫂", "💕", "🥺", "😢", "💗", "🌸", "✨", "💝", "🤲", "💞"],
-            "playful": ["😄", "😊", "🎀", "🌈", "✨", "💫", "🎪", "🎨", "🎭", "🎵"],
-            "love": ["💕", "💖", "💗", "💝", "💓", "💞", "❤️", "🥰", "😘", "💋"],
-            "excited": ["🎉", "🥳", "🎊", "✨", "💫", "🌟", "⭐", "🎈", "🎆", "🔥"],
-            "cute": ["🥺", "🙈", "😳", "💕", "🎀", "🌸", "✨", "💝", "🧸", "🍰"],
-            "worried": ["🥺", "😢", "💔", "😤", "🤧", "💕", "😿", "🙏", "😔", "😞"]
-        }
-        
-        # 语气词库
-        self.tone_particles = {
-            "soft": ["呀", "啦", "呢", "哦", "吖", "嘛", "哟"],
-            "cute": ["呀", "喵", "哒", "捏", "呐", "咩"],
-            "emphasis": ["啊", "呢", "哦", "耶", "哇"],
-            "question": ["吗", "呢", "啊", "嘛"],
-            "exclamation": ["啊", "呀", "哇", "耶", "喔"]
-        }
-        
-        # 情感关键词同义词库
-        self.synonym_pools = {
-            # 问候类
-            "早安": ["早上好", "早安", "早呀", "早"],
-            "晚安": ["晚安", "晚安啦", "睡个好觉", "好梦"],
-            
-            # 鼓励类
-            "加油": ["加油", "努力", "继续加油", "坚持", "别放弃", "冲鸭"],
-            "相信": ["相信", "信任", "确信", "坚信"],
-            "可以": ["可以", "能行", "没问题", "一定行"],
-            "厉害": ["厉害", "棒", "优秀", "出色", "很强", "了不起"],
-            
-            # 关心类
-            "担心": ["担心", "担忧", "忧虑", "挂念", "放心不下"],
-            "注意": ["注意", "小心", "当心", "留意"],
-            "休息": ["休息", "歇歇", "放松", "放松一下"],
-            "照顾": ["照顾", "爱护", "呵护", "保重"],
-            
-            # 情感类
-            "开心": ["开心", "高兴", "快乐", "愉快", "欣喜"],
-            "想你": ["想你", "想念你", "思念你", "惦记你"],
-            "爱你": ["爱你", "喜欢你", "爱着你", "超爱你"],
-            "陪着": ["陪着", "陪伴", "在你身边", "和你在一起"],
-            
-            # 程度副词
-            "很": ["很", "非常", "特别", "超级", "十分", "好"],
-            "一直": ["一直", "始终", "总是", "永远"],
-            
-            # 转折/连接
-            "但是": ["但是", "不过", "可是", "然而"],
-            "所以": ["所以", "因此", "那么"],
-            
-            # 动作类
-            "记得": ["记得", "别忘了", "要记住", "千万别忘"],
-            "希望": ["希望", "期望", "盼望", "祝愿"]
-        }
-        
-        # 占位符对应的内容池
-        self.placeholder_pools = {
-            "pet_name": ["宝贝", "亲爱的", "小可爱", "宝宝", "亲亲", "小宝贝", "宝"],
-            "encouragement": [
-                "你一定可以的",
-                "我相信你",
-                "你很棒",
-                "你很优秀",
-                "你是最好的",
-                "你能行的",
-                "你很厉害"
-            ],
-            "care_action": [
-                "照顾好自己",
-                "好好休息",
-                "注意身体",
-                "爱护自己",
-                "保重身体"
-            ],
-            "time": ["今天", "现在", "此刻", "这会儿"],
-            "positive_feeling": ["开心", "快乐", "幸福", "温暖", "美好"]
-        }
-        
-        # 支持性后缀
-        self.supportive_suffixes = [
-            "我会一直陪着你的",
-            "有我在呢",
-            "我会支持你的",
-            "让我陪着你",
-            "我永远在你身边",
-            "我会一直在的",
-            "相信我们一起可以的",
-            "我们一起努力"
-        ]
+        self.template_cache_size = template_cache_size
+        self.stats: Optional[StrategyStats] = StrategyStats() if instrument else None
+        # 每个引擎持有独立的随机数流，不修改全局 random 状态，
+        # 多个引擎可以在不同线程中并行使用而互不干扰
+        self.rng = random.Random(seed)
         
-        # 句子开头变体
-        self.sentence_starters = {
-            "comfort": ["别担心", "没关系的", "不要紧的", "放心吧"],
-            "encourage": ["来吧", "冲吧", "上吧", "试试看"],
-            "care": ["要记得", "一定要", "别忘了", "记住要"]
-        }
+        # 词表来自词库包（进程内只加载一次，所有引擎共享同一份，见 lexicon.py）
+        # 词表属性名以 Lexicon.engine_tables() 为准，批量生成时原样传给工作进程中的引擎
+        self.lexicon = lexicon if lexicon is not None else load_lexicon()
+        for name, table in self.lexicon.engine_tables().items():
+            setattr(self, name, table)
+        
+        # 模板按文本编译一次，多次尝试和多个策略共用同一份结构
+        self._synonym_matcher: PhraseMatcher = self.lexicon.synonym_matcher
+        # 多样性挑选使用的签名生成器（参数固定，与种子无关）
+        self.minhasher = MinHasher(num_perm=DIVERSITY_NUM_PERM)
+        self._compile = lru_cache(maxsize=template_cache_size)(self._compile_template)
+        # 占位符取值（词库中的词条）的编译结果，填充后文本的结构由模板和取值拼出，不再编译填充后的文本
+        self._fragments: Dict[str, CompiledTemplate] = {}
+    
+    @property
+    def synonym_matcher(self) -> PhraseMatcher:
+        """由同义词库词条编译的短语匹配器（词条变化时自动重建）"""
+        if self._synonym_matcher.phrases != tuple(self.synonym_pools):
+            self._synonym_matcher = PhraseMatcher(self.synonym_pools)
+        return self._synonym_matcher
+    
+    def _compile_template(self, text: str) -> CompiledTemplate:
+        """编译模板（经 self._compile 缓存）"""
+        return CompiledTemplate(text, self.synonym_matcher)
+    
+    def compile_template(self, text: str) -> CompiledTemplate:
+        """
+        获取模板的编译结果（带LRU缓存）
+        
+        修改 synonym_pools 后需调用 clear_template_cache，否则缓存中的同义词命中位置会过期。
+        """
+        return self._compile(text)
+    
+    def clear_template_cache(self):
+        """清空已编译模板缓存"""
+        self._compile.cache_clear()
+        self._fragments.clear()
+    
+    def template_cache_info(self):
+        """已编译模板缓存的命中统计（functools 的 CacheInfo）"""
+        return self._compile.cache_info()
     
     def generate_variations(
         self,
         template: str,
         num_variants: int = 8,
         tone: str = "happy",
-        preserve_structure: bool = False
+        preserve_structure: bool = False,
+        mode: str = "random",
+        oversample: int = 1
     ) -> List[str]:
         """
         生成多个变体
         
+        oversample > 1 时先生成 num_variants * oversample 个候选，再用 MinHash 签名挑选两两差异最大的
+        num_variants 个（见 select_diverse），减少只差一个表情、随后又被下游去重丢弃的变体。
+        挑选的耗时约为直接生成的十几倍，因此默认不开启，需要时传 DEFAULT_DIVERSITY_OVERSAMPLE。
+        
         Args:
             template: 基础模板文本
             num_variants: 生成变体数量（默认8个）
             tone: 情感基调（happy/care/encourage/comfort等）
             preserve_structure: 是否保持句子结构不变
+            mode: "random" 随机选择策略；"enumerate" 从变体空间中不放回抽样（见 enumerate_variations）
+            oversample: 候选倍数，默认1表示不做多样性挑选，直接返回前 num_variants 个
             
         Returns:
-            变体列表
+            变体列表（oversample 为1时按生成顺序，否则按挑选顺序）
         """
-        variations = set()
+        if mode not in ("random", "enumerate"):
+            raise ValueError(f"不支持的生成模式: {mode}")
+        if oversample < 1:
+            raise ValueError(f"候选倍数必须至少为1，当前为 {oversample}")
+        
+        if mode == "enumerate":
+            candidates = self.enumerate_variations(template, num_variants * oversample, tone)
+        else:
+            # 随机尝试次数仍按 num_variants 计算，不足的候选从变体空间中补充
+            candidates = self._generate_candidates(
+                template, num_variants * oversample, tone, preserve_structure, max_attempts=num_variants * 20
+            )
+        if oversample == 1:
+            return candidates
+        return self.select_diverse(candidates, num_variants)
+    
+    def _generate_candidates(
+        self,
+        template: str,
+        num_variants: int,
+        tone: str,
+        preserve_structure: bool,
+        max_attempts: int
+    ) -> List[str]:
+        """随机策略生成最多 num_variants 个互不相同的变体（按生成顺序），最多尝试 max_attempts 次"""
+        # 用字典去重，保留生成顺序，结果不受字符串哈希随机化影响
+        variations: Dict[str, None] = {}
         attempts = 0
-        max_attempts = num_variants * 20  # 避免无限循环
+        stats = self.stats
         
         while len(variations) < num_variants and attempts < max_attempts:
             # 选择不同的变换策略
-            strategy = random.choice([
-                "synonym_replace",
-                "emoji_variation",
-                "tone_modifier",
-                "placeholder_fill",
-                "sentence_reorder",
-                "prefix_suffix",
-                "combined"
-            ])
+            strategy = self.rng.choice(_STRATEGIES)
             
             if preserve_structure:
                 # 如果保持结构，只使用不改变句序的策略
-                strategy = random.choice([
-                    "synonym_replace",
-                    "emoji_variation",
-                    "tone_modifier",
-                    "placeholder_fill",
-                    "prefix_suffix"
-                ])
+                strategy = self.rng.choice(_STRUCTURE_PRESERVING_STRATEGIES)
             
+            started = perf_counter() if stats is not None else 0.0
             variation = self._apply_strategy(template, strategy, tone)
             
             # 验证变体
-            if self._validate_variation(variation):
-                variations.add(variation)
+            valid = self._validate_variation(variation)
+            if stats is not None:
+                stats.record(strategy, tone, _outcome(valid, variation, variations), perf_counter() - started)
+            if valid:
+                variations[variation] = None
             
             attempts += 1
         
-        result = list(variations)
+        # 如果生成不足，从变体空间中不放回地补充；空间耗尽时停止，不会空转
+        if len(variations) < num_variants:
+            self._fill_from_space(template, tone, variations, num_variants)
         
-        # 如果生成不足，使用组合策略补充
-        while len(result) < num_variants:
-            variation = self._apply_strategy(template, "combined", tone)
-            if self._validate_variation(variation) and variation not in result:
-                result.append(variation)
-            if len(result) >= num_variants * 2:  # 防止无限循环
-                break
+        return list(variations)[:num_variants]
+    
+    def _similarity_signatures(self, variations: Sequence[str]):
+        """变体去掉表情、标点和空白后的 MinHash 签名"""
+        return self.minhasher.signatures([compact_text(text) for text in variations])
+    
+    def select_diverse(self, variations: Sequence[str], k: int) -> List[str]:
+        """
+        从候选变体中贪心地挑选 k 个两两最不相似的变体
+        
+        Args:
+            variations: 候选变体（第一个总被选中）
+            k: 挑选数量
+            
+        Returns:
+            被选中的变体（按挑选顺序）
+        """
+        variations = list(variations)
+        if len(variations) <= k:
+            return variations
+        indices = select_diverse(self._similarity_signatures(variations), k)
+        return [variations[i] for i in indices]
+    
+    def diversity_score(self, variations: Sequence[str]) -> float:
+        """
+        一组变体的多样性得分（1 减去两两估计相似度的平均值，忽略表情和标点）
         
-        return result[:num_variants]
+        Returns:
+            0到1之间的得分，越高越多样；少于两个变体时为0.0
+        """
+        return diversity_score(self._similarity_signatures(variations))
+    
+    def variant_space(self, template: str, tone: str = "happy") -> VariantSpace:
+        """
+        构建模板的变体空间
+        
+        编辑位置包括：占位符填充、同义词替换（每个词条第一次出现处）、
+        表情替换（模板没有表情时在第一个感叹号前或末尾加一个）、句末/逗号前/问号前的语气词插入（可不插入）。
+        位置重叠时保留靠前的一个。
+        
+        Args:
+            template: 基础模板文本
+            tone: 情感基调，决定可选的表情符号
+        
+        Returns:
+            VariantSpace，size 即不同编辑组合的精确数量
+        """
+        compiled = self._compile(template)
+        emoji_set = self.emoji_sets.get(tone, self.emoji_sets["happy"])
+        particles = self.tone_particles
+        edits = []
+        
+        pos = 0
+        for is_slot, value in compiled.segments:
+            length = len(value) + 2 if is_slot else len(value)
+            if is_slot and value in self.placeholder_pools:
+                edits.append((pos, pos + length, tuple(self.placeholder_pools[value])))
+            pos += length
+        
+        for start, end, word in compiled.synonym_spans:
+            choices = tuple(dict.fromkeys([word] + self.synonym_pools[word]))
+            edits.append((start, end, choices))
+        
+        for emoji, start in zip(compiled.emojis, compiled.emoji_positions):
+            edits.append((start, start + len(emoji), tuple(dict.fromkeys([emoji] + emoji_set))))
+        
+        if template.endswith('！') or template.endswith('~'):
+            choices = ("",) + tuple(dict.fromkeys(particles["soft"] + particles["cute"] + particles["exclamation"]))
+            edits.append((len(template) - 1, len(template) - 1, choices))
+        if '，' in template:
+            comma = template.index('，')
+            edits.append((comma, comma, ("",) + tuple(dict.fromkeys(particles["soft"] + particles["emphasis"]))))
+        if '？' in template:
+            question = template.index('？')
+            edits.append((question, question, ("",) + tuple(particles["question"])))
+        
+        if not compiled.emojis:
+            # 与 _vary_emojis 一致：加在第一个感叹号前，没有感叹号时加在末尾（排在同位置的语气词之后）
+            position = template.find('！')
+            if position < 0:
+                position = len(template.rstrip())
+            edits.append((position, position, tuple(dict.fromkeys(emoji_set))))
+        
+        # 按位置排序（排序稳定，同一插入点按加入顺序渲染），丢弃与前一个编辑重叠的位置（插入点可以紧贴替换区间的边界）
+        edits.sort(key=lambda edit: (edit[0], edit[1]))
+        disjoint = []
+        last_end = 0
+        for start, end, choices in edits:
+            if start >= last_end:
+                disjoint.append((start, end, choices))
+                last_end = end
+        return VariantSpace(template, disjoint)
+    
+    def count_variants(self, template: str, tone: str = "happy") -> int:
+        """模板变体空间的精确大小"""
+        return self.variant_space(template, tone).size
+    
+    def _fill_from_space(self, template: str, tone: str, variations: Dict[str, None], num_variants: int):
+        """按不放回的随机顺序遍历变体空间，把通过人设校验的新变体加入 variations，直到达到 num_variants"""
+        stats = self.stats
+        space = self.variant_space(template, tone)
+        for index in _permuted_indices(self.rng, space.size):
+            started = perf_counter() if stats is not None else 0.0
+            variation = space.render(index)
+            valid = self._validate_variation(variation)
+            if stats is not None:
+                stats.record("enumerate", tone, _outcome(valid, variation, variations), perf_counter() - started)
+            if valid and variation not in variations:
+                variations[variation] = None
+                if len(variations) >= num_variants:
+                    break
+    
+    def variant_stream(
+        self,
+        template: str,
+        tone: str = "happy",
+        preserve_structure: bool = False,
+        capacity: int = DEFAULT_STREAM_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE
+    ) -> VariantStream:
+        """
+        模板变体的惰性流，适合生成超大规模数据集：按需取用，内存固定
+        
+        Args:
+            template: 基础模板文本
+            tone: 情感基调
+            preserve_structure: 是否保持句子结构不变
+            capacity: 布隆过滤器的预期容量（预计最多取用的变体数量）
+            error_rate: 取用 capacity 个变体时的目标误判率
+        
+        Returns:
+            可迭代的 VariantStream；迭代时使用本引擎的随机数流，
+            stream.false_positive_rate() 报告当前误判率
+        
+        Example:
+            >>> stream = engine.variant_stream("加油呀！💪 你一定可以的！", tone="encourage")
+            >>> first_100 = list(itertools.islice(stream, 100))
+        """
+        return VariantStream(self, template, tone, preserve_structure, capacity, error_rate)
+    
+    def enumerate_variations(
+        self,
+        template: str,
+        num_variants: int = 8,
+        tone: str = "happy"
+    ) -> List[str]:
+        """
+        从变体空间中不放回地抽样生成变体
+        
+        每个编号只渲染一次，不需要随机重试；不同编辑组合偶尔会渲染出相同文本，
+        这类重复和未通过人设校验的变体会被跳过。空间中可用的变体不足时返回全部。
+        
+        Args:
+            template: 基础模板文本
+            num_variants: 生成变体数量
+            tone: 情感基调
+        
+        Returns:
+            互不相同的变体列表（按抽样顺序）
+        """
+        variations: Dict[str, None] = {}
+        if num_variants > 0:
+            self._fill_from_space(template, tone, variations, num_variants)
+        return list(variations)
     
     def _apply_strategy(self, template: str, strategy: str, tone: str) -> str:
         """应用特定的变换策略"""
         # 首先总是填充占位符（如果存在）
-        result = template
-        if '{' in result and '}' in result:
-            result = self._fill_placeholders(result)
+        # 只编译模板本身；填充后文本的结构由模板结构平移得到，各策略都在这份结构上操作
+        compiled = self._compile(template)
+        filled = self._fill_structure(compiled) if compiled.placeholders else compiled
+        result = filled.text
         
         if strategy == "synonym_replace":
-            return self._replace_synonyms(result)
+            return self._replace_synonyms(filled)
         elif strategy == "emoji_variation":
-            return self._vary_emojis(result, tone)
+            return self._vary_emojis(result, tone, filled.emojis)
         elif strategy == "tone_modifier":
             return self._add_tone_modifiers(result)
         elif strategy == "placeholder_fill":
             return result  # Already filled above
         elif strategy == "sentence_reorder":
-            return self._reorder_sentences(result)
+            return self._reorder_sentences(filled)
         elif strategy == "prefix_suffix":
             return self._add_prefix_suffix(result, tone)
         elif strategy == "combined":
-            # 组合多种策略
-            result = self._replace_synonyms(result)
+            # 组合多种策略；同义词和语气词不含表情，替换后表情仍是填充后文本中的那些
+            result = self._replace_synonyms(filled)
             result = self._add_tone_modifiers(result)
-            result = self._vary_emojis(result, tone)
-            if random.random() > 0.5:
+            result = self._vary_emojis(result, tone, filled.emojis)
+            if self.rng.random() > 0.5:
                 result = self._add_prefix_suffix(result, tone)
             return result
         return result
     
-    def _replace_synonyms(self, text: str) -> str:
-        """替换同义词"""
-        result = text
-        
-        # 随机选择要替换的词汇
-        replaceable_words = [word for word in self.synonym_pools.keys() if word in result]
-        num_replacements = random.randint(1, min(3, len(replaceable_words) + 1))
-        
-        words_to_replace = random.sample(replaceable_words, min(num_replacements, len(replaceable_words)))
-        
-        for word in words_to_replace:
-            if word in result:
-                synonym = random.choice(self.synonym_pools[word])
-                # 只替换第一次出现的位置
-                result = result.replace(word, synonym, 1)
+    def _replace_synonyms(self, compiled: CompiledTemplate) -> str:
+        """替换同义词（每个词条只替换第一次出现的位置，一次性重建字符串）"""
+        # 随机选择要替换的词汇；编译时已按最长匹配找出互不重叠的位置
+        spans = compiled.synonym_spans
+        num_replacements = self.rng.randint(1, min(3, len(spans) + 1))
         
-        return result
+        chosen = self.rng.sample(spans, min(num_replacements, len(spans)))
+        return PhraseMatcher.rewrite(
+            compiled.text,
+            [(start, end, self.rng.choice(self.synonym_pools[word])) for start, end, word in chosen]
+        )
     
-    def _vary_emojis(self, text: str, tone: str) -> str:
-        """变化表情符号"""
-        # 提取现有的表情符号
-        emoji_pattern = re.compile(r'[\U0001F300-\U0001F9FF]|[\U00002600-\U000027BF]')
-        existing_emojis = emoji_pattern.findall(text)
-        
+    def _vary_emojis(self, text: str, tone: str, existing_emojis: Sequence[str]) -> str:
+        """变化表情符号（existing_emojis 为文本中现有的表情符号，来自编译结果）"""
         result = text
         
         # 获取对应基调的表情符号集
@@ -250,17 +779,17 @@ class VariationEngine:
         
         # 替换部分表情符号
         for emoji in existing_emojis:
-            if random.random() > 0.4:  # 60%概率替换
-                new_emoji = random.choice(emoji_set)
+            if self.rng.random() > 0.4:  # 60%概率替换
+                new_emoji = self.rng.choice(emoji_set)
                 result = result.replace(emoji, new_emoji, 1)
         
         # 如果没有表情符号，添加一些
         if not existing_emojis:
-            num_emojis = random.randint(1, 2)
+            num_emojis = self.rng.randint(1, 2)
             for _ in range(num_emojis):
-                emoji = random.choice(emoji_set)
+                emoji = self.rng.choice(emoji_set)
                 # 在句子末尾或中间添加
-                if random.random() > 0.5 and '，' in result:
+                if self.rng.random() > 0.5 and '，' in result:
                     parts = result.split('，', 1)
                     result = parts[0] + emoji + '，' + parts[1]
                 else:
@@ -279,70 +808,53 @@ class VariationEngine:
         # 在合适的位置添加语气词
         # 句末
         if result.endswith('！') or result.endswith('~'):
-            particle_type = random.choice(["soft", "cute", "exclamation"])
-            particle = random.choice(self.tone_particles[particle_type])
+            particle_type = self.rng.choice(["soft", "cute", "exclamation"])
+            particle = self.rng.choice(self.tone_particles[particle_type])
             result = result[:-1] + particle + result[-1]
         
         # 句中（在逗号后）
-        if '，' in result and random.random() > 0.5:
+        if '，' in result and self.rng.random() > 0.5:
             parts = result.split('，', 1)
-            particle_type = random.choice(["soft", "emphasis"])
-            particle = random.choice(self.tone_particles[particle_type])
+            particle_type = self.rng.choice(["soft", "emphasis"])
+            particle = self.rng.choice(self.tone_particles[particle_type])
             result = parts[0] + particle + '，' + parts[1]
         
         # 疑问句
         if '吗' in result or '呢' in result or '？' in result:
-            particle = random.choice(self.tone_particles["question"])
+            particle = self.rng.choice(self.tone_particles["question"])
             if '？' in result:
                 result = result.replace('？', particle + '？', 1)
         
         return result
     
-    def _fill_placeholders(self, text: str) -> str:
-        """填充占位符"""
-        result = text
-        
-        # 查找并替换占位符（多次迭代确保所有占位符都被替换）
-        placeholder_pattern = re.compile(r'\{(\w+)\}')
-        max_iterations = 10  # 防止无限循环
-        iteration = 0
-        
-        while '{' in result and '}' in result and iteration < max_iterations:
-            matches = placeholder_pattern.findall(result)
-            if not matches:
-                break
-            
-            for placeholder in matches:
-                if placeholder in self.placeholder_pools:
-                    replacement = random.choice(self.placeholder_pools[placeholder])
-                    result = result.replace(f'{{{placeholder}}}', replacement, 1)
-            
-            iteration += 1
-        
-        return result
+    def _fill_placeholders(self, template: str) -> str:
+        """填充模板的占位符"""
+        return self._fill_structure(self._compile(template)).text
+    
+    def _fill_structure(self, compiled: CompiledTemplate) -> CompiledTemplate:
+        """按编译好的片段从左到右随机填充占位符（未知占位符原样保留），返回填充后文本的结构"""
+        pools = self.placeholder_pools
+        values = [self.rng.choice(pools[name]) if name in pools else None for name in compiled.placeholders]
+        return compiled.fill(values, self._fragment)
+    
+    def _fragment(self, value: str) -> CompiledTemplate:
+        """占位符取值的编译结果（取值来自词库，数量有限，不占用模板缓存）"""
+        compiled = self._fragments.get(value)
+        if compiled is None:
+            compiled = self._fragments[value] = CompiledTemplate(value, self.synonym_matcher)
+        return compiled
     
-    def _reorder_sentences(self, text: str) -> str:
+    def _reorder_sentences(self, compiled: CompiledTemplate) -> str:
         """重新排列句子顺序"""
-        # 按标点分割句子
-        delimiters = ['！', '~', '。', '？']
-        sentences = []
-        current = ""
-        
-        for char in text:
-            current += char
-            if char in delimiters:
-                sentences.append(current)
-                current = ""
-        
-        if current:
-            sentences.append(current)
+        # 按标点分割句子（编译时已切分）
+        sentences = list(compiled.sentences)
         
         # 只有多个句子时才重排
         if len(sentences) > 1:
             # 不完全随机，保持一定逻辑性
             # 随机交换相邻句子
-            if random.random() > 0.5 and len(sentences) >= 2:
-                i = random.randint(0, len(sentences) - 2)
+            if self.rng.random() > 0.5 and len(sentences) >= 2:
+                i = self.rng.randint(0, len(sentences) - 2)
                 sentences[i], sentences[i + 1] = sentences[i + 1], sentences[i]
         
         return ''.join(sentences)
@@ -352,13 +864,13 @@ class VariationEngine:
         result = text
         
         # 添加前缀
-        if random.random() > 0.6 and tone in self.sentence_starters:
-            prefix = random.choice(self.sentence_starters[tone])
+        if self.rng.random() > 0.6 and tone in self.sentence_starters:
+            prefix = self.rng.choice(self.sentence_starters[tone])
             result = prefix + '，' + result
         
         # 添加后缀
-        if random.random() > 0.6:
-            suffix = random.choice(self.supportive_suffixes)
+        if self.rng.random() > 0.6:
+            suffix = self.rng.choice(self.supportive_suffixes)
             # 移除原有的结尾标点，添加后缀
             result = result.rstrip('！~。') + '！' + suffix + '~'
         
@@ -374,8 +886,7 @@ class VariationEngine:
         3. 长度合理
         """
         # 检查是否包含表情符号
-        emoji_pattern = re.compile(r'[\U0001F300-\U0001F9FF]|[\U00002600-\U000027BF]')
-        if not emoji_pattern.search(text):
+        if not has_emoji(text):
             return False
         
         # 检查长度
@@ -383,23 +894,145 @@ class VariationEngine:
             return False
         
         # 检查是否包含积极词汇（至少一个）
-        positive_words = [
-            '好', '开心', '快乐', '爱', '喜欢', '加油', '相信', '支持', '陪',
-            '温暖', '美好', '幸福', '棒', '厉害', '优秀', '可以', '没问题',
-            '放心', '安心', '舒服', '甜', '可爱', '亲爱', '宝贝', '呢', '呀',
-            '啦', '哦', '嘛', '吖'
-        ]
-        
-        has_positive = any(word in text for word in positive_words)
+        has_positive = any(word in text for word in _POSITIVE_WORDS)
         if not has_positive:
             return False
         
         return True
     
+    def generate_variations_batch(
+        self,
+        templates: Sequence[str],
+        tones: Union[str, Sequence[str]] = "happy",
+        num_variants: int = 8,
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+        workers: int = 1,
+        preserve_structure: bool = False,
+        mode: str = "random",
+        oversample: int = 1
+    ) -> List[List[str]]:
+        """
+        批量为多个模板生成变体（例如整个场景目录）
+        
+        复用同一个引擎及其词库和模板编译缓存，按块处理模板；workers > 1 时各块分发到进程池，
+        每个工作进程只构建一次引擎。每个模板使用由 (引擎种子, 模板, 基调) 派生的独立随机数流，
+        因此结果按输入顺序排列，且与块大小、进程数量无关。
+        
+        Args:
+            templates: 模板列表
+            tones: 所有模板共用的基调，或与 templates 一一对应的基调列表
+            num_variants: 每个模板生成的变体数量
+            chunk_size: 每个任务块包含的模板数量
+            workers: 工作进程数量，1表示在当前进程中执行
+            preserve_structure: 是否保持句子结构不变
+            mode: "random" 或 "enumerate"，见 generate_variations
+            oversample: 候选倍数，见 generate_variations
+        
+        Returns:
+            与 templates 顺序一致的变体列表的列表
+        """
+        templates = list(templates)
+        tones = [tones] * len(templates) if isinstance(tones, str) else list(tones)
+        if len(tones) != len(templates):
+            raise ValueError(f"基调数量 ({len(tones)}) 与模板数量 ({len(templates)}) 不一致")
+        if chunk_size <= 0:
+            raise ValueError(f"块大小必须为正数，当前为 {chunk_size}")
+        
+        # 未指定种子的引擎从自身随机数流中取一个基础种子
+        base_seed = self.seed if self.seed is not None else self.rng.getrandbits(64)
+        items = list(zip(templates, tones))
+        tasks = [
+            (base_seed, items[start:start + chunk_size], num_variants, preserve_structure, mode, oversample)
+            for start in range(0, len(items), chunk_size)
+        ]
+        
+        results: List[List[str]] = []
+        if workers > 1 and len(tasks) > 1:
+            lexicons = {name: getattr(self, name) for name in self.lexicon.engine_tables()}
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_batch_worker,
+                initargs=(lexicons, self.template_cache_size, self.stats is not None)
+            ) as pool:
+                for chunk_result, chunk_stats in pool.map(_run_batch_chunk, tasks):
+                    results.extend(chunk_result)
+                    if chunk_stats is not None:
+                        self.stats.merge(chunk_stats)
+        else:
+            for task in tasks:
+                results.extend(self._generate_chunk(*task))
+        return results
+    
+    def _generate_chunk(
+        self,
+        base_seed: int,
+        items: List[Tuple[str, str]],
+        num_variants: int,
+        preserve_structure: bool,
+        mode: str,
+        oversample: int
+    ) -> List[List[str]]:
+        """为一块 (模板, 基调) 生成变体，每个模板使用派生的独立随机数流"""
+        saved_rng = self.rng
+        try:
+            results = []
+            for template, tone in items:
+                self.rng = random.Random(derive_seed(base_seed, "batch", template, tone))
+                results.append(
+                    self.generate_variations(template, num_variants, tone, preserve_structure, mode, oversample)
+                )
+            return results
+        finally:
+            self.rng = saved_rng
+    
+    def strategy_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        按策略和基调的生成统计（引擎以 instrument=True 创建时才会记录）
+        
+        随机模式的每种策略各占一项，变体空间抽样（枚举模式及随机模式的补充）记为 "enumerate"。
+        
+        Returns:
+            {策略: {基调: {"attempts", "accepted", "rejected", "duplicates", "seconds"}}}，未开启时为空字典
+        """
+        return self.stats.as_dict() if self.stats is not None else {}
+    
+    def reset_strategy_stats(self):
+        """清空生成统计"""
+        if self.stats is not None:
+            self.stats.reset()
+    
     def set_seed(self, seed: int):
-        """设置新的随机种子"""
+        """设置新的随机种子（只影响本引擎的随机数流）"""
         self.seed = seed
-        random.seed(seed)
+        self.rng.seed(seed)
+
+
+# 工作进程中复用的引擎，由 _init_batch_worker 构建
+_BATCH_ENGINE: Optional[VariationEngine] = None
+
+
+def _init_batch_worker(lexicons: Dict[str, Any], template_cache_size: int, instrument: bool):
+    """进程池初始化：每个工作进程构建一次引擎，并使用调用方引擎的词库"""
+    global _BATCH_ENGINE
+    _BATCH_ENGINE = VariationEngine(template_cache_size=template_cache_size, instrument=instrument)
+    for name, value in lexicons.items():
+        setattr(_BATCH_ENGINE, name, value)
+
+
+def _run_batch_chunk(task: Tuple) -> Tuple[List[List[str]], Optional[Dict]]:
+    """进程池任务：处理一块模板，开启统计时一并返回本块的统计"""
+    stats = _BATCH_ENGINE.stats
+    if stats is not None:
+        stats.reset()
+    results = _BATCH_ENGINE._generate_chunk(*task)
+    return results, stats.as_dict() if stats is not None else None
+
+
+def _outcome(valid: bool, variation: str, variations: Dict[str, None]) -> str:
+    """一次尝试的统计结果（在变体加入 variations 之前调用）"""
+    if not valid:
+        return "rejected"
+    return "duplicates" if variation in variations else "accepted"
 
 
 def generate_variations_for_scenario(
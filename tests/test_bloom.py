@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试布隆过滤器
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+
+from utils.bloom import BloomFilter
+
+
+def test_no_false_negatives_and_bounded_error():
+    """测试已加入的元素总能查到，未加入元素的误判率接近配置值"""
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    size = bloom.size_bytes
+    added = sum(bloom.add(f"变体{i}") for i in range(5000))
+    # 加入过程中也可能误判为已存在，此时不计数
+    assert added == len(bloom) and added > 4950
+
+    assert all(f"变体{i}" in bloom for i in range(5000))
+    assert not bloom.add("变体0")
+    false_positives = sum(f"其他{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert abs(bloom.false_positive_rate() - 0.01) < 0.005
+    assert bloom.size_bytes == size
+
+
+def test_invalid_parameters():
+    """测试非法容量和误判率"""
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=0)
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10, error_rate=1.5)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试内容寻址的构建缓存
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import os
+import subprocess
+import time
+
+from build_cache import LATEST_REF, BuildCache, build_key
+
+
+def _build(cache, params, content):
+    """写出一个只含单个文件的构建"""
+    key = build_key(params)
+    staging = cache.begin(key)
+    with open(os.path.join(staging, "dataset.jsonl"), 'w', encoding='utf-8') as f:
+        f.write(content)
+    return key, cache.commit(key, staging, params, stats={"final_count": 1})
+
+
+def test_build_key_is_canonical():
+    """测试构建键与参数顺序无关，且区分不同参数"""
+    assert build_key({"seed": 1, "size": 10}) == build_key({"size": 10, "seed": 1})
+    assert build_key({"seed": 1, "size": 10}) != build_key({"seed": 2, "size": 10})
+
+
+def test_commit_lookup_and_latest(tmp_path):
+    """测试构建完成后可以查到，并更新 latest 指针"""
+    cache = BuildCache(str(tmp_path / "builds"))
+    assert cache.lookup(build_key({"seed": 1})) is None
+
+    key, record = _build(cache, {"seed": 1}, '{"output": "早安"}\n')
+
+    assert cache.lookup(key) == record
+    assert cache.get_ref(LATEST_REF) == key
+    assert [item["file"] for item in record["files"]] == ["dataset.jsonl"]
+    assert not [name for name in os.listdir(cache.root) if name.startswith(".tmp-")]
+
+
+def test_gc_keeps_referenced_builds(tmp_path):
+    """测试垃圾回收只删除没有指针引用的构建"""
+    cache = BuildCache(str(tmp_path / "builds"))
+    old_key, _ = _build(cache, {"seed": 1}, "a\n")
+    pinned_key, _ = _build(cache, {"seed": 2}, "b\n")
+    cache.set_ref("release", pinned_key)
+    latest_key, _ = _build(cache, {"seed": 3}, "c\n")
+    os.makedirs(os.path.join(cache.root, ".tmp-stale-0"))
+
+    assert cache.gc() == [old_key]
+    assert sorted(cache.builds()) == sorted([pinned_key, latest_key])
+    assert not os.path.exists(os.path.join(cache.root, ".tmp-stale-0"))
+
+
+def test_gc_keeps_staging_of_running_builds(tmp_path):
+    """测试垃圾回收保留其他进程正在进行的构建的临时目录，只删除进程已退出或过期的"""
+    cache = BuildCache(str(tmp_path / "builds"))
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    running = os.path.join(cache.root, f".tmp-running-{os.getppid()}")
+    finished = os.path.join(cache.root, f".tmp-finished-{child.pid}")
+    own = os.path.join(cache.root, f".tmp-own-{os.getpid()}")
+    for path in (running, finished, own):
+        os.makedirs(path)
+
+    cache.gc()
+    assert os.path.exists(running)
+    assert os.path.exists(own)
+    assert not os.path.exists(finished)
+
+    old = time.time() - 3600
+    os.utime(running, (old, old))
+    cache.gc(stale_after=60)
+    assert not os.path.exists(running)
+    assert os.path.exists(own)
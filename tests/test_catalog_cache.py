@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试场景目录验证缓存
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import copy
+
+import scenarios
+from scenarios import (
+    SCENARIO_CATALOG,
+    Scenario,
+    catalog_fingerprint,
+    validate_catalog,
+    get_catalog_metadata
+)
+from generator import GirlfriendDatasetGenerator
+
+
+def test_fingerprint_tracks_content():
+    """测试目录哈希随内容变化"""
+    fingerprint = catalog_fingerprint()
+    assert fingerprint == catalog_fingerprint(list(SCENARIO_CATALOG))
+
+    modified = copy.deepcopy(SCENARIO_CATALOG)
+    modified[0].response_templates.append("新的模板呀~ 💕")
+    assert catalog_fingerprint(modified) != fingerprint
+
+
+def test_validation_is_memoized(monkeypatch):
+    """测试同一版本目录只做一次完整检查"""
+    calls = []
+    original_check = scenarios._check_catalog
+
+    def counting_check(catalog, min_scenarios):
+        calls.append(len(catalog))
+        original_check(catalog, min_scenarios)
+
+    monkeypatch.setattr(scenarios, "_check_catalog", counting_check)
+    monkeypatch.setattr(scenarios, "_VALIDATION_CACHE", {})
+
+    for _ in range(5):
+        GirlfriendDatasetGenerator()
+
+    assert calls == [len(SCENARIO_CATALOG)]
+
+
+def test_fingerprint_is_cached_per_catalog(monkeypatch):
+    """测试重复构造生成器时不会重新哈希目录内容，换成新的目录对象才重新计算"""
+    calls = []
+    original_fingerprint = scenarios.catalog_fingerprint
+
+    def counting_fingerprint(catalog=None):
+        calls.append(1)
+        return original_fingerprint(catalog)
+
+    monkeypatch.setattr(scenarios, "catalog_fingerprint", counting_fingerprint)
+    monkeypatch.setattr(scenarios, "_FINGERPRINT_CACHE", {})
+
+    for _ in range(5):
+        GirlfriendDatasetGenerator()
+    assert len(calls) == 1
+
+    modified = copy.deepcopy(SCENARIO_CATALOG)
+    modified[0].response_templates.append("新的模板呀~ 💕")
+    assert scenarios.cached_catalog_fingerprint(modified) == original_fingerprint(modified)
+    assert len(calls) == 2
+
+
+def test_validation_rejects_duplicates():
+    """测试验证器能发现重复的场景名称和模板"""
+    duplicate_name = list(SCENARIO_CATALOG) + [copy.deepcopy(SCENARIO_CATALOG[0])]
+    try:
+        validate_catalog(duplicate_name)
+        assert False, "重复的场景名称应该验证失败"
+    except AssertionError as e:
+        assert "场景名称存在重复" in str(e)
+
+    duplicate_template = Scenario(
+        name="duplicate_template",
+        instruction="重复模板测试",
+        input_text="",
+        response_templates=["早安呀！☀️", "早安呀！☀️"],
+        category="greetings",
+        tags=["test"]
+    )
+    try:
+        validate_catalog([duplicate_template], min_scenarios=1)
+        assert False, "重复的响应模板应该验证失败"
+    except AssertionError as e:
+        assert "响应模板存在重复" in str(e)
+
+
+def test_metadata_returns_copy():
+    """测试缓存的元数据不会被调用方修改"""
+    metadata = get_catalog_metadata()
+    metadata["categories"].append("not_a_category")
+
+    assert "not_a_category" not in get_catalog_metadata()["categories"]
+    assert metadata["total_scenarios"] == len(SCENARIO_CATALOG)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试可恢复的检查点生成
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import os
+import random
+
+import pytest
+
+import generate_dataset
+from checkpoint import JournaledDigestSet, RunCheckpoint, entry_digest
+from utils.rng import decode_rng_state, encode_rng_state
+
+
+def test_rng_state_roundtrip():
+    """测试随机数流状态可以保存并恢复"""
+    rng = random.Random(11)
+    rng.random()
+    restored = decode_rng_state(encode_rng_state(rng))
+    assert [restored.random() for _ in range(5)] == [rng.random() for _ in range(5)]
+
+
+def test_resume_matches_uninterrupted_run(tmp_path, monkeypatch):
+    """测试中断后恢复的结果与一次性跑完完全一致"""
+    expected, expected_stats = generate_dataset.generate_dataset_with_qc(1500, seed=4)
+
+    checkpoint_dir = str(tmp_path / "checkpoint")
+    original_qc = generate_dataset.quality_control_pipeline
+    calls = []
+
+    def interrupted_qc(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return original_qc(*args, **kwargs)
+
+    monkeypatch.setattr(generate_dataset, "quality_control_pipeline", interrupted_qc)
+    with pytest.raises(KeyboardInterrupt):
+        generate_dataset.generate_dataset_with_qc(1500, seed=4, checkpoint_dir=checkpoint_dir)
+    monkeypatch.setattr(generate_dataset, "quality_control_pipeline", original_qc)
+
+    assert RunCheckpoint(checkpoint_dir, {}).exists()
+
+    resumed, resumed_stats = generate_dataset.generate_dataset_with_qc(
+        1500, seed=4, checkpoint_dir=checkpoint_dir, resume=True
+    )
+    assert resumed == expected
+    assert resumed_stats == expected_stats
+
+
+def test_resume_rejects_changed_parameters(tmp_path, monkeypatch):
+    """测试参数改变时拒绝从检查点恢复"""
+    checkpoint_dir = str(tmp_path / "checkpoint")
+    generate_dataset.generate_dataset_with_qc(300, seed=1, checkpoint_dir=checkpoint_dir)
+
+    with pytest.raises(ValueError):
+        generate_dataset.generate_dataset_with_qc(300, seed=2, checkpoint_dir=checkpoint_dir, resume=True)
+
+    # 代码改动（生成器版本不同）后同样拒绝恢复
+    version = generate_dataset.generator_version()
+    monkeypatch.setattr(generate_dataset, "generator_version", lambda: version + "-changed")
+    with pytest.raises(ValueError):
+        generate_dataset.generate_dataset_with_qc(300, seed=1, checkpoint_dir=checkpoint_dir, resume=True)
+
+
+def test_seen_digests_are_appended(tmp_path):
+    """测试每次提交只追加新摘要，提交前中断时多追加的摘要在恢复时被截掉"""
+    checkpoint = RunCheckpoint(str(tmp_path), {"seed": 1})
+    digests = [entry_digest({"instruction": "i", "input": "", "output": str(i)}) for i in range(30)]
+
+    seen = JournaledDigestSet()
+    seen.update(digests[:10])
+    checkpoint.commit({"seen": seen})
+    seen.update(digests[5:20])
+    checkpoint.commit({"seen": seen})
+    assert os.path.getsize(checkpoint.seen_path) == 20 * 8
+
+    # 追加了新摘要但未提交
+    seen.update(digests[20:])
+    with open(checkpoint.seen_path, 'ab') as f:
+        f.write(seen.drain())
+
+    restored = checkpoint.load()["seen"]
+    assert len(restored) == 20
+    assert all(digest in restored for digest in digests[:20])
+    assert digests[25] not in restored
+    assert os.path.getsize(checkpoint.seen_path) == 20 * 8
+
+    restored.add(digests[25])
+    checkpoint.commit({"seen": restored})
+    assert digests[25] in checkpoint.load()["seen"]
+    assert os.path.getsize(checkpoint.seen_path) == 21 * 8
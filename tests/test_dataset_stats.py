@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试单遍数据集统计
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import json
+
+from dataset_io import iter_json_array, write_jsonl
+from dataset_stats import DatasetStatistics, compute_file_statistics
+from generator import GirlfriendDatasetGenerator
+
+
+SAMPLE = [
+    {"instruction": "早上问候", "input": "早上好", "output": "早安呀！✨ 今天也要加油哦~"},
+    {"instruction": "早上问候", "input": "早上好", "output": "早上好呀，今天也要开心"},
+    {"instruction": "晚上道别", "input": "", "output": "晚安呀~ 🌙 做个好梦！"},
+]
+
+
+def test_result_shape_and_values():
+    """测试统计结果字段与数值"""
+    result = DatasetStatistics().update(SAMPLE).result()
+
+    assert result["total_samples"] == 3
+    assert result["unique_instructions"] == 2
+    assert result["instruction_distribution"] == {"早上问候": 2, "晚上道别": 1}
+    # ✨ (U+2728) 也应计入表情覆盖率
+    assert result["emoji_coverage"] == "66.67%"
+    assert result["empty_input_ratio"] == "33.33%"
+    assert result["avg_output_length"] == sum(len(e["output"]) for e in SAMPLE) / 3
+    assert sum(result["output_length_histogram"].values()) == 3
+
+
+def test_merge_matches_single_pass():
+    """测试合并分片的部分结果与整体单遍统计一致"""
+    dataset = GirlfriendDatasetGenerator().generate_random_dataset(300, seed=3)
+
+    whole = DatasetStatistics().update(dataset).result()
+    merged = DatasetStatistics().update(dataset[:120]).merge(
+        DatasetStatistics().update(dataset[120:])
+    ).result()
+
+    assert merged == whole
+
+
+def test_file_statistics_json_and_jsonl(tmp_path):
+    """测试直接从JSON和JSONL文件统计"""
+    dataset = GirlfriendDatasetGenerator().generate_random_dataset(200, seed=9)
+    json_path = tmp_path / "dataset.json"
+    json_path.write_text(json.dumps(dataset, ensure_ascii=False, indent=2), encoding="utf-8")
+    jsonl_path = str(tmp_path / "dataset.jsonl")
+    write_jsonl(dataset, jsonl_path)
+
+    expected = DatasetStatistics().update(dataset).result()
+    assert compute_file_statistics(str(json_path)).result() == expected
+    assert compute_file_statistics(jsonl_path).result() == expected
+    # 小块读取也能正确解析被截断的元素
+    assert list(iter_json_array(str(json_path), chunk_size=7)) == dataset
+
+
+def test_empty_dataset():
+    """测试空数据集不会除零"""
+    result = DatasetStatistics().result()
+    assert result["total_samples"] == 0
+    assert result["emoji_coverage"] == "0.00%"
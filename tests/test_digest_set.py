@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试紧凑的摘要集合
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from checkpoint import entry_digest
+from utils.digest_set import DigestSet
+
+
+def _digest(i: int) -> bytes:
+    return entry_digest({"instruction": "陪我聊天", "input": "晚安", "output": f"晚安宝贝{i}"})
+
+
+def test_matches_builtin_set_across_growth():
+    """测试扩容前后的加入和查找与 set 一致，只按前8字节判重"""
+    digests = DigestSet(capacity=8)
+    reference = set()
+    for i in list(range(5000)) + list(range(0, 5000, 7)):
+        digest = _digest(i)
+        assert digests.add(digest) == (digest not in reference)
+        reference.add(digest)
+
+    assert len(digests) == len(reference) == 5000
+    assert all(_digest(i) in digests for i in range(5000))
+    assert not any(_digest(i) in digests for i in range(5000, 6000))
+    assert digests.size_bytes <= 8 * 5000 / 0.75 * 2
+    assert set(digests) == {digest[:8] for digest in reference}
+    assert _digest(1)[:8] + b"other" in digests
+
+
+def test_zero_digest_and_copy():
+    """测试全零摘要（与空槽位标记相同）也能正确加入，集合可由迭代结果重建"""
+    digests = DigestSet([bytes(16), bytes(8)])
+    assert len(digests) == 1 and bytes(16) in digests
+    digests.update(_digest(i) for i in range(10))
+    assert len(DigestSet(digests)) == 11
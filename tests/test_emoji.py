@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享的表情识别
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.emoji import count_emoji, find_emoji, has_emoji, strip_emoji
+
+
+def test_sequences_count_as_one_emoji():
+    """测试变体选择符、肤色、零宽连接、国旗和键帽序列都算作一个表情"""
+    assert count_emoji("爱你❤️") == 1
+    assert count_emoji("👍🏻好") == 1
+    assert count_emoji("👨‍👩‍👧一家人") == 1
+    assert count_emoji("🇨🇳🇯🇵") == 2
+    assert count_emoji("第1️⃣名") == 1
+    assert count_emoji("早安😊⭐！2024年") == 2
+    assert find_emoji("好😊呀❤️") == [(1, "😊"), (3, "❤️")]
+
+
+def test_has_and_strip_emoji():
+    """测试判断和删除表情，普通文本、数字和中文标点不受影响"""
+    assert has_emoji("晚安🌙")
+    assert not has_emoji("晚安，2024年。")
+    assert strip_emoji("爱你❤️！👨‍👩‍👧第1️⃣名") == "爱你！第名"
+    assert strip_emoji("晚安，2024年。") == "晚安，2024年。"
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据集生成器的流式接口
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import tracemalloc
+
+from dataset_io import iter_jsonl
+from generator import GirlfriendDatasetGenerator
+from scenarios import SCENARIO_CATALOG
+
+
+def test_iterators_match_list_api():
+    """测试迭代器与列表接口生成相同的数据"""
+    generator = GirlfriendDatasetGenerator()
+
+    assert list(generator.iter_deterministic(2)) == generator.generate_deterministic_dataset(2)
+    assert list(generator.iter_random(50, seed=7)) == generator.generate_random_dataset(50, seed=7)
+
+
+def test_generation_leaves_global_random_untouched():
+    """测试生成过程不修改全局 random 状态"""
+    import random
+
+    random.seed(0)
+    state = random.getstate()
+    generator = GirlfriendDatasetGenerator(seed=5)
+    generator.generate_random_dataset(100, seed=1)
+    generator.generate_balanced_dataset(2)
+    list(generator.iter_random(10))
+
+    assert random.getstate() == state
+    assert (
+        GirlfriendDatasetGenerator(seed=5).generate_balanced_dataset(2)
+        == GirlfriendDatasetGenerator(seed=5).generate_balanced_dataset(2)
+    )
+
+
+def test_iter_balanced_counts():
+    """测试平衡迭代器中每个场景出现次数相同"""
+    generator = GirlfriendDatasetGenerator()
+    counts = {}
+    for entry in generator.iter_balanced(3):
+        counts[entry["instruction"]] = counts.get(entry["instruction"], 0) + 1
+
+    assert len(counts) == len(SCENARIO_CATALOG)
+    assert set(counts.values()) == {3}
+
+
+def test_stream_dataset_roundtrip(tmp_path):
+    """测试流式写出的JSONL文件可以完整读回"""
+    generator = GirlfriendDatasetGenerator()
+    output_path = str(tmp_path / "dataset.jsonl")
+
+    path, count = generator.stream_dataset(generator.iter_random(200, seed=1), output_path)
+
+    assert path == output_path
+    assert count == 200
+    assert list(iter_jsonl(path)) == generator.generate_random_dataset(200, seed=1)
+
+
+def test_stream_dataset_bounded_memory(tmp_path):
+    """测试流式写出的内存峰值与样本数量无关"""
+    generator = GirlfriendDatasetGenerator()
+
+    def peak_for(num_samples):
+        tracemalloc.start()
+        generator.stream_dataset(
+            generator.iter_random(num_samples, seed=3),
+            str(tmp_path / f"dataset_{num_samples}.jsonl")
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    small_peak = peak_for(1000)
+    large_peak = peak_for(20000)
+    assert large_peak < small_peak * 2
+
+
+def test_save_dataset_formats(tmp_path):
+    """测试各输出格式都能完整读回，json格式与 json.dump(indent=2) 一致"""
+    import json
+    import warnings
+
+    from dataset_io import format_extension, iter_dataset
+
+    generator = GirlfriendDatasetGenerator()
+    dataset = generator.generate_random_dataset(120, seed=4)
+
+    for output_format in ["json", "jsonl", "jsonl.gz", "parquet"]:
+        target = str(tmp_path / f"dataset{format_extension(output_format)}")
+        with warnings.catch_warnings():
+            # 未安装 pyarrow 时 parquet 会退回 jsonl.gz 并给出警告
+            warnings.simplefilter("ignore")
+            path = generator.save_dataset(dataset, target, output_format=output_format)
+        assert list(iter_dataset(path)) == dataset
+
+    json_path = tmp_path / "dataset.json"
+    assert json_path.read_text(encoding="utf-8") == json.dumps(dataset, ensure_ascii=False, indent=2)
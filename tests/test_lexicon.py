@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试词库包的加载、校验与共享
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import copy
+import json
+
+import pytest
+
+from lexicon import Lexicon, lexicon_path, load_lexicon
+from variation_engine import VariationEngine
+
+
+def _default_data():
+    with open(lexicon_path(), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_default_lexicon_is_loaded_once_and_shared():
+    """测试默认词库在进程内只加载一次，所有引擎共享同一份词表和匹配器"""
+    lexicon = load_lexicon()
+    assert load_lexicon("default") is lexicon
+    assert len(lexicon.digest) == 16
+
+    engine_a, engine_b = VariationEngine(seed=1), VariationEngine(seed=2)
+    assert engine_a.synonym_pools is engine_b.synonym_pools is lexicon.synonym_pools
+    assert engine_a.synonym_matcher is lexicon.synonym_matcher
+    assert lexicon.particle_substitutions["呀"] == ["啊", "哇"]
+    assert lexicon.word_matcher.find_all("真的很开心") == [(0, 2, "真的"), (2, 3, "很"), (3, 5, "开心")]
+
+
+def test_custom_lexicon_file(tmp_path):
+    """测试从文件加载自定义词库并用于引擎"""
+    data = _default_data()
+    data["name"] = "custom"
+    data["engine"]["placeholder_pools"]["pet_name"] = ["小猫咪"]
+    path = tmp_path / "custom.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    lexicon = load_lexicon(str(path))
+    assert lexicon.name == "custom" and lexicon.digest != load_lexicon().digest
+    engine = VariationEngine(seed=3, lexicon=lexicon)
+    assert engine._fill_placeholders("{pet_name}，早安呀！") == "小猫咪，早安呀！"
+
+
+def test_invalid_lexicon_is_rejected():
+    """测试格式版本、缺失的必需词表和空词表都会报错"""
+    data = _default_data()
+    for mutate in (
+        lambda d: d.update(format=99),
+        lambda d: d["engine"]["emoji_sets"].pop("happy"),
+        lambda d: d["engine"]["tone_particles"].pop("question"),
+        lambda d: d["engine"]["synonym_pools"].update({"加油": []}),
+        lambda d: d["dataset"]["tone_particles"].update({"呀": ["呀"]}),
+        lambda d: d.pop("dataset"),
+    ):
+        broken = copy.deepcopy(data)
+        mutate(broken)
+        with pytest.raises(ValueError):
+            Lexicon(broken)
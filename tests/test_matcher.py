@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多模式短语匹配器
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.matcher import PhraseMatcher
+
+
+def test_longest_match_without_overlap():
+    """测试同一位置取最长短语，匹配结果互不重叠"""
+    matcher = PhraseMatcher(["很", "很好", "好", "开心", "好开心"])
+
+    assert matcher.find_all("很好开心") == [(0, 2, "很好"), (2, 4, "开心")]
+    assert matcher.find_all("好开心呀，很开心") == [(0, 3, "好开心"), (5, 6, "很"), (6, 8, "开心")]
+    assert matcher.find_all("很好开心", limit=1) == [(0, 2, "很好")]
+    assert PhraseMatcher([]).find_all("很好") == []
+
+
+def test_first_occurrences_and_rewrite():
+    """测试每个短语只保留第一次出现的位置，并一次性重建字符串"""
+    matcher = PhraseMatcher(["哦", "呀"])
+    text = "好哦，走呀，来哦"
+    spans = matcher.first_occurrences(text)
+
+    assert spans == [(1, 2, "哦"), (4, 5, "呀")]
+    # 替换顺序不影响结果，替换文本长度可以与原文不同
+    replacements = [(4, 5, "啦~"), (1, 2, "")]
+    assert PhraseMatcher.rewrite(text, replacements) == "好，走啦~，来哦"
+    assert PhraseMatcher.rewrite(text, []) == text
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 MinHash 签名与多样性挑选
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.minhash import MinHasher, diversity_score, estimate_similarity, select_diverse, shingles
+
+
+def test_signature_estimates_jaccard():
+    """测试签名相似度接近真实 Jaccard 相似度，且与实例无关"""
+    hasher = MinHasher(num_perm=256)
+    a = "今天也要开开心心的呀，记得按时吃饭哦"
+    b = "今天也要开开心心的呀，记得早点睡觉哦"
+    exact = len(shingles(a) & shingles(b)) / len(shingles(a) | shingles(b))
+
+    assert abs(estimate_similarity(hasher.signature(a), hasher.signature(b)) - exact) < 0.1
+    assert hasher.signature(a) == MinHasher(num_perm=256).signature(a)
+    assert estimate_similarity(hasher.signature(a), hasher.signature(a)) == 1.0
+    assert estimate_similarity(hasher.signature(""), hasher.signature(a)) == 0.0
+
+
+def test_select_diverse_is_farthest_first():
+    """测试贪心挑选先取与已选集合最不相似的候选"""
+    hasher = MinHasher()
+    texts = ["早安宝贝今天也要加油", "早安宝贝今天也要加油呀", "晚安做个好梦", "一起去吃好吃的吧"]
+    signatures = hasher.signatures(texts)
+
+    assert select_diverse(signatures, 3) == [0, 2, 3]
+    assert select_diverse(signatures, 10) == [0, 1, 2, 3]
+    assert select_diverse(signatures, 0) == []
+    assert diversity_score([signatures[i] for i in (0, 2, 3)]) > diversity_score(signatures[:2])
+
+
+def test_row_cache_is_shared_and_bounded():
+    """测试参数相同的签名生成器共享有界的行缓存，超出容量后签名不变"""
+    first, second = MinHasher(num_perm=512, seed=7), MinHasher(num_perm=512, seed=7)
+    assert first._rows is second._rows
+    assert first._rows is not MinHasher(num_perm=512, seed=8)._rows
+
+    text = "".join(chr(0x4e00 + i) for i in range(first._row_cache_size + 100))
+    signature = first.signature(text)
+    assert len(first._rows) == first._row_cache_size
+    assert second.signature(text) == signature
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 MinHash-LSH 近重复检测
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import contextlib
+import io
+import itertools
+import random
+
+import generate_dataset
+from near_dup import MAX_REPEAT_SHARE, CandidateIndex, NearDuplicateIndex, jaccard_floor, repeat_share
+from utils.digest_set import DigestSet
+from utils.minhash import lsh_bands
+from utils.text import normalize_text, normalized_similarity
+
+
+def _brute_force_duplicates(dataset, threshold):
+    """逐对比较：与同一上下文中更早保留的条目相似度达到阈值即移除"""
+    kept, removed = [], set()
+    for idx, entry in enumerate(dataset):
+        key = generate_dataset.context_key(entry)
+        if any(
+            k == key and generate_dataset.calculate_similarity(output, entry['output']) >= threshold
+            for k, output in kept
+        ):
+            removed.add(idx)
+        else:
+            kept.append((key, entry['output']))
+    return removed
+
+
+def test_lsh_bands_meet_recall():
+    """测试分带参数对阈值处的相似度达到目标召回率"""
+    for threshold in (0.3, 0.5, 0.8, 0.95):
+        bands, rows = lsh_bands(64, threshold, recall=0.999)
+        assert bands * rows <= 64
+        assert 1 - (1 - threshold ** rows) ** bands >= 0.999
+
+
+def test_find_duplicates_matches_pairwise_comparison():
+    """测试 LSH 候选 + 精确验证的结果与逐对比较一致"""
+    rng = random.Random(5)
+    words = ["宝贝", "今天", "也要", "开心", "哦", "呀", "记得", "吃饭", "早点", "睡觉", "～", "💕"]
+    dataset = [
+        {
+            "instruction": "陪我聊天",
+            "input": rng.choice(["早上好", "晚安", "我好累"]),
+            "output": "".join(rng.choice(words) for _ in range(rng.randint(3, 8))),
+        }
+        for _ in range(300)
+    ]
+    for threshold in (0.5, 0.65, 0.8, 0.9, 1.0):
+        assert generate_dataset.find_duplicates(dataset, threshold) == _brute_force_duplicates(dataset, threshold)
+
+
+def test_index_honors_threshold_and_groups():
+    """测试只在同一上下文内按阈值判定，空文本不参与比较"""
+    index = NearDuplicateIndex(0.8)
+    assert not index.check_and_add("a", "今天也要开开心心的呀")
+    assert index.check_and_add("a", "今天也要开开心心的哦")
+    assert not index.check_and_add("b", "今天也要开开心心的哦")
+    assert not index.check_and_add("a", "晚安做个好梦")
+    assert not index.check_and_add("a", "")
+    assert len(index) == 3
+
+    # 相似度 0.9 < 0.95，不算近重复
+    strict = NearDuplicateIndex(0.95)
+    assert not strict.check_and_add("a", "今天也要开开心心的呀")
+    assert not strict.check_and_add("a", "今天也要开开心心的哦")
+
+
+def test_pipeline_removes_near_duplicates_batch_by_batch():
+    """测试第4步默认开启，且分批处理与一次处理结果相同"""
+    samples = [
+        {"instruction": "陪我聊天", "input": "早上好", "output": text}
+        for text in ["早安宝贝今天也要加油哦😊", "早安宝贝今天也要加油呀😊", "晚安啦做个好梦吧🌙", "早安宝贝今天也要加油哦😊～"]
+    ]
+    config = dict(generate_dataset.QC_CONFIG, min_output_length=1)
+
+    whole, stats = generate_dataset.quality_control_pipeline([dict(s) for s in samples], config)
+    assert [e['output'] for e in whole] == [samples[0]['output'], samples[2]['output']]
+    assert stats['removed_duplicates'] == 2
+
+    seen, near_index = DigestSet(), NearDuplicateIndex(config['similarity_threshold'])
+    batched = []
+    for start in (0, 2):
+        part, _ = generate_dataset.quality_control_pipeline(
+            [dict(s) for s in samples[start:start + 2]], config, seen=seen, near_index=near_index
+        )
+        batched.extend(part)
+    assert batched == whole
+
+    disabled, stats = generate_dataset.quality_control_pipeline(
+        [dict(s) for s in samples], dict(config, similarity_dedup=False)
+    )
+    assert len(disabled) == 4 and stats['removed_duplicates'] == 0
+
+
+def _generated_groups(target_count=1000):
+    """变体扩充得到的归一化输出，按上下文分组（与质量控制前的数据相同）"""
+    groups = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _, samples in generate_dataset.iter_expansion_rounds(target_count):
+            for entry in samples:
+                text = normalize_text(entry['output'])
+                if text:
+                    groups.setdefault(generate_dataset.context_key(entry), set()).add(text)
+    return {group: sorted(texts) for group, texts in groups.items()}
+
+
+def test_jaccard_floor_holds_on_generated_pairs():
+    """测试相似度达到阈值的文本对，字符集合 Jaccard 相似度不低于按实际重复字符占比算出的下界"""
+    for texts in _generated_groups().values():
+        for a, b in itertools.combinations(texts, 2):
+            ratio = normalized_similarity(a, b)
+            share = (len(a) + len(b) - len(set(a)) - len(set(b))) / (len(a) + len(b))
+            jaccard = len(set(a) & set(b)) / len(set(a) | set(b))
+            assert jaccard >= jaccard_floor(ratio, share) - 1e-9
+            if max(repeat_share(a), repeat_share(b)) <= MAX_REPEAT_SHARE:
+                assert jaccard >= jaccard_floor(ratio, MAX_REPEAT_SHARE) - 1e-9
+
+
+def test_candidates_recall_all_similar_pairs():
+    """测试与逐对 calculate_similarity 相比，相似度达到阈值的文本对全部成为候选，且候选少于全部文本对"""
+    groups = _generated_groups()
+    for threshold in (0.65, 0.9):
+        index = CandidateIndex(threshold)
+        candidates = similar = pairs = 0
+        for group, texts in groups.items():
+            for key, text in enumerate(texts):
+                found = set(index.candidates(group, text))
+                candidates += len(found)
+                for other in range(key):
+                    pairs += 1
+                    if generate_dataset.calculate_similarity(texts[other], text) >= threshold:
+                        similar += 1
+                        assert other in found
+                index.add(key, group, text)
+        assert similar > 0
+        assert candidates < pairs * (0.9 if threshold < 0.8 else 0.4)
+
+
+def test_candidates_exclude_dissimilar_pairs():
+    """测试字符集合几乎不重叠的文本很少成为候选，候选数量远小于同组文本对总数"""
+    rng = random.Random(11)
+    alphabet = [chr(0x4e00 + i) for i in range(2000)]
+    index = CandidateIndex(0.65)
+    size, candidates = 1000, 0
+    for key in range(size):
+        # 每10条中有1条是上一条改动一个字的近重复
+        if key % 10 == 9:
+            text = text[:-1] + rng.choice(alphabet)
+        else:
+            text = "".join(rng.sample(alphabet, 16))
+        signature = index.signature(text)
+        found = index.candidates("g", text, signature)
+        if key % 10 == 9:
+            assert key - 1 in found
+        candidates += len(found)
+        index.add(key, "g", text, signature)
+
+    assert candidates < size * (size - 1) / 2 * 0.02
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试质量控制管道
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import copy
+import random
+
+import generate_dataset
+
+
+def _samples(count: int, seed: int = 3):
+    """带有缺表情、过短、完全重复和近重复条目的样本"""
+    rng = random.Random(seed)
+    words = ["宝贝", "今天", "也要", "开心", "哦", "呀", "记得", "吃饭", "早点", "睡觉", "～", "💕", "🌙"]
+    samples = [
+        {
+            "instruction": "陪我聊天",
+            "input": rng.choice(["早上好", "晚安", "我好累"]),
+            "output": "".join(rng.choice(words) for _ in range(rng.randint(2, 10))),
+        }
+        for _ in range(count)
+    ]
+    samples.extend(copy.deepcopy(samples[:count // 10]))
+    return samples
+
+
+def test_parallel_pipeline_matches_serial():
+    """测试多进程分块质量控制的结果、统计和随机数流与单进程完全一致"""
+    samples = _samples(600)
+    config = dict(generate_dataset.QC_CONFIG, min_output_length=8)
+
+    serial_rng = random.Random(7)
+    expected, expected_stats = generate_dataset.quality_control_pipeline(
+        copy.deepcopy(samples), config, serial_rng
+    )
+    parallel_rng = random.Random(7)
+    result, stats = generate_dataset.quality_control_pipeline(
+        copy.deepcopy(samples), config, parallel_rng, workers=2, chunk_size=64
+    )
+
+    assert result == expected
+    assert stats == expected_stats
+    assert serial_rng.getstate() == parallel_rng.getstate()
+    assert stats['emoji_injected'] > 0
+    assert stats['removed_length'] > 0
+    assert stats['removed_exact_duplicates'] > 0
+    assert stats['removed_duplicates'] > 0
+
+
+def test_stream_stages_are_lazy_and_counted(tmp_path):
+    """测试流式质量控制逐条拉取输入，与列表管道结果一致，并按阶段计数"""
+    samples = _samples(300)
+    config = dict(generate_dataset.QC_CONFIG, min_output_length=8)
+    expected, expected_stats = generate_dataset.quality_control_pipeline(
+        copy.deepcopy(samples), config, random.Random(7)
+    )
+
+    pulled = []
+
+    def source():
+        for entry in copy.deepcopy(samples):
+            pulled.append(entry)
+            yield entry
+
+    counters = generate_dataset.new_stage_counters()
+    stream = generate_dataset.quality_control_stream(source(), config, random.Random(7), counters=counters)
+    first = next(stream)
+    assert first == expected[0]
+    assert len(pulled) < len(samples)
+
+    assert [first] + list(stream) == expected
+    assert generate_dataset.stage_stats(counters) == expected_stats
+    assert counters['inject_emoji']['in'] == len(samples)
+    for upstream, downstream in zip(generate_dataset.QC_STAGES, generate_dataset.QC_STAGES[1:]):
+        assert counters[upstream]['out'] == counters[downstream]['in']
+
+    input_path = tmp_path / "input.jsonl"
+    generate_dataset.write_dataset(copy.deepcopy(samples), str(input_path), "jsonl")
+    output_path, file_counters = generate_dataset.quality_control_file(
+        str(input_path), str(tmp_path / "output.jsonl"), config, seed=5
+    )
+    assert file_counters['inject_emoji']['in'] == len(samples)
+    kept = generate_dataset.stage_stats(file_counters)['final_count']
+    assert sum(1 for _ in generate_dataset.iter_dataset(output_path)) == kept > 0
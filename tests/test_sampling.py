@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试别名表加权采样
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import random
+
+from generator import GirlfriendDatasetGenerator
+from sampling import AliasSampler, ScenarioSampler
+from scenarios import SCENARIO_CATALOG
+
+
+def test_alias_sampler_matches_weights():
+    """测试别名表采样的频率接近目标权重"""
+    weights = [1, 0, 3, 6]
+    sampler = AliasSampler(weights, random.Random(0))
+    indices = sampler.sample(60000)
+
+    counts = [0] * len(weights)
+    for index in indices:
+        counts[index] += 1
+
+    assert counts[1] == 0
+    for count, weight in zip(counts, weights):
+        assert abs(count / 60000 - weight / 10) < 0.01
+
+
+def test_alias_sampler_rejects_bad_weights():
+    """测试非法权重会被拒绝"""
+    for weights in ([], [0, 0], [1, -1]):
+        try:
+            AliasSampler(weights)
+            assert False, f"权重 {weights} 应该被拒绝"
+        except ValueError:
+            pass
+
+
+def test_category_balanced_by_default():
+    """测试默认情况下各分类的目标比例相同"""
+    sampler = ScenarioSampler(SCENARIO_CATALOG, rng=random.Random(1))
+    target = sampler.target_distribution()
+    categories = {s.category for s in SCENARIO_CATALOG}
+
+    assert set(target) == categories
+    for ratio in target.values():
+        assert abs(ratio - 1 / len(categories)) < 1e-9
+
+    sampler.sample(50000)
+    report = sampler.report()
+    assert report["total_draws"] == 50000
+    assert report["total_variation"] < 0.02
+
+
+def test_weighted_generation_is_reproducible():
+    """测试加权生成在相同种子下可复现，且只产生有权重的分类"""
+    generator = GirlfriendDatasetGenerator()
+    weights = {"greetings": 3, "festivals": 1}
+
+    first = generator.generate_weighted_dataset(500, category_weights=weights, seed=5)
+    second = generator.generate_weighted_dataset(500, category_weights=weights, seed=5)
+    assert first == second
+
+    allowed = {s.instruction for s in SCENARIO_CATALOG if s.category in weights}
+    assert all(entry["instruction"] in allowed for entry in first)
+
+    result = generator.generate_dataset_with_metadata(300, mode="weighted", seed=2, tag_weights={"love": 1})
+    assert result["metadata"]["distribution_report"]["group_by"] == "tag"
+    assert len(result["data"]) == 300
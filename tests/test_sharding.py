@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分片数据集生成
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from dataset_io import iter_jsonl
+from sharding import generate_sharded_dataset, plan_shards, verify_manifest, write_shards
+from utils.rng import derive_seed
+
+
+def test_derive_seed_is_stable():
+    """测试派生种子稳定且区分不同键"""
+    assert derive_seed(42, "shard", 0) == derive_seed(42, "shard", 0)
+    assert derive_seed(42, "shard", 0) != derive_seed(42, "shard", 1)
+    assert derive_seed(42, "shard", 0) != derive_seed(43, "shard", 0)
+
+
+def test_plan_shards():
+    """测试分片规划"""
+    assert plan_shards(25, 10) == [(0, 10), (1, 10), (2, 5)]
+    assert plan_shards(0, 10) == []
+
+
+def test_output_independent_of_worker_count(tmp_path):
+    """测试不同工作进程数量生成的分片逐字节一致"""
+    manifest_a = generate_sharded_dataset(str(tmp_path / "a"), 250, seed=7, shard_size=100, workers=1)
+    manifest_b = generate_sharded_dataset(str(tmp_path / "b"), 250, seed=7, shard_size=100, workers=2)
+
+    assert manifest_a == manifest_b
+    assert manifest_a["total_count"] == 250
+    assert [shard["count"] for shard in manifest_a["shards"]] == [100, 100, 50]
+    assert verify_manifest(str(tmp_path / "a"))
+
+
+def test_write_shards_roundtrip(tmp_path):
+    """测试已有数据流的分片写出与校验"""
+    entries = [{"instruction": "测试", "input": "", "output": f"第{i}条呀~ 💕"} for i in range(7)]
+    manifest = write_shards(entries, str(tmp_path), shard_size=3, prefix="part", seed=1)
+
+    assert manifest["seed"] == 1
+    assert [shard["file"] for shard in manifest["shards"]] == [
+        "part-00000.jsonl", "part-00001.jsonl", "part-00002.jsonl"
+    ]
+    restored = []
+    for shard in manifest["shards"]:
+        restored.extend(iter_jsonl(str(tmp_path / shard["file"])))
+    assert restored == entries
+    assert verify_manifest(str(tmp_path))
+
+
+def test_balanced_and_deterministic_modes(tmp_path):
+    """测试平衡和确定性模式：按分片数量切分，输出与进程数无关，且与生成器的单进程结果一致"""
+    from collections import Counter
+    from generator import GirlfriendDatasetGenerator
+    from scenarios import SCENARIO_CATALOG
+
+    rounds = 3
+    num_samples = len(SCENARIO_CATALOG) * rounds - 5
+
+    balanced = generate_sharded_dataset(str(tmp_path / "b1"), num_samples, seed=3, workers=1,
+                                        mode="balanced", num_shards=2)
+    assert balanced == generate_sharded_dataset(str(tmp_path / "b2"), num_samples, seed=3, workers=2,
+                                                mode="balanced", num_shards=2)
+    assert balanced["total_count"] == len(SCENARIO_CATALOG) * rounds
+    entries = [e for shard in balanced["shards"] for e in iter_jsonl(str(tmp_path / "b1" / shard["file"]))]
+    counts = Counter((e["instruction"], e["input"]) for e in entries)
+    assert set(counts.values()) == {rounds}
+
+    deterministic = generate_sharded_dataset(str(tmp_path / "d"), num_samples, workers=2,
+                                             mode="deterministic", num_shards=4)
+    assert len(deterministic["shards"]) == 4
+    entries = [e for shard in deterministic["shards"] for e in iter_jsonl(str(tmp_path / "d" / shard["file"]))]
+    assert entries == GirlfriendDatasetGenerator().generate_deterministic_dataset(rounds)
+    assert verify_manifest(str(tmp_path / "d"))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试全量相似度审计
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import itertools
+import random
+
+import pytest
+
+from similarity_audit import SimilarityAudit, audit_similarity
+from utils.text import normalize_text, normalized_similarity
+
+
+def _samples(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    words = ["宝贝", "今天", "也要", "开心", "哦", "呀", "记得", "吃饭", "早点", "睡觉", "工作", "加油", "～", "💕"]
+    return [
+        {
+            "instruction": rng.choice(["陪我聊天", "晚安", "鼓励我"]),
+            "input": "",
+            "output": "".join(rng.choice(words) for _ in range(rng.randint(3, 12))),
+        }
+        for _ in range(count)
+    ]
+
+
+def test_audit_matches_all_pairs():
+    """测试全量审计的最高相似度、阈值以上文本对、近邻直方图和每组最相似文本对与两两比较一致"""
+    samples = _samples(300)
+    audit = audit_similarity(samples, floor=0.6, top_k=2, threshold=0.8)
+
+    texts = [normalize_text(entry["output"]) for entry in samples]
+    nearest = [0.0] * len(samples)
+    pairs = {}
+    for i, j in itertools.combinations(range(len(samples)), 2):
+        if samples[i]["instruction"] != samples[j]["instruction"]:
+            continue
+        similarity = normalized_similarity(texts[i], texts[j])
+        nearest[i] = max(nearest[i], similarity)
+        nearest[j] = max(nearest[j], similarity)
+        pairs.setdefault(samples[i]["instruction"], []).append(similarity)
+
+    result = audit.result()
+    assert result["max_similarity"] == round(max(nearest), 4)
+    assert result["pairs_above_threshold"] == sum(s >= 0.8 for group in pairs.values() for s in group)
+    assert result["nearest_neighbor_histogram"]["<0.60"] == sum(s < 0.6 for s in nearest)
+    assert sum(result["nearest_neighbor_histogram"].values()) == len(samples)
+    for instruction, top in result["top_pairs"].items():
+        expected = sorted(pairs[instruction], reverse=True)[:2]
+        assert [pair["similarity"] for pair in top] == [round(s, 4) for s in expected]
+    # 候选只占同组文本对的一部分
+    assert audit.cascade.pairs < sum(len(group) for group in pairs.values())
+
+
+def test_audit_below_floor_and_invalid_threshold():
+    """测试所有文本对都低于 floor 时只报告上界，阈值低于 floor 时报错"""
+    audit = audit_similarity([
+        {"instruction": "晚安", "input": "", "output": "晚安宝贝早点睡觉"},
+        {"instruction": "晚安", "input": "", "output": "明天也要加油工作"},
+    ], floor=0.9)
+    assert audit.result()["max_similarity"] is None
+    assert audit.result()["top_pairs"] == {}
+    with pytest.raises(ValueError):
+        SimilarityAudit(floor=0.7, threshold=0.6)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享的文本归一化
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.text import SimilarityCascade, compact_text, normalize_text, normalized_similarity
+
+
+def test_normalize_text():
+    """测试去掉表情和标点、转小写并合并空白，结果按文本缓存"""
+    assert normalize_text("  早安宝贝😊！  Good   Morning～💕 ") == "早安宝贝 good morning"
+    assert normalize_text("🌸✨！") == ""
+
+    normalize_text.cache_clear()
+    for _ in range(3):
+        normalize_text("今天也要加油哦！")
+    assert normalize_text.cache_info().misses == 1
+
+
+def test_compact_text_and_similarity():
+    """测试多样性比较的归一化和归一化文本的相似度"""
+    assert compact_text("加油哦😊！ 你最棒_啦") == "加油哦你最棒啦"
+    assert normalized_similarity("今天也要开心", "今天也要开心") == 1.0
+    assert normalized_similarity("", "今天也要开心") == 0.0
+    assert 0.0 < normalized_similarity("今天也要开心", "明天也要开心") < 1.0
+
+
+def test_similarity_cascade_matches_exact_ratio():
+    """测试分级比较与直接计算相似度的判定一致，并按级记录排除数量"""
+    texts = ["今天也要开心", "明天也要开心", "今天也要开开心心的呀", "晚安", "开心也要今天", ""]
+    for threshold in (0.0, 0.5, 0.8, 1.0):
+        cascade = SimilarityCascade(threshold)
+        for a in texts:
+            for b in texts:
+                expected = normalized_similarity(a, b)
+                result = cascade.check(a, b)
+                if expected >= threshold:
+                    assert result == expected
+                else:
+                    assert result is None
+        assert cascade.pairs == len(texts) ** 2
+        assert cascade.matched + sum(cascade.pruned.values()) == cascade.pairs
+
+    cascade = SimilarityCascade(0.9)
+    assert cascade.check("晚安", "今天也要开心") is None
+    assert cascade.check("开心也要今天", "今天也要开心") is None
+    assert cascade.pruned == {"length": 1, "multiset": 0, "exact": 1}
+    assert cascade.prune_rates()["length"] == 0.5
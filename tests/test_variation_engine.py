@@ -10,6 +10,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import json
 from variation_engine import (
+    DEFAULT_DIVERSITY_OVERSAMPLE,
     VariationEngine,
     generate_variations_for_scenario,
     get_tone_for_scenario,
@@ -229,6 +230,184 @@ def test_scenario_tone_mapping():
     print(f"\n✓ 共支持 {len(SCENARIO_TONE_MAP)} 个场景的自动基调映射")
 
 
+def test_isolated_random_streams():
+    """测试引擎使用独立的随机数流，不影响全局 random 状态"""
+    import random
+
+    template = "加油呀！💪 你一定可以的！"
+    expected_a = VariationEngine(seed=11).generate_variations(template, num_variants=5, tone="encourage")
+    expected_b = VariationEngine(seed=22).generate_variations(template, num_variants=5, tone="encourage")
+
+    random.seed(0)
+    global_state = random.getstate()
+
+    # 两个引擎交替使用，结果应与各自单独使用时一致
+    engine_a = VariationEngine(seed=11)
+    engine_b = VariationEngine(seed=22)
+    first_b = engine_b.generate_variations(template, num_variants=5, tone="encourage")
+    first_a = engine_a.generate_variations(template, num_variants=5, tone="encourage")
+
+    assert first_a == expected_a
+    assert first_b == expected_b
+    assert random.getstate() == global_state
+
+
+def test_template_compilation_cache():
+    """测试模板编译结构和LRU缓存"""
+    engine = VariationEngine(seed=1, template_cache_size=2)
+    compiled = engine.compile_template("{pet_name}，加油！💪 你很厉害~ {unknown}")
+
+    assert compiled.placeholders == ("pet_name", "unknown")
+    assert compiled.sentences == ("{pet_name}，加油！", "💪 你很厉害~", " {unknown}")
+    assert compiled.emojis == ("💪",)
+    assert compiled.synonym_hits == ("加油", "很", "厉害")
+    assert compiled.synonym_spans == ((11, 13, "加油"), (17, 18, "很"), (18, 20, "厉害"))
+    assert engine._fill_placeholders("{pet_name}{unknown}").endswith("{unknown}")
+
+    # 同一模板的多次尝试只编译一次
+    engine.clear_template_cache()
+    engine.generate_variations("加油呀！💪 你一定可以的！", num_variants=5, tone="encourage")
+    info = engine.template_cache_info()
+    assert info.hits > info.misses
+    assert info.currsize <= 2
+
+
+def test_strategies_reuse_template_structure():
+    """测试各策略只编译模板本身：填充后的中间文本不进入缓存，填充后的结构与重新编译一致"""
+    engine = VariationEngine(seed=4)
+    templates = [f"{{pet_name}}，第{i}天也要加油！💪 你很厉害~ {{encouragement}}" for i in range(40)]
+    for _ in range(3):
+        for template in templates:
+            engine.generate_variations(template, num_variants=6, tone="encourage")
+    assert engine.template_cache_info().currsize == len(templates)
+
+    compiled = engine.compile_template("{pet_name}，加油！💪 你很厉害~ {unknown}")
+    filled = compiled.fill(["宝贝", None], engine._fragment)
+    fresh = engine.compile_template(filled.text)
+    for name in ("text", "segments", "placeholders", "sentences", "emojis", "emoji_positions", "synonym_spans"):
+        assert getattr(filled, name) == getattr(fresh, name)
+
+
+def test_enumeration_mode():
+    """测试组合枚举模式：不放回抽样、结果互不相同、空间大小精确"""
+    engine = VariationEngine(seed=5)
+    template = "{pet_name}，加油！💪"
+    space = engine.variant_space(template, "encourage")
+
+    expected_size = 1
+    for radix in space.radices:
+        expected_size *= radix
+    assert space.size == expected_size == engine.count_variants(template, "encourage")
+    assert len({space.render(i) for i in range(space.size)}) == space.size
+
+    variations = engine.generate_variations(
+        template, num_variants=30, tone="encourage", mode="enumerate", oversample=1
+    )
+    assert len(variations) == 30
+    assert len(set(variations)) == 30
+    assert variations == VariationEngine(seed=5).enumerate_variations(template, 30, "encourage")
+
+    # 请求数量超过可用变体时返回全部可用变体，而不是无限重试
+    small = VariationEngine(seed=1).enumerate_variations("今天也要开开心心的呀！✨", 10000, "happy")
+    assert 0 < len(small) <= engine.count_variants("今天也要开开心心的呀！✨", "happy")
+    assert len(VariationEngine(seed=1).generate_variations("你好", num_variants=500)) <= 500
+
+
+def test_diverse_selection():
+    """测试多样性挑选：只差表情的候选不会同时入选，得分高于按生成顺序截取"""
+    engine = VariationEngine(seed=3)
+    candidates = ["今天也要加油哦！💪", "今天也要加油哦！✨", "今天也要加油哦~", "宝贝你真的超级厉害呀！", "晚安呀，做个好梦~"]
+    picked = engine.select_diverse(candidates, 3)
+
+    assert picked[0] == candidates[0]
+    assert sorted(picked[1:]) == sorted(candidates[3:])
+    assert engine.diversity_score(picked) > engine.diversity_score(candidates[:3])
+    assert engine.diversity_score(candidates[:2]) == 0.0
+    assert engine.diversity_score(candidates[:1]) == 0.0
+
+    template = "加油呀！💪 你一定可以的！"
+    diverse = VariationEngine(seed=8).generate_variations(
+        template, num_variants=6, tone="encourage", oversample=DEFAULT_DIVERSITY_OVERSAMPLE
+    )
+    plain = VariationEngine(seed=8).generate_variations(template, num_variants=6, tone="encourage")
+    assert len(diverse) == len(set(diverse)) == 6
+    assert engine.diversity_score(diverse) >= engine.diversity_score(plain)
+    assert diverse == VariationEngine(seed=8).generate_variations(
+        template, num_variants=6, tone="encourage", oversample=DEFAULT_DIVERSITY_OVERSAMPLE
+    )
+    # 默认不做多样性挑选
+    assert plain == VariationEngine(seed=8).generate_variations(template, num_variants=6, tone="encourage", oversample=1)
+
+
+def test_strategy_instrumentation():
+    """测试按策略统计：不改变生成结果，计数自洽，未开启时为空"""
+    template = "{pet_name}，加油！💪 你一定可以的！"
+    plain = VariationEngine(seed=9)
+    engine = VariationEngine(seed=9, instrument=True)
+    variations = engine.generate_variations(template, num_variants=8, tone="encourage", oversample=1)
+
+    assert variations == plain.generate_variations(template, num_variants=8, tone="encourage", oversample=1)
+    assert plain.strategy_stats() == {}
+
+    stats = engine.strategy_stats()
+    rows = [row for by_tone in stats.values() for row in by_tone.values()]
+    assert set(tone for by_tone in stats.values() for tone in by_tone) == {"encourage"}
+    assert all(row["attempts"] == row["accepted"] + row["rejected"] + row["duplicates"] for row in rows)
+    assert sum(row["accepted"] for row in rows) == len(variations)
+    assert all(row["seconds"] >= 0 for row in rows)
+    assert "strategy" in engine.stats.format_table()
+
+    engine.reset_strategy_stats()
+    assert engine.strategy_stats() == {}
+
+
+def test_variant_stream():
+    """测试惰性变体流：按需取用、不重复、空间耗尽时结束"""
+    import itertools
+    import random
+    from variation_engine import _permuted_indices
+
+    assert sorted(_permuted_indices(random.Random(3), 1000)) == list(range(1000))
+
+    template = "{pet_name}，今天{time}要{care_action}哦！💕"
+    stream = VariationEngine(seed=12).variant_stream(template, tone="care", capacity=1000, error_rate=0.01)
+    first = list(itertools.islice(stream, 300))
+    assert len(set(first)) == 300
+    assert stream.emitted == 300 and not stream.exhausted
+    assert 0 < stream.false_positive_rate() < 0.01
+    assert first == list(itertools.islice(VariationEngine(seed=12).variant_stream(template, tone="care"), 300))
+
+    small = "今天也要开开心心的呀！✨"
+    stream = VariationEngine(seed=1).variant_stream(small)
+    everything = list(stream)
+    assert stream.exhausted
+    assert len(everything) == len(set(everything)) > 0
+
+
+def test_batch_generation():
+    """测试批量生成：按输入顺序返回，结果与块大小和进程数量无关"""
+    templates = ["早安呀！😊 今天也要元气满满哦！", "{pet_name}，加油！💪 你一定可以的！", "晚安呀~ 🌙 做个好梦！"] * 3
+    tones = ["happy", "encourage", "care"] * 3
+
+    serial = VariationEngine(seed=9).generate_variations_batch(templates, tones, num_variants=4)
+    chunked = VariationEngine(seed=9).generate_variations_batch(templates, tones, num_variants=4, chunk_size=2)
+    pooled = VariationEngine(seed=9).generate_variations_batch(
+        templates, tones, num_variants=4, chunk_size=4, workers=2
+    )
+
+    assert serial == chunked == pooled
+    assert len(serial) == len(templates)
+    # 每个模板的随机数流只由种子、模板和基调决定
+    assert serial[0] == serial[3] == serial[6]
+    assert all(len(variations) == 4 for variations in serial)
+
+    try:
+        VariationEngine().generate_variations_batch(templates, ["happy"], num_variants=2)
+        assert False, "基调数量不一致时应报错"
+    except ValueError:
+        pass
+
+
 def main():
     """运行所有测试"""
     print("\n" + "🌸" * 35)
@@ -245,6 +424,13 @@ def main():
     test_synonym_replacement()
     test_sentence_reordering()
     test_scenario_tone_mapping()
+    test_isolated_random_streams()
+    test_template_compilation_cache()
+    test_enumeration_mode()
+    test_diverse_selection()
+    test_strategy_instrumentation()
+    test_variant_stream()
+    test_batch_generation()
     
     print("\n" + "=" * 70)
     print("✨ 所有测试完成！")